@@ -0,0 +1,99 @@
+#!/usr/bin/env python3.8
+"""Micro-benchmarks with pytest-benchmark style reports."""
+
+import math
+import time
+
+from typing import Any, Callable, Iterable, List, NamedTuple
+
+
+class BenchmarkResult(NamedTuple):
+    name: str
+    rounds: int
+    min_ms: float
+    max_ms: float
+    mean_ms: float
+    stddev_ms: float
+    median_ms: float
+    p99_ms: float
+    ops_per_sec: float
+
+
+def get_percentile(sorted_values: List[float], percentile: float) -> float:
+    """Nearest-rank percentile of the already sorted values."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(len(sorted_values) * percentile / 100))
+    return sorted_values[rank - 1]
+
+
+def summarize(name: str, times_ms: Iterable[float]) -> BenchmarkResult:
+    times_ms = sorted(times_ms)
+    rounds = len(times_ms)
+    if rounds == 0:
+        raise Exception(f"Benchmark {name} has no rounds.")
+    mean_ms = sum(times_ms) / rounds
+    variance = sum((t - mean_ms) ** 2 for t in times_ms) / max(rounds - 1, 1)
+    return BenchmarkResult(
+        name=name,
+        rounds=rounds,
+        min_ms=times_ms[0],
+        max_ms=times_ms[-1],
+        mean_ms=mean_ms,
+        stddev_ms=math.sqrt(variance),
+        median_ms=get_percentile(times_ms, 50),
+        p99_ms=get_percentile(times_ms, 99),
+        ops_per_sec=1000 / mean_ms if mean_ms > 0 else math.inf,
+    )
+
+
+def run_benchmark(
+    name: str,
+    fn: Callable[[], Any],
+    rounds: int = 100,
+    warmup_rounds: int = 10,
+    timer: Callable[[], float] = time.perf_counter,
+) -> BenchmarkResult:
+    """Times rounds calls of fn, after warmup_rounds untimed calls."""
+    for _ in range(warmup_rounds):
+        fn()
+
+    times_ms = []
+    for _ in range(rounds):
+        start = timer()
+        fn()
+        times_ms.append((timer() - start) * 1000)
+    return summarize(name, times_ms)
+
+
+BENCHMARK_COLUMNS = ["Min", "Max", "Mean", "StdDev", "Median", "P99", "OPS", "Rounds"]
+
+
+def gen_benchmark_table(results: List[BenchmarkResult]) -> List[str]:
+    """Lines of a table with a row per result, like pytest-benchmark's."""
+    rows = [
+        [
+            result.name,
+            f"{result.min_ms:.4f}",
+            f"{result.max_ms:.4f}",
+            f"{result.mean_ms:.4f}",
+            f"{result.stddev_ms:.4f}",
+            f"{result.median_ms:.4f}",
+            f"{result.p99_ms:.4f}",
+            f"{result.ops_per_sec:.1f}",
+            str(result.rounds),
+        ]
+        for result in results
+    ]
+    header = ["Name (time in ms)"] + BENCHMARK_COLUMNS
+    widths = [max(len(row[i]) for row in rows + [header]) for i in range(len(header))]
+
+    def format_row(row: List[str]) -> str:
+        cells = [row[0].ljust(widths[0])]
+        cells += [cell.rjust(width) for cell, width in zip(row[1:], widths[1:])]
+        return "  ".join(cells)
+
+    separator = "-" * len(format_row(header))
+    return [separator, format_row(header), separator] + list(map(format_row, rows)) + [
+        separator
+    ]
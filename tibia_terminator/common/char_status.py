@@ -1,6 +1,8 @@
 """Knows the character's status."""
 
-from typing import Dict, Any, TypeVar
+import time
+
+from typing import Dict, Any, Optional, TypeVar
 
 from tibia_terminator.reader.color_spec import AmuletName, RingName
 from tibia_terminator.common.lazy_evaluator import FutureValue, immediate
@@ -14,7 +16,10 @@ class CharStatus:
         mana: int,
         magic_shield_level: int,
         equipment_status: Dict[str, Any],
+        read_ts: Optional[float] = None,
     ):
+        # time.perf_counter() when the status was read.
+        self.read_ts = time.perf_counter() if read_ts is None else read_ts
         self.hp = hp
         self.speed = speed
         self.mana = mana
@@ -52,6 +57,10 @@ class CharStatus:
             "has_minor_heal_potions", True
         )
 
+    def peek_equipment_status(self, name: str, default: Any) -> Any:
+        """Value of an equipment status field, without waiting for it."""
+        return getattr(self, name, default)
+
     def copy(
         self,
         hp: int = None,
@@ -74,6 +83,7 @@ class CharStatus:
                 "equipped_ring": self.equipped_ring,
                 "magic_shield_status": self.magic_shield_status,
             },
+            self.read_ts,
         )
 
 
@@ -82,7 +92,10 @@ class CharStatusAsync(CharStatus):
         self,
         future_stats: FutureValue[Dict[str, int]],
         future_eq_status: Dict[str, FutureValue[Any]],
+        read_ts: Optional[float] = None,
     ):
+        # time.perf_counter() when the reads were issued.
+        self.read_ts = time.perf_counter() if read_ts is None else read_ts
         self.__future_stats = future_stats
         self.__future_eq_status = future_eq_status
 
@@ -95,6 +108,14 @@ class CharStatusAsync(CharStatus):
     def __get_eq_status(self, name: str, default_value: K) -> K:
         return self.__future_eq_status.get(name, immediate(default_value)).get()
 
+    def peek_equipment_status(self, name: str, default: Any) -> Any:
+        """The default value is returned while the value isn't ready, or if
+        reading it was cancelled."""
+        future_value = self.__future_eq_status.get(name)
+        if future_value is None:
+            return default
+        return future_value.peek(default)
+
     @property
     def hp(self) -> int:
         return self.__stats.get("hp", -1)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3.8
+"""Compact binary traces of the char status sequence of live sessions.
+
+A trace is a header followed by records, each one starting with its kind:
+
+- string: defines the id of an equipment value, e.g. "ssa.amulet", the first
+  time the value is seen.
+- status: the read time (secs since the first status), HP, mana, speed,
+  magic shield level and the string ids of the equipment values.
+"""
+
+import struct
+import sys
+
+from typing import BinaryIO, Dict, Iterator, List, NamedTuple, Optional
+
+from tibia_terminator.common.char_status import CharStatus
+from tibia_terminator.reader.color_spec import ItemName
+from tibia_terminator.reader.equipment_reader import MagicShieldStatus
+
+TRACE_MAGIC = b"TTCS"
+TRACE_VERSION = 1
+HEADER_STRUCT = struct.Struct("<4sH")
+KIND_STRUCT = struct.Struct("<B")
+STRING_STRUCT = struct.Struct("<HH")
+STATUS_STRUCT = struct.Struct("<diiii9H")
+KIND_STRING = 0
+KIND_STATUS = 1
+# Order of the string ids in the status records.
+EQUIPMENT_FIELDS = [
+    "normal_action_amulet",
+    "emergency_action_amulet",
+    "tank_action_amulet",
+    "equipped_amulet",
+    "normal_action_ring",
+    "emergency_action_ring",
+    "tank_action_ring",
+    "equipped_ring",
+    "magic_shield_status",
+]
+
+
+class TracedCharStatus(NamedTuple):
+    # Seconds since the first char status in the trace.
+    ts_sec: float
+    char_status: CharStatus
+
+
+class CharStatusRecorder:
+    """Appends char status snapshots to a trace file.
+
+    Recording a CharStatusAsync waits for all its values, so it should be
+    done after the snapshot has been handled.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file: Optional[BinaryIO] = None
+        self.string_ids: Dict[str, int] = {}
+        self.start_ts: Optional[float] = None
+
+    def open(self):
+        self.file = open(self.path, "wb")
+        self.file.write(HEADER_STRUCT.pack(TRACE_MAGIC, TRACE_VERSION))
+        self.string_ids = {}
+        self.start_ts = None
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self) -> "CharStatusRecorder":
+        self.open()
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def get_string_id(self, value: str) -> int:
+        string_id = self.string_ids.get(value)
+        if string_id is None:
+            string_id = len(self.string_ids)
+            self.string_ids[value] = string_id
+            encoded = value.encode("utf-8")
+            self.file.write(KIND_STRUCT.pack(KIND_STRING))
+            self.file.write(STRING_STRUCT.pack(string_id, len(encoded)))
+            self.file.write(encoded)
+        return string_id
+
+    def record(self, char_status: CharStatus):
+        if self.start_ts is None:
+            self.start_ts = char_status.read_ts
+        string_ids = [
+            self.get_string_id(str(getattr(char_status, field)))
+            for field in EQUIPMENT_FIELDS
+        ]
+        self.file.write(KIND_STRUCT.pack(KIND_STATUS))
+        self.file.write(
+            STATUS_STRUCT.pack(
+                char_status.read_ts - self.start_ts,
+                char_status.hp,
+                char_status.mana,
+                char_status.speed,
+                char_status.magic_shield_level,
+                *string_ids,
+            )
+        )
+
+
+def to_canonical_string(value: str) -> str:
+    """The equipment value the readers produce for the decoded string, since
+    some keepers compare them by identity, e.g. the magic shield status."""
+    if value in (
+        MagicShieldStatus.RECENTLY_CAST,
+        MagicShieldStatus.OFF_COOLDOWN,
+        MagicShieldStatus.ON_COOLDOWN,
+    ):
+        return getattr(MagicShieldStatus, value.upper())
+    item = ItemName.from_name(ItemName, value)
+    if item is not None:
+        return item.name
+    return sys.intern(value)
+
+
+def read_exactly(file: BinaryIO, size: int) -> bytes:
+    data = file.read(size)
+    if len(data) != size:
+        raise Exception(f"Truncated char status trace, expected {size} bytes.")
+    return data
+
+
+def read_char_status_trace(path: str) -> Iterator[TracedCharStatus]:
+    with open(path, "rb") as file:
+        magic, version = HEADER_STRUCT.unpack(read_exactly(file, HEADER_STRUCT.size))
+        if magic != TRACE_MAGIC or version != TRACE_VERSION:
+            raise Exception(f"{path} is not a version {TRACE_VERSION} char status trace.")
+
+        strings: List[str] = []
+        while True:
+            kind_bytes = file.read(KIND_STRUCT.size)
+            if not kind_bytes:
+                return
+            (kind,) = KIND_STRUCT.unpack(kind_bytes)
+            if kind == KIND_STRING:
+                string_id, size = STRING_STRUCT.unpack(
+                    read_exactly(file, STRING_STRUCT.size)
+                )
+                if string_id != len(strings):
+                    raise Exception(f"Unexpected string id {string_id} in {path}.")
+                strings.append(
+                    to_canonical_string(read_exactly(file, size).decode("utf-8"))
+                )
+            elif kind == KIND_STATUS:
+                ts_sec, hp, mana, speed, magic_shield_level, *string_ids = (
+                    STATUS_STRUCT.unpack(read_exactly(file, STATUS_STRUCT.size))
+                )
+                equipment_status = {
+                    field: strings[string_id]
+                    for field, string_id in zip(EQUIPMENT_FIELDS, string_ids)
+                }
+                yield TracedCharStatus(
+                    ts_sec,
+                    CharStatus(
+                        hp, speed, mana, magic_shield_level, equipment_status, ts_sec
+                    ),
+                )
+            else:
+                raise Exception(f"Unknown record kind {kind} in {path}.")
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3.8
+"""Always-on latency histograms for the stages of the tick pipeline."""
+
+import json
+import time
+
+from functools import wraps
+from threading import Lock
+from typing import Callable, Dict, List, NamedTuple, TypeVar
+
+# Latencies are recorded in microseconds. Values below 2^SUB_BUCKET_BITS are
+# recorded exactly, larger values in log-linear buckets with
+# 2^(SUB_BUCKET_BITS - 1) buckets per power of two, i.e. within ~1.6% of the
+# recorded value, like an HDR histogram with 2 significant digits.
+SUB_BUCKET_BITS = 7
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+HALF_SUB_BUCKET_COUNT = SUB_BUCKET_COUNT >> 1
+# 2^26 us is ~67 secs, larger values are recorded in the last bucket.
+MAX_VALUE_BITS = 26
+BUCKET_COUNT = SUB_BUCKET_COUNT + (MAX_VALUE_BITS - SUB_BUCKET_BITS) * HALF_SUB_BUCKET_COUNT
+
+
+def get_bucket_index(value_us: int) -> int:
+    if value_us < SUB_BUCKET_COUNT:
+        return max(value_us, 0)
+    shift = value_us.bit_length() - SUB_BUCKET_BITS
+    index = SUB_BUCKET_COUNT + (shift - 1) * HALF_SUB_BUCKET_COUNT
+    index += (value_us >> shift) - HALF_SUB_BUCKET_COUNT
+    return min(index, BUCKET_COUNT - 1)
+
+
+def get_bucket_value(index: int) -> int:
+    """Highest value recorded in the bucket."""
+    if index < SUB_BUCKET_COUNT:
+        return index
+    shift = (index - SUB_BUCKET_COUNT) // HALF_SUB_BUCKET_COUNT + 1
+    mantissa = (index - SUB_BUCKET_COUNT) % HALF_SUB_BUCKET_COUNT + HALF_SUB_BUCKET_COUNT
+    return ((mantissa + 1) << shift) - 1
+
+
+class LatencySummary(NamedTuple):
+    count: int
+    p50_ms: float
+    p90_ms: float
+    p99_ms: float
+    max_ms: float
+
+    def __str__(self):
+        return (
+            f"p50 {self.p50_ms:.1f} p90 {self.p90_ms:.1f} p99 {self.p99_ms:.1f} "
+            f"max {self.max_ms:.1f} ms ({self.count})"
+        )
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts: List[int] = [0] * BUCKET_COUNT
+        self.count = 0
+        self.max_us = 0
+        self.lock = Lock()
+
+    def record_ms(self, value_ms: float) -> None:
+        value_us = int(value_ms * 1000)
+        index = get_bucket_index(value_us)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            if value_us > self.max_us:
+                self.max_us = value_us
+
+    def get_percentile_ms(self, percentile: float) -> float:
+        with self.lock:
+            counts = list(self.counts)
+            count = self.count
+            max_us = self.max_us
+        return self.__get_percentile_ms(counts, count, max_us, percentile)
+
+    def __get_percentile_ms(
+        self, counts: List[int], count: int, max_us: int, percentile: float
+    ) -> float:
+        if count == 0:
+            return 0.0
+        target = max(1, int(count * percentile / 100 + 0.5))
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            seen += bucket_count
+            if seen >= target:
+                return min(get_bucket_value(index), max_us) / 1000
+        return max_us / 1000
+
+    def summary(self) -> LatencySummary:
+        with self.lock:
+            counts = list(self.counts)
+            count = self.count
+            max_us = self.max_us
+        return LatencySummary(
+            count,
+            self.__get_percentile_ms(counts, count, max_us, 50),
+            self.__get_percentile_ms(counts, count, max_us, 90),
+            self.__get_percentile_ms(counts, count, max_us, 99),
+            max_us / 1000,
+        )
+
+    def get_buckets(self) -> Dict[float, int]:
+        """Highest value in ms of each non-empty bucket to its count."""
+        with self.lock:
+            return {
+                get_bucket_value(index) / 1000: bucket_count
+                for index, bucket_count in enumerate(self.counts)
+                if bucket_count > 0
+            }
+
+
+T = TypeVar("T")
+
+
+class LatencyHistograms:
+    """Latency histograms by stage name."""
+
+    def __init__(self):
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.lock = Lock()
+
+    def get(self, name: str) -> LatencyHistogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(name, LatencyHistogram())
+        return histogram
+
+    def record_ms(self, name: str, value_ms: float) -> None:
+        self.get(name).record_ms(value_ms)
+
+    def timed(self, name: str, fn: Callable[..., T]) -> Callable[..., T]:
+        """Wraps fn so that the latency of every call is recorded."""
+        histogram = self.get(name)
+
+        @wraps(fn)
+        def timed_fn(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram.record_ms((time.perf_counter() - start) * 1000)
+
+        return timed_fn
+
+    def summaries(self) -> Dict[str, LatencySummary]:
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+        return {name: histogram.summary() for name, histogram in histograms}
+
+    def gen_summary_lines(self, worst_first: bool = False) -> List[str]:
+        """Lines by stage name, or by descending p99 if worst_first."""
+        summaries = list(self.summaries().items())
+        if worst_first:
+            summaries.sort(key=lambda item: item[1].p99_ms, reverse=True)
+        return [f"{name}: {summary}" for name, summary in summaries]
+
+    def dump(self, path: str) -> None:
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+        dump = {
+            name: {
+                "summary": histogram.summary()._asdict(),
+                "buckets_ms": histogram.get_buckets(),
+            }
+            for name, histogram in histograms
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(dump, f, indent=2)
+
+
+_latency_histograms = LatencyHistograms()
+
+
+def get_latency_histograms() -> LatencyHistograms:
+    """Histograms shared by every stage of the tick pipeline."""
+    return _latency_histograms
@@ -2,9 +2,9 @@
 
 import sys
 
-from typing import Callable, TypeVar, Generic, List
+from typing import Callable, TypeVar, Generic, List, Optional
 from threading import Thread, Lock, Event
-from queue import Queue
+from queue import Queue, Empty
 
 T = TypeVar("T")
 
@@ -31,6 +31,10 @@ class LazyValueNotReadyError(Exception):
     pass
 
 
+class TaskCancelledError(Exception):
+    pass
+
+
 M = TypeVar("M")
 
 
@@ -78,6 +82,15 @@ class FutureValue(Generic[M]):
 
         return self.__get()
 
+    def peek(self, default: Optional[M] = None) -> Optional[M]:
+        """Like get(), but never waits. Returns the default value while the
+        value isn't ready, or if its task was cancelled."""
+        if not self._result_ready_event.is_set():
+            return default
+        if isinstance(self.error, TaskCancelledError):
+            return default
+        return self.__get()
+
 
 class FutureValueAsync(FutureValue[M]):
     def __init__(self, getter: Callable[[], M]):
@@ -92,6 +105,133 @@ class FutureValueAsync(FutureValue[M]):
         return self
 
 
+class FutureTask(FutureValue[M]):
+    """Future value of a getter that is evaluated at most once, by whoever
+    calls run() first, unless it gets cancelled before that."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    CANCELLED = "cancelled"
+
+    def __init__(self,
+                 getter: Callable[[], M],
+                 success_cb: Callable[[M], None] = None,
+                 failure_cb: Callable[[Exception], None] = None):
+        super().__init__(success_cb, failure_cb)
+        self.getter = getter
+        self.state = FutureTask.PENDING
+        self.state_lock = Lock()
+
+    def run(self):
+        with self.state_lock:
+            if self.state != FutureTask.PENDING:
+                return
+            self.state = FutureTask.RUNNING
+
+        value = None
+        error = None
+        try:
+            value = self.getter()
+        except Exception as e:
+            error = e
+        finally:
+            with self.state_lock:
+                self.state = FutureTask.DONE
+            self.set_result(value, error)
+
+    def cancel(self) -> bool:
+        """Cancels the task if it hasn't started yet, in which case get()
+        raises TaskCancelledError and the failure callbacks are called."""
+        with self.state_lock:
+            if self.state != FutureTask.PENDING:
+                return False
+            self.state = FutureTask.CANCELLED
+
+        self.set_result(None, TaskCancelledError("The task was cancelled."))
+        return True
+
+    def is_cancelled(self) -> bool:
+        return self.state == FutureTask.CANCELLED
+
+    def __call__(self):
+        self.run()
+
+
+class WorkerPool:
+    """Bounded set of daemon threads that evaluate future tasks.
+
+    Worker threads are started on demand, up to max_workers, and are reused
+    for the lifetime of the pool.
+    """
+    STOP = "__STOP__WorkerPool"
+
+    def __init__(self, max_workers: int = 4):
+        if max_workers < 1:
+            raise Exception("A WorkerPool needs at least one worker.")
+        self.max_workers = max_workers
+        self.task_queue: Queue = Queue()
+        self.workers: List[Thread] = []
+        self.idle_workers = 0
+        self.is_shutdown = False
+        self.lock = Lock()
+
+    def submit(self,
+               getter: Callable[[], M],
+               success_cb: Callable[[M], None] = None,
+               failure_cb: Callable[[Exception], None] = None) -> FutureTask[M]:
+        task = FutureTask(getter, success_cb, failure_cb)
+        with self.lock:
+            if self.is_shutdown:
+                raise Exception("Unable to submit a task, the WorkerPool is shut down.")
+            if self.idle_workers == 0 and len(self.workers) < self.max_workers:
+                worker = Thread(target=self.__work, daemon=True)
+                self.workers.append(worker)
+                worker.start()
+            self.task_queue.put_nowait(task)
+        return task
+
+    def shutdown(self):
+        """Cancels pending tasks and stops the worker threads, tasks that are
+        already running are allowed to finish."""
+        with self.lock:
+            self.is_shutdown = True
+            while True:
+                try:
+                    self.task_queue.get_nowait().cancel()
+                except Empty:
+                    break
+            for _ in self.workers:
+                self.task_queue.put_nowait(WorkerPool.STOP)
+
+    def __work(self):
+        while True:
+            with self.lock:
+                self.idle_workers += 1
+            task = self.task_queue.get()
+            with self.lock:
+                self.idle_workers -= 1
+            if task is WorkerPool.STOP:
+                break
+            try:
+                task.run()
+            except Exception as e:
+                print(f'[ERROR] WorkerPool: {e}', file=sys.stderr)
+
+
+_default_worker_pool: Optional[WorkerPool] = None
+_default_worker_pool_lock = Lock()
+
+
+def get_default_worker_pool() -> WorkerPool:
+    """Worker pool shared by all calls to future()."""
+    global _default_worker_pool
+    with _default_worker_pool_lock:
+        if _default_worker_pool is None:
+            _default_worker_pool = WorkerPool()
+        return _default_worker_pool
+
+
 N = TypeVar("N")
 
 
@@ -135,28 +275,40 @@ class TaskLoop(Thread):
     STOP = "__STOP__TaskLoop"
     NOOP = "__NOOP__TaskLoop"
     task_queue: Queue = None
-    cancel_pending_tasks: bool = False
 
     def __init__(self, task_queue: Queue = None):
         super().__init__(daemon=True)
         self.task_queue = Queue()
+        self.is_stopped = False
+        # Guards draining the queue and stopping, tasks may still be added
+        # and taken concurrently since the queue itself is thread-safe.
+        self.queue_lock = Lock()
+
+    def cancel_pending_tasks(self) -> int:
+        """Discards the tasks that haven't started yet and returns how many
+        were discarded. Discarded future values are resolved with a
+        TaskCancelledError, so nobody waits on them forever."""
+        with self.queue_lock:
+            return self.__drain_pending_tasks()
+
+    def __drain_pending_tasks(self) -> int:
+        discarded = 0
+        stop_requested = False
+        while True:
+            try:
+                task = self.task_queue.get_nowait()
+            except Empty:
+                break
+            if task is TaskLoop.STOP:
+                stop_requested = True
+            elif task is not TaskLoop.NOOP:
+                discarded += 1
+                if isinstance(task, FutureTask):
+                    task.cancel()
 
-    def cancel_pending_tasks(self):
-        """Cancels pending tasks by clearing them."""
-        # IMPORTANT: Not optimized for thread-safety, there may be issues
-        # when this is executed under concurrent/parallel execution.
-        old_task_queue = self.task_queue
-        self.task_queue = Queue()
-        # NOTE: If threads were waiting on cancelled tasks, they will be stuck
-        # forever consider adding a mechanism to throw an forcefully throw an
-        # exception in order to signal to those threads that their task got
-        # cancelled.
-        # At the moment task loop does not care if the implementation of the
-        # task is actually a future or just a plain old function. We should do
-        # the opposite, always use a future value, and wrap plain old functions
-        # in future values; then execute:
-        #     task.set_result(None, TaskCancelledException(...))
-        old_task_queue.put_nowait(TaskLoop.NOOP)
+        if stop_requested:
+            self.task_queue.put_nowait(TaskLoop.STOP)
+        return discarded
 
     def stop(self):
         """Completely stops this task loop and becomes unusable."""
@@ -168,7 +320,9 @@ class TaskLoop(Thread):
             if next_task is TaskLoop.NOOP:
                 continue
             if next_task is TaskLoop.STOP:
-                self.cancel_pending_tasks()
+                with self.queue_lock:
+                    self.is_stopped = True
+                    self.__drain_pending_tasks()
                 break
             else:
                 try:
@@ -183,18 +337,54 @@ class TaskLoop(Thread):
             self,
             getter: Callable[[], M],
             success_cb: Callable[[M], None] = None,
-            failure_cb: Callable[[Exception], None] = None) -> FutureValue[M]:
+            failure_cb: Callable[[Exception], None] = None) -> FutureTask[M]:
         """Creates a future value that will be set by this task loop."""
-        future_value = FutureValue(success_cb, failure_cb)
+        future_task = FutureTask(getter, success_cb, failure_cb)
+        with self.queue_lock:
+            if not self.is_stopped:
+                self.add_task(future_task)
+                return future_task
 
-        def task():
-            try:
-                future_value.set_result(getter())
-            except Exception as e:
-                future_value.set_result(None, e)
+        future_task.cancel()
+        return future_task
+
+
+class MultiLaneTaskLoop:
+    """Runs tasks on N TaskLoop lanes: tasks on the same lane execute in
+    order, tasks on different lanes execute in parallel."""
+
+    def __init__(self, lanes: int = 1):
+        if lanes < 1:
+            raise Exception("A MultiLaneTaskLoop needs at least one lane.")
+        self.lanes = [TaskLoop() for _ in range(lanes)]
+
+    def __len__(self) -> int:
+        return len(self.lanes)
+
+    def start(self):
+        for lane in self.lanes:
+            lane.start()
+
+    def stop(self):
+        for lane in self.lanes:
+            lane.stop()
+
+    def cancel_pending_tasks(self) -> int:
+        return sum(lane.cancel_pending_tasks() for lane in self.lanes)
 
-        self.add_task(task)
-        return future_value
+    def get_lane(self, lane: int) -> TaskLoop:
+        return self.lanes[lane % len(self.lanes)]
+
+    def add_task(self, task: Callable[[], None], lane: int = 0):
+        self.get_lane(lane).add_task(task)
+
+    def add_future(
+            self,
+            getter: Callable[[], M],
+            success_cb: Callable[[M], None] = None,
+            failure_cb: Callable[[Exception], None] = None,
+            lane: int = 0) -> FutureTask[M]:
+        return self.get_lane(lane).add_future(getter, success_cb, failure_cb)
 
 
 K = TypeVar("K")
@@ -204,13 +394,25 @@ def lazy(getter: Callable[[], K], **kwargs) -> LazyValue[K]:
     return LazyValue(getter, **kwargs)
 
 
-def future(getter: Callable[[], K], **kwargs) -> FutureValue[K]:
-    future_value = FutureValueAsync(getter, **kwargs)
-    future_value.start()
-    return future_value
+def future(getter: Callable[[], K],
+           pool: WorkerPool = None,
+           **kwargs) -> FutureTask[K]:
+    """Evaluates the getter in a worker pool, the default one unless a pool is
+    given. The returned future may be cancelled while it is still queued."""
+    return (pool or get_default_worker_pool()).submit(getter, **kwargs)
 
 
 def immediate(value: K, **kwargs) -> FutureValue[K]:
     future_value = FutureValue(**kwargs)
     future_value.set_result(value)
     return future_value
+
+
+def immediate_call(getter: Callable[[], K], **kwargs) -> FutureValue[K]:
+    """Evaluates the getter in the calling thread, errors are raised by get()."""
+    future_value = FutureValue(**kwargs)
+    try:
+        future_value.set_result(getter())
+    except Exception as e:
+        future_value.set_result(None, e)
+    return future_value
@@ -1,6 +1,11 @@
 #!/usr/bin/env python3.8
 
 import os
+import struct
+import time
+
+from threading import Lock
+from typing import Any, Iterator, List, NamedTuple, Optional, Tuple
 
 global DEBUG_LEVEL
 DEBUG_LEVEL = None
@@ -36,16 +41,98 @@ class StatsEntry():
         self.prev_equipment_status = prev_equipment_status
 
 
-class ActionLogEntry():
-    def __init__(self, debug_level, msg):
-        self.debug_level = debug_level
-        self.msg = msg
+class ActionLogEntry(NamedTuple):
+    seq: int
+    ts: float
+    debug_level: int
+    # The message is fmt % args, formatted only when it gets displayed.
+    fmt: str
+    args: Tuple[Any, ...] = ()
+
+    def format(self) -> str:
+        if not self.args:
+            return self.fmt
+        try:
+            return self.fmt % self.args
+        except (TypeError, ValueError):
+            # e.g. a mismatched format string, it mustn't take down the
+            # render thread or the spill.
+            return f"{self.fmt} {self.args}"
+
+
+ACTION_LOG_CAPACITY = 1024
+SPILL_MAGIC = b"TTAL"
+SPILL_VERSION = 1
+SPILL_HEADER_STRUCT = struct.Struct("<4sH")
+# seq, ts, debug level and the size of the formatted message.
+SPILL_RECORD_STRUCT = struct.Struct("<QdhI")
+
+
+class ActionLogRing:
+    """Fixed-size ring of the latest action log entries. The entries are
+    stored unformatted, the readers only format the ones they display."""
+
+    def __init__(self, capacity: int = ACTION_LOG_CAPACITY):
+        self.capacity = capacity
+        self.entries: List[Optional[ActionLogEntry]] = [None] * capacity
+        # Seq of the next entry, i.e. the number of entries ever appended.
+        self.next_seq = 0
+        self.lock = Lock()
+
+    def append(self, debug_level: int, fmt: str, args: Tuple[Any, ...] = ()):
+        with self.lock:
+            seq = self.next_seq
+            self.entries[seq % self.capacity] = ActionLogEntry(
+                seq, time.time(), debug_level, fmt, args
+            )
+            self.next_seq = seq + 1
+
+    def get_latest(self, count: int) -> List[ActionLogEntry]:
+        """Up to count of the latest entries, newest first."""
+        next_seq = self.next_seq
+        first_seq = max(next_seq - min(count, self.capacity), 0)
+        entries = []
+        for seq in range(next_seq - 1, first_seq - 1, -1):
+            entry = self.entries[seq % self.capacity]
+            # The slot may have been overwritten by a newer entry already.
+            if entry is not None and entry.seq == seq:
+                entries.append(entry)
+        return entries
+
+    def spill(self, path: str):
+        """Writes the entries in the ring, formatted, to a binary file that
+        can be read with read_action_log_spill, e.g. for postmortems."""
+        with open(path, "wb") as file:
+            file.write(SPILL_HEADER_STRUCT.pack(SPILL_MAGIC, SPILL_VERSION))
+            for entry in reversed(self.get_latest(self.capacity)):
+                msg = entry.format().encode("utf-8")
+                file.write(
+                    SPILL_RECORD_STRUCT.pack(
+                        entry.seq, entry.ts, entry.debug_level, len(msg)
+                    )
+                )
+                file.write(msg)
+
+
+def read_action_log_spill(path: str) -> Iterator[ActionLogEntry]:
+    with open(path, "rb") as file:
+        magic, version = SPILL_HEADER_STRUCT.unpack(
+            file.read(SPILL_HEADER_STRUCT.size)
+        )
+        if magic != SPILL_MAGIC or version != SPILL_VERSION:
+            raise Exception(f"{path} is not a version {SPILL_VERSION} action log.")
+
+        while True:
+            record = file.read(SPILL_RECORD_STRUCT.size)
+            if not record:
+                return
+            if len(record) != SPILL_RECORD_STRUCT.size:
+                raise Exception(f"Truncated action log record in {path}.")
+            seq, ts, debug_level, size = SPILL_RECORD_STRUCT.unpack(record)
+            yield ActionLogEntry(seq, ts, debug_level, file.read(size).decode("utf-8"))
 
 
 class LogEntry():
-    # TODO: Make it so that the log format and the objects for the format are
-    # separately added, that way constructing the actual log string happens in
-    # the logging thread.
     def __init__(self, msg, row=0, col=0, end='\n'):
         self.msg = msg
         self.row = row
@@ -54,12 +141,15 @@ class LogEntry():
 
 
 class StatsLogger():
-    def __init__(self, run_view = None):
+    def __init__(self, run_view = None, action_log: ActionLogRing = None):
         self.run_view = run_view
+        self.action_log = action_log or ActionLogRing()
 
-    def log_action(self, debug_level: int, msg: str):
-        if self.run_view:
-            self.run_view.add_log(msg, debug_level)
+    def log_action(self, debug_level: int, fmt: str, *args: Any):
+        """Logs fmt % args, which is only formatted if it gets displayed.
+        Entries above the debug level are dropped right away."""
+        if debug_level <= get_debug_level():
+            self.action_log.append(debug_level, fmt, args)
 
     def set_debug_line_1(self, msg: str):
         if self.run_view:
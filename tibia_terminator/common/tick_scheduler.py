@@ -0,0 +1,66 @@
+"""Paces the main loop according to how urgent the char's status is."""
+
+import time
+
+from typing import Callable, Dict, Optional
+
+from tibia_terminator.keeper.common import RefillPriority
+
+DEFAULT_INTERVAL_MS_BY_PRIORITY = {
+    RefillPriority.CRITICAL: 20,
+    RefillPriority.HIGH_PRIORITY: 30,
+    RefillPriority.DOWNTIME: 50,
+    RefillPriority.NO_REFILL: 100,
+}
+# Used when there is no char status to keep, e.g. while paused.
+DEFAULT_IDLE_INTERVAL_MS = 250
+
+
+class TickScheduler:
+    """Sleeps until the deadline of the next tick of the main loop.
+
+    Deadlines are computed from the previous deadline rather than from when
+    the loop woke up, so ticks do not drift. When a tick overruns its
+    deadline, the next one is scheduled from the current time instead of
+    trying to catch up.
+    """
+
+    def __init__(
+        self,
+        interval_ms_by_priority: Dict[RefillPriority, int] = None,
+        idle_interval_ms: int = DEFAULT_IDLE_INTERVAL_MS,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.interval_ms_by_priority = (
+            interval_ms_by_priority or DEFAULT_INTERVAL_MS_BY_PRIORITY
+        )
+        self.idle_interval_ms = idle_interval_ms
+        self.clock = clock
+        self.sleep = sleep
+        self.last_tick_sec: Optional[float] = None
+
+    def get_interval_ms(self, priority: Optional[RefillPriority]) -> int:
+        if priority is None:
+            return self.idle_interval_ms
+        return self.interval_ms_by_priority[priority]
+
+    def wait_next_tick(self, priority: Optional[RefillPriority] = None) -> float:
+        """Sleeps until the next tick is due and returns the seconds slept.
+
+        Args:
+            priority: Priority of the char status, None when idle.
+        """
+        now_sec = self.clock()
+        if self.last_tick_sec is None:
+            self.last_tick_sec = now_sec
+
+        deadline_sec = self.last_tick_sec + self.get_interval_ms(priority) / 1000
+        if deadline_sec <= now_sec:
+            self.last_tick_sec = now_sec
+            return 0
+
+        wait_sec = deadline_sec - now_sec
+        self.sleep(wait_sec)
+        self.last_tick_sec = deadline_sec
+        return wait_sec
@@ -1,14 +1,19 @@
 #!/usr/bin/env python3.8
 
+import heapq
+import itertools
 import queue
 import threading
 import time
 
+from contextlib import contextmanager
 from enum import Enum
-from typing import Dict, List, Callable, Optional
+from typing import Any, Dict, Iterator, List, Callable, Optional, Set, Tuple
 from random import randint
 from collections import deque
 
+from tibia_terminator.common.latency_histogram import get_latency_histograms
+from tibia_terminator.common.lazy_evaluator import WorkerPool
 from tibia_terminator.common.logger import StatsLogger
 from tibia_terminator.schemas.hotkeys_config_schema import HotkeysConfig
 from tibia_terminator.interface.keystroke_sender import KeystrokeSender
@@ -18,6 +23,25 @@ def timestamp_ms():
     return int(round(time.time() * 1000))
 
 
+_command_origin = threading.local()
+
+
+@contextmanager
+def command_origin(origin_ts: Optional[float]) -> Iterator[None]:
+    """Commands created in this context (on this thread) are stamped with the
+    time.perf_counter() of the event they react to, e.g. a char status read."""
+    prev_origin_ts = get_command_origin_ts()
+    _command_origin.ts = origin_ts
+    try:
+        yield
+    finally:
+        _command_origin.ts = prev_origin_ts
+
+
+def get_command_origin_ts() -> Optional[float]:
+    return getattr(_command_origin, "ts", None)
+
+
 class ThrottleBehavior(Enum):
     # DEFAULT = DROP
     DEFAULT = 1
@@ -66,6 +90,10 @@ class CommandProfile:
 
 
 class Command:
+    # Whether sending the command takes long enough that it shouldn't hold
+    # up commands of other types.
+    runs_in_background = False
+
     def __init__(
         self,
         cmd_type: CommandType,
@@ -77,6 +105,10 @@ class Command:
             cmd_type, cmd_id or str(randint(0, 10000)), throttle_behavior
         )
         self.throttle_ms = throttle_ms
+        # time.perf_counter() when the command was sent to be issued.
+        self.enqueued_ts: Optional[float] = None
+        # time.perf_counter() of the event the command reacts to.
+        self.origin_ts: Optional[float] = get_command_origin_ts()
 
     @property
     def cmd_id(self):
@@ -151,6 +183,8 @@ class KeeperHotkeyCommand(Command):
 
 
 class MacroCommand(Command):
+    runs_in_background = True
+
     def __init__(
         self,
         cmd_type: str,
@@ -170,6 +204,24 @@ class MacroCommand(Command):
         return f"[macro] {self.cmd_type} {cmd_id} ({self.throttle_ms})"
 
 
+def record_cmd_delay(command: Command) -> None:
+    """Records the time from the command being sent until it's issued."""
+    if command.enqueued_ts is not None:
+        get_latency_histograms().record_ms(
+            "command_delay", (time.perf_counter() - command.enqueued_ts) * 1000
+        )
+
+
+def record_reaction_time(command: Command) -> None:
+    """Records the time from the event the command reacts to until it's
+    issued, by cmd_id."""
+    if command.origin_ts is not None:
+        get_latency_histograms().record_ms(
+            f"reaction.{command.cmd_id}",
+            (time.perf_counter() - command.origin_ts) * 1000,
+        )
+
+
 class CommandSender(threading.Thread):
     MAX_QUEUE_SIZE = 10
     NOOP_COMMAND = Command(CommandType.NOOP, 0, "noop_id", ThrottleBehavior.FORCE)
@@ -186,13 +238,14 @@ class CommandSender(threading.Thread):
         self.retry_queue: deque = deque()
 
     def send(self, command: Command):
+        command.enqueued_ts = time.perf_counter()
         self.cmd_queue.put_nowait(command)
 
     def stop(self):
         self.cmd_queue.put_nowait(CommandSender.STOP_COMMAND)
 
     def __log_cmd(self, cmd: Command):
-        self.logger.log_action(0, str(cmd))
+        self.logger.log_action(0, "%s", cmd)
 
     def __throttle(self, throttle_ms: int = 250) -> bool:
         """Throttles an action.
@@ -208,6 +261,8 @@ class CommandSender(threading.Thread):
         if not self.only_monitor:
             command._send(self.tibia_wid)
         self.last_cmd_ts = timestamp_ms()
+        record_cmd_delay(command)
+        record_reaction_time(command)
         self.__log_cmd(command)
 
     def is_cmd_requeued(self, command: Command) -> bool:
@@ -292,6 +347,233 @@ class CommandSender(threading.Thread):
             self.issue_cmd(cmd)
 
 
+# Tie-breaker between commands that become eligible at the same time.
+THROTTLE_BEHAVIOR_RANK = {
+    ThrottleBehavior.FORCE: 0,
+    ThrottleBehavior.REQUEUE_TOP: 1,
+    ThrottleBehavior.DROP: 2,
+    ThrottleBehavior.REQUEUE_BACK: 3,
+}
+
+# [eligible_ts, rank, seq, command], it's a list so that it can be coalesced
+# with a newer copy of the command while it's pending.
+PendingCommand = List[Any]
+
+
+class CommandScheduler(threading.Thread):
+    """Issues the commands of every type from a single thread.
+
+    Pending commands are kept in a heap keyed by the time at which their
+    throttle elapses, then by their throttle behavior and then by arrival, and
+    the thread sleeps until the command at the top of the heap is eligible.
+    Commands are throttled against the last command of the same type, just
+    like with a CommandSender per type:
+
+      - DROP commands that are throttled when sent are dropped right away.
+      - REQUEUE_TOP and REQUEUE_BACK commands wait in the heap until their
+        throttle elapses.
+      - FORCE commands are eligible immediately.
+
+    Only one command per cmd_id (and type) is ever pending, sending a command
+    whose cmd_id is pending replaces the pending copy's throttle and priority,
+    so the heap never grows past the number of distinct commands.
+
+    Commands that run in background (i.e. macros) are issued on a worker pool,
+    the commands of their type wait for them to finish.
+
+    Every time the thread wakes up it issues all of the eligible commands
+    within a single keystroke sender batch, their delays, reaction times and
+    throttle timestamps are recorded once the batch is sent.
+    """
+    MAX_PENDING_CMDS_PER_TYPE = CommandSender.MAX_QUEUE_SIZE
+
+    def __init__(
+        self,
+        tibia_wid,
+        logger: StatsLogger,
+        only_monitor: bool,
+        worker_pool: WorkerPool = None,
+        keystroke_sender: KeystrokeSender = None,
+    ):
+        super().__init__(daemon=True)
+        self.tibia_wid = tibia_wid
+        self.logger = logger
+        self.only_monitor = only_monitor
+        self.keystroke_sender = keystroke_sender or KeystrokeSender()
+        self.worker_pool = worker_pool or WorkerPool(len(CommandType.types()))
+        self.cond = threading.Condition()
+        self.pending_cmds: List[PendingCommand] = []
+        self.seq = itertools.count()
+        self.last_cmd_ts: Dict[str, int] = {}
+        self.pending_cmd_counts: Dict[str, int] = {}
+        self.pending_cmds_by_id: Dict[Tuple[str, str], PendingCommand] = {}
+        self.busy_cmd_types: Set[str] = set()
+        self.blocked_cmds: Dict[str, List[PendingCommand]] = {}
+        self.is_stopped = False
+
+    def send(self, command: Command):
+        with self.cond:
+            if self.is_stopped:
+                return
+
+            behavior = command.throttle_behavior
+            eligible_ts = self.get_eligible_ts(command)
+            rank = THROTTLE_BEHAVIOR_RANK[behavior]
+            pending_cmd = self.pending_cmds_by_id.get(
+                (command.cmd_type, command.cmd_id)
+            )
+            if pending_cmd is not None:
+                # The pending copy keeps its place among commands that become
+                # eligible at the same time, everything else is replaced.
+                # Reaction times are measured from the first event that
+                # the pending command reacted to.
+                command.enqueued_ts = pending_cmd[3].enqueued_ts
+                if pending_cmd[3].origin_ts is not None:
+                    command.origin_ts = pending_cmd[3].origin_ts
+                pending_cmd[0] = eligible_ts
+                pending_cmd[1] = rank
+                pending_cmd[3] = command
+                heapq.heapify(self.pending_cmds)
+                self.cond.notify()
+                return
+
+            if behavior is ThrottleBehavior.DROP and eligible_ts > timestamp_ms():
+                return
+
+            pending_count = self.pending_cmd_counts.get(command.cmd_type, 0)
+            if pending_count >= CommandScheduler.MAX_PENDING_CMDS_PER_TYPE:
+                return
+            self.pending_cmd_counts[command.cmd_type] = pending_count + 1
+
+            command.enqueued_ts = time.perf_counter()
+            pending_cmd = [eligible_ts, rank, next(self.seq), command]
+            self.pending_cmds_by_id[(command.cmd_type, command.cmd_id)] = pending_cmd
+            heapq.heappush(self.pending_cmds, pending_cmd)
+            self.cond.notify()
+
+    def stop(self):
+        with self.cond:
+            self.is_stopped = True
+            self.cond.notify()
+
+    def get_eligible_ts(self, command: Command) -> int:
+        if command.throttle_behavior is ThrottleBehavior.FORCE:
+            return 0
+        return self.last_cmd_ts.get(command.cmd_type, 0) + command.throttle_ms
+
+    def fetch_next_cmd(self) -> Tuple[Optional[Command], Optional[int]]:
+        """Pops the next command that can be issued, must be called while
+        holding self.cond.
+
+        Returns:
+
+            (command, None) if there is a command to issue, otherwise
+            (None, wait_ms) where wait_ms is the time until the next command
+            becomes eligible, or None if there are no eligible commands.
+        """
+        while len(self.pending_cmds) > 0:
+            pending_cmd = self.pending_cmds[0]
+            eligible_ts, _, _, cmd = pending_cmd
+            now_ms = timestamp_ms()
+            if eligible_ts > now_ms:
+                return None, eligible_ts - now_ms
+
+            heapq.heappop(self.pending_cmds)
+            if cmd.cmd_type in self.busy_cmd_types:
+                self.blocked_cmds.setdefault(cmd.cmd_type, []).append(pending_cmd)
+                continue
+
+            # Another command of the same type may have been issued since
+            # this one was queued.
+            eligible_ts = self.get_eligible_ts(cmd)
+            if eligible_ts > now_ms:
+                if cmd.throttle_behavior is ThrottleBehavior.DROP:
+                    self.__discard(cmd)
+                else:
+                    pending_cmd[0] = eligible_ts
+                    heapq.heappush(self.pending_cmds, pending_cmd)
+                continue
+
+            self.__discard(cmd)
+            return cmd, None
+
+        return None, None
+
+    def __discard(self, command: Command) -> None:
+        self.pending_cmd_counts[command.cmd_type] -= 1
+        del self.pending_cmds_by_id[(command.cmd_type, command.cmd_id)]
+
+    def issue_cmd(self, command: Command) -> None:
+        issued_cmds = []
+        with self.keystroke_sender.batch():
+            self.__issue(command, issued_cmds)
+        for issued_cmd in issued_cmds:
+            self.__record(issued_cmd)
+
+    def __issue(self, command: Command, issued_cmds: List[Command]) -> None:
+        """Commands issued by this thread are appended to issued_cmds, to be
+        recorded once the keystroke sender batch is sent."""
+        if command.runs_in_background:
+            with self.cond:
+                self.busy_cmd_types.add(command.cmd_type)
+            self.worker_pool.submit(lambda: self.__issue_in_background(command))
+        else:
+            self.__send(command)
+            issued_cmds.append(command)
+
+    def __issue_in_background(self, command: Command) -> None:
+        try:
+            self.__send(command)
+            self.__record(command)
+        finally:
+            with self.cond:
+                self.busy_cmd_types.discard(command.cmd_type)
+                for pending_cmd in self.blocked_cmds.pop(command.cmd_type, []):
+                    heapq.heappush(self.pending_cmds, pending_cmd)
+                self.cond.notify()
+
+    def __send(self, command: Command) -> None:
+        if not self.only_monitor:
+            command._send(self.tibia_wid)
+        with self.cond:
+            # Later commands of the same type in the batch are throttled
+            # against this one.
+            self.last_cmd_ts[command.cmd_type] = timestamp_ms()
+
+    def __record(self, command: Command) -> None:
+        with self.cond:
+            self.last_cmd_ts[command.cmd_type] = timestamp_ms()
+        record_cmd_delay(command)
+        record_reaction_time(command)
+        self.logger.log_action(0, "%s", command)
+
+    def run(self):
+        while True:
+            with self.cond:
+                cmd, wait_ms = self.fetch_next_cmd()
+                while cmd is None and not self.is_stopped:
+                    self.cond.wait(None if wait_ms is None else wait_ms / 1000)
+                    cmd, wait_ms = self.fetch_next_cmd()
+                if self.is_stopped:
+                    break
+
+            issued_cmds = []
+            with self.keystroke_sender.batch():
+                while cmd is not None:
+                    self.__issue(cmd, issued_cmds)
+                    with self.cond:
+                        cmd, _ = self.fetch_next_cmd()
+            # The keys are only sent when the batch exits.
+            for issued_cmd in issued_cmds:
+                self.__record(issued_cmd)
+            if len(issued_cmds) > 0 and self.keystroke_sender.is_behind():
+                self.logger.log_action(
+                    1,
+                    "Keystroke sender is behind by %s bytes",
+                    self.keystroke_sender.get_backlog_bytes(),
+                )
+
+
 class CommandProcessor:
     def __init__(
         self,
@@ -299,10 +581,17 @@ class CommandProcessor:
         logger: StatsLogger,
         only_monitor: bool,
         cmd_senders: Dict[str, CommandSender] = None,
+        cmd_scheduler: CommandScheduler = None,
+        keystroke_sender: KeystrokeSender = None,
     ):
-        self.cmd_senders = cmd_senders or CommandProcessor.gen_cmd_senders(
-            tibia_wid, logger, only_monitor
-        )
+        # When no per-type command senders are given, a single scheduler
+        # issues the commands of every type.
+        self.cmd_senders = cmd_senders
+        self.cmd_scheduler = None
+        if self.cmd_senders is None:
+            self.cmd_scheduler = cmd_scheduler or CommandScheduler(
+                tibia_wid, logger, only_monitor, keystroke_sender=keystroke_sender
+            )
         self.started = False
         self.stopped = False
 
@@ -314,7 +603,7 @@ class CommandProcessor:
             )
 
         if not self.started:
-            for sender in self.cmd_senders.values():
+            for sender in self.get_senders():
                 sender.start()
             self.started = True
 
@@ -323,12 +612,20 @@ class CommandProcessor:
             raise Exception("This command processor has not been started yet.")
 
         if not self.stopped:
-            for sender in self.cmd_senders.values():
+            for sender in self.get_senders():
                 sender.stop()
             self.stopped = True
 
+    def get_senders(self) -> List[threading.Thread]:
+        if self.cmd_scheduler is not None:
+            return [self.cmd_scheduler]
+        return list(self.cmd_senders.values())
+
     def send(self, cmd: Command):
-        self.cmd_senders[cmd.cmd_type].send(cmd)
+        if self.cmd_scheduler is not None:
+            self.cmd_scheduler.send(cmd)
+        else:
+            self.cmd_senders[cmd.cmd_type].send(cmd)
 
     @staticmethod
     def gen_cmd_senders(
@@ -378,7 +675,7 @@ class ClientInterface:
         throttle_ms: int,
         throttle_behavior: ThrottleBehavior = ThrottleBehavior.DEFAULT,
     ):
-        self.logger.log_action(2, f"cast_minor_heal {throttle_ms} ms")
+        self.logger.log_action(2, "cast_minor_heal %s ms", throttle_ms)
         self.send_keystroke_async(
             CommandType.HEAL_SPELL,
             throttle_ms,
@@ -392,7 +689,7 @@ class ClientInterface:
         throttle_ms: int,
         throttle_behavior: ThrottleBehavior = ThrottleBehavior.DEFAULT,
     ):
-        self.logger.log_action(2, f"cast_medium_heal {throttle_ms} ms")
+        self.logger.log_action(2, "cast_medium_heal %s ms", throttle_ms)
         self.send_keystroke_async(
             CommandType.HEAL_SPELL,
             throttle_ms,
@@ -407,7 +704,7 @@ class ClientInterface:
         # Requeue greater heal at the front, its important!
         throttle_behavior: ThrottleBehavior = ThrottleBehavior.REQUEUE_TOP,
     ):
-        self.logger.log_action(2, f"cast_greater_heal {throttle_ms} ms")
+        self.logger.log_action(2, "cast_greater_heal %s ms", throttle_ms)
         self.send_keystroke_async(
             CommandType.HEAL_SPELL,
             throttle_ms,
@@ -421,7 +718,7 @@ class ClientInterface:
         throttle_ms: int,
         throttle_behavior: ThrottleBehavior = ThrottleBehavior.DROP,
     ):
-        self.logger.log_action(2, f"drink_mana {throttle_ms} ms")
+        self.logger.log_action(2, "drink_mana %s ms", throttle_ms)
         self.send_keystroke_async(
             CommandType.USE_ITEM,
             throttle_ms,
@@ -435,7 +732,7 @@ class ClientInterface:
         throttle_ms: int,
         throttle_behavior: ThrottleBehavior = ThrottleBehavior.DROP,
     ):
-        self.logger.log_action(2, f"drink_greater_heal {throttle_ms} ms")
+        self.logger.log_action(2, "drink_greater_heal %s ms", throttle_ms)
         if not self.hotkeys_config.potion_greater_heal:
             raise Exception("There is no hotkey configured for hotkeys_config.potion_greater_heal")
 
@@ -452,7 +749,7 @@ class ClientInterface:
         throttle_ms: int,
         throttle_behavior: ThrottleBehavior = ThrottleBehavior.DROP,
     ):
-        self.logger.log_action(2, f"drink_medium_heal {throttle_ms} ms")
+        self.logger.log_action(2, "drink_medium_heal %s ms", throttle_ms)
         if not self.hotkeys_config.potion_medium_heal:
             raise Exception("There is no hotkey configured for hotkeys_config.potion_medium_heal")
 
@@ -469,7 +766,7 @@ class ClientInterface:
         throttle_ms: int,
         throttle_behavior: ThrottleBehavior = ThrottleBehavior.DROP,
     ):
-        self.logger.log_action(2, f"drink_minor_heal {throttle_ms} ms")
+        self.logger.log_action(2, "drink_minor_heal %s ms", throttle_ms)
         if not self.hotkeys_config.potion_minor_heal:
             raise Exception("There is no hotkey configured for hotkeys_config.potion_minor_heal")
 
@@ -486,7 +783,7 @@ class ClientInterface:
         throttle_ms: int,
         throttle_behavior: ThrottleBehavior = ThrottleBehavior.DROP,
     ):
-        self.logger.log_action(2, f"cast_haste {throttle_ms} ms")
+        self.logger.log_action(2, "cast_haste %s ms", throttle_ms)
         self.send_keystroke_async(
             CommandType.UTILITY_SPELL,
             throttle_ms,
@@ -500,7 +797,7 @@ class ClientInterface:
         throttle_ms: int = 250,
         throttle_behavior: ThrottleBehavior = ThrottleBehavior.DROP,
     ):
-        self.logger.log_action(2, f"equip_ring {throttle_ms} ms")
+        self.logger.log_action(2, "equip_ring %s ms", throttle_ms)
         self.send_keystroke_async(
             CommandType.EQUIP_ITEM,
             throttle_ms,
@@ -514,7 +811,7 @@ class ClientInterface:
         throttle_ms: int = 250,
         throttle_behavior: ThrottleBehavior = ThrottleBehavior.DROP,
     ):
-        self.logger.log_action(2, f"toggle_emergency_ring {throttle_ms} ms")
+        self.logger.log_action(2, "toggle_emergency_ring %s ms", throttle_ms)
         self.send_keystroke_async(
             CommandType.EQUIP_ITEM,
             throttle_ms,
@@ -529,7 +826,7 @@ class ClientInterface:
         throttle_behavior: ThrottleBehavior = ThrottleBehavior.DROP,
     ):
         if self.hotkeys_config.toggle_tank_ring:
-            self.logger.log_action(2, f"toggle_tank_ring {throttle_ms} ms")
+            self.logger.log_action(2, "toggle_tank_ring %s ms", throttle_ms)
             self.send_keystroke_async(
                 CommandType.EQUIP_ITEM,
                 throttle_ms,
@@ -547,7 +844,7 @@ class ClientInterface:
         throttle_ms: int = 250,
         throttle_behavior: ThrottleBehavior = ThrottleBehavior.DROP,
     ):
-        self.logger.log_action(2, f"equip_amulet {throttle_ms} ms")
+        self.logger.log_action(2, "equip_amulet %s ms", throttle_ms)
         self.send_keystroke_async(
             CommandType.EQUIP_ITEM,
             throttle_ms,
@@ -561,7 +858,7 @@ class ClientInterface:
         throttle_ms: int = 250,
         throttle_behavior: ThrottleBehavior = ThrottleBehavior.DROP,
     ):
-        self.logger.log_action(2, f"toggle_emergency_amulet {throttle_ms} ms")
+        self.logger.log_action(2, "toggle_emergency_amulet %s ms", throttle_ms)
         self.send_keystroke_async(
             CommandType.EQUIP_ITEM,
             throttle_ms,
@@ -576,7 +873,7 @@ class ClientInterface:
         throttle_behavior: ThrottleBehavior = ThrottleBehavior.DROP,
     ):
         if self.hotkeys_config.toggle_tank_amulet:
-            self.logger.log_action(2, f"toggle_tank_amulet {throttle_ms} ms")
+            self.logger.log_action(2, "toggle_tank_amulet %s ms", throttle_ms)
             self.send_keystroke_async(
                 CommandType.EQUIP_ITEM,
                 throttle_ms,
@@ -594,7 +891,7 @@ class ClientInterface:
         throttle_ms: int = 250,
         throttle_behavior: ThrottleBehavior = ThrottleBehavior.REQUEUE_BACK,
     ):
-        self.logger.log_action(2, f"eat_food {throttle_ms} ms")
+        self.logger.log_action(2, "eat_food %s ms", throttle_ms)
         self.send_keystroke_async(
             CommandType.USE_ITEM,
             throttle_ms,
@@ -609,7 +906,7 @@ class ClientInterface:
         # Requeue magic shield at the top of the queue every time
         throttle_behavior: ThrottleBehavior = ThrottleBehavior.REQUEUE_TOP,
     ):
-        self.logger.log_action(2, f"cast_magic_shield {throttle_ms} ms")
+        self.logger.log_action(2, "cast_magic_shield %s ms", throttle_ms)
         self.send_keystroke_async(
             CommandType.UTILITY_SPELL,
             throttle_ms,
@@ -625,7 +922,7 @@ class ClientInterface:
         # but it should be put behind any other pending actions
         throttle_behavior: ThrottleBehavior = ThrottleBehavior.REQUEUE_BACK,
     ):
-        self.logger.log_action(2, f"cancel_magic_shield {throttle_ms} ms")
+        self.logger.log_action(2, "cancel_magic_shield %s ms", throttle_ms)
         self.send_keystroke_async(
             CommandType.UTILITY_SPELL,
             throttle_ms,
@@ -642,15 +939,15 @@ class ClientInterface:
         cmd_id: str = None,
         throttle_behavior: ThrottleBehavior = ThrottleBehavior.DEFAULT,
     ):
-        self.logger.log_action(2, f"execute_macro {throttle_ms} ms")
+        self.logger.log_action(2, "execute_macro %s ms", throttle_ms)
         self.cmd_processor.send(
             MacroCommand(cmd_type, throttle_ms, macro_fn, cmd_id, throttle_behavior)
         )
 
 
 class FakeLogger:
-    def log_action(self, debug_level: int, msg: str):
-        print(f"{debug_level}, {msg}")
+    def log_action(self, debug_level: int, fmt: str, *args: Any):
+        print(f"{debug_level}, {fmt % args}")
 
 
 class FakeCommandSender(CommandSender):
@@ -1,10 +1,15 @@
 #!/usr/bin/env python3.8
 import argparse
+import fcntl
 import os
 import subprocess
+import termios
+import threading
 import time
 
+from contextlib import contextmanager
 from types import SimpleNamespace
+from typing import Iterator, List
 
 parser = argparse.ArgumentParser(
     description=
@@ -13,17 +18,40 @@ parser.add_argument("wid", type=str, help="Window id to send keystrokes to.")
 parser.add_argument("key", type=str, help="Key to send every 1 second")
 
 
+XDOTOOL_ARGS = ["/usr/bin/xdotool", "-"]
+# Unread bytes in xdotool's stdin at which it's considered to be behind, a
+# key command is ~30 bytes long.
+MAX_BACKLOG_BYTES = 256
+
+
 class KeystrokeSender:
     def send_key(self, key: str) -> None:
         raise Exception("This needs to be implemented by a child class")
 
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Keys sent by the current thread within this context may be held
+        and sent all at once when it exits."""
+        yield
+
+    def get_backlog_bytes(self) -> int:
+        """Number of bytes of keystrokes sent but not processed yet, 0 if
+        unknown."""
+        return 0
+
+    def is_behind(self) -> bool:
+        """Whether keystrokes are being sent faster than they're processed."""
+        return False
+
 
 class XdotoolProcess:
-    def __init__(self):
+    def __init__(self, args: List[str] = XDOTOOL_ARGS):
+        self.args = args
         self.proc = None
+        self.lock = threading.Lock()
 
     def start(self):
-        self.proc = subprocess.Popen(["/usr/bin/xdotool", "-"],
+        self.proc = subprocess.Popen(self.args,
                                      text=True,
                                      encoding="UTF-8",
                                      stdin=subprocess.PIPE,
@@ -34,11 +62,28 @@ class XdotoolProcess:
             self.proc.kill()
 
     def send_cmd(self, cmd: str) -> None:
+        self.send_cmds([cmd])
+
+    def send_cmds(self, cmds: List[str]) -> None:
+        """Sends the commands with a single write."""
+        with self.lock:
+            if not self.is_running():
+                self.restart()
+
+            self.proc.stdin.write(''.join(f'{cmd}{os.linesep}' for cmd in cmds))
+            self.proc.stdin.flush()
+
+    def get_backlog_bytes(self) -> int:
+        """Number of bytes written to xdotool that it hasn't read yet."""
         if not self.is_running():
-            self.restart()
+            return 0
+        unread = bytearray(4)
+        fcntl.ioctl(self.proc.stdin.fileno(), termios.FIONREAD, unread)
+        return int.from_bytes(unread, byteorder='little')
 
-        self.proc.stdin.write(f'{cmd}{os.linesep}')
-        self.proc.stdin.flush()
+    def is_behind(self, max_backlog_bytes: int = MAX_BACKLOG_BYTES) -> bool:
+        """Whether xdotool is falling behind on the commands sent to it."""
+        return self.get_backlog_bytes() >= max_backlog_bytes
 
     def is_running(self) -> bool:
         return self.proc and self.proc.poll() is None
@@ -53,9 +98,37 @@ class XdotoolKeystrokeSender(KeystrokeSender):
     def __init__(self, xdotool_proc: XdotoolProcess, window_id: str):
         self.xdotool_proc = xdotool_proc
         self.window_id = window_id
+        self.local = threading.local()
 
     def send_key(self, key: str) -> None:
-        self.xdotool_proc.send_cmd(f"key --window {self.window_id} {key}")
+        cmd = f"key --window {self.window_id} {key}"
+        batch_cmds = getattr(self.local, "batch_cmds", None)
+        if batch_cmds is None:
+            self.xdotool_proc.send_cmd(cmd)
+        else:
+            batch_cmds.append(cmd)
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        if getattr(self.local, "batch_cmds", None) is not None:
+            # Nested batches are sent with the outermost one.
+            yield
+            return
+
+        self.local.batch_cmds = []
+        try:
+            yield
+        finally:
+            batch_cmds = self.local.batch_cmds
+            self.local.batch_cmds = None
+            if len(batch_cmds) > 0:
+                self.xdotool_proc.send_cmds(batch_cmds)
+
+    def get_backlog_bytes(self) -> int:
+        return self.xdotool_proc.get_backlog_bytes()
+
+    def is_behind(self) -> bool:
+        return self.xdotool_proc.is_behind()
 
 
 def main(args: argparse.Namespace):
@@ -157,8 +157,8 @@ if __name__ == "__main__":
     )
 
     class MockLogger:
-        def log_action(self, level, msg):
-            print(str(level), msg)
+        def log_action(self, level, fmt, *args):
+            print(str(level), fmt % args)
 
     class MockKeystrokeSender(KeystrokeSender):
         def send_key(self, key: str):
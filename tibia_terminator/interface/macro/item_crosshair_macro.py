@@ -6,7 +6,6 @@ from threading import Lock
 from typing import Any, Callable, List, Tuple, Iterable, Optional
 
 import keyboard
-import pyautogui
 
 from tibia_terminator.schemas.item_crosshair_macro_config_schema import (
     ItemCrosshairMacroConfig,
@@ -15,6 +14,7 @@ from tibia_terminator.schemas.item_crosshair_macro_config_schema import (
 )
 from tibia_terminator.interface.macro.macro import (
     ClientMacro,
+    get_input_backend,
     UPPER_LEFT_SQM,
     UPPER_SQM,
     UPPER_RIGHT_SQM,
@@ -70,13 +70,14 @@ def gen_click_action_fn(hotkey: str, directional_lock: Lock, *args, **kwargs):
         # Make sure we only execute this command once at a time, otherwise
         # the character will walk into the rune target in race conditions.
         if directional_lock.acquire(blocking=False):
-            prev_pause = pyautogui.PAUSE
-            pyautogui.PAUSE = PYAUTOGUI_ITEM_CROSSHAIR_PAUSE
+            input_backend = get_input_backend()
+            prev_pause = input_backend.PAUSE
+            input_backend.PAUSE = PYAUTOGUI_ITEM_CROSSHAIR_PAUSE
             try:
-                pyautogui.press([hotkey])
-                pyautogui.leftClick()
+                input_backend.press([hotkey])
+                input_backend.leftClick()
             finally:
-                pyautogui.PAUSE = prev_pause
+                input_backend.PAUSE = prev_pause
                 directional_lock.release()
 
     return click_action
@@ -94,13 +95,14 @@ def gen_click_behind_fn(
 
     def click_behind(*args, **kwargs):
         if directional_lock.acquire(blocking=False):
-            prev_pause = pyautogui.PAUSE
-            pyautogui.PAUSE = PYAUTOGUI_ITEM_CROSSHAIR_PAUSE
+            input_backend = get_input_backend()
+            prev_pause = input_backend.PAUSE
+            input_backend.PAUSE = PYAUTOGUI_ITEM_CROSSHAIR_PAUSE
             try:
-                pyautogui.hotkey(item_key)
-                pyautogui.leftClick(x, y)
+                input_backend.hotkey(item_key)
+                input_backend.leftClick(x, y)
             finally:
-                pyautogui.PAUSE = prev_pause
+                input_backend.PAUSE = prev_pause
                 directional_lock.release()
 
     return click_behind
@@ -197,8 +199,8 @@ if __name__ == "__main__":
 
 
     class MockLogger:
-        def log_action(self, level, msg):
-            print(str(level), msg)
+        def log_action(self, level, fmt, *args):
+            print(str(level), fmt % args)
 
 
     class MockKeystrokeSender(KeystrokeSender):
@@ -2,7 +2,6 @@
 
 import argparse
 import keyboard
-import pyautogui
 import time
 
 from threading import Lock
@@ -10,6 +9,7 @@ from threading import Lock
 from tibia_terminator.schemas.hotkeys_config_schema import HotkeysConfig
 from tibia_terminator.interface.macro.macro import (
     ClientMacro,
+    get_input_backend,
     UPPER_LEFT_SQM,
     UPPER_SQM,
     UPPER_RIGHT_SQM,
@@ -114,36 +114,38 @@ class LootMacro(ClientMacro):
 
     def _wait_for_mouse_pos(self, x: int, y: int, max_attempts = 10) -> bool:
         poll_freq = 1 / 1000 # 0.1 ms
-        curr_x, curr_y = pyautogui.position()
+        input_backend = get_input_backend()
+        curr_x, curr_y = input_backend.position()
         attempt_count = 1
         while curr_x != x and curr_y != y and attempt_count < max_attempts:
             time.sleep(poll_freq)
-            curr_x, curr_y = pyautogui.position()
+            curr_x, curr_y = input_backend.position()
             attempt_count += 1
 
         return curr_x == x and curr_y == y
 
     def _do_loot(self):
-        prev_pause = pyautogui.PAUSE
-        pyautogui.PAUSE = PYAUTOGUI_LOOT_PAUSE_SEC
+        input_backend = get_input_backend()
+        prev_pause = input_backend.PAUSE
+        input_backend.PAUSE = PYAUTOGUI_LOOT_PAUSE_SEC
         pressed_direction_key = self.get_pressed_direction_key()
         try:
             if self.loot_modifier:
-                pyautogui.keyDown(self.loot_modifier)
+                input_backend.keyDown(self.loot_modifier)
                 time.sleep(SLEEP_LOOT_MODIFIER_SEC)
             for sqm_x, sqm_y in LOOT_SQMS:
                 sqm_x += self.x_offset
-                pyautogui.moveTo(sqm_x, sqm_y)
+                input_backend.moveTo(sqm_x, sqm_y)
                 if self._wait_for_mouse_pos(sqm_x, sqm_y):
-                    pyautogui.click(button=self.loot_button)
+                    input_backend.click(button=self.loot_button)
 
             if self.loot_modifier:
-                pyautogui.keyUp(self.loot_modifier)
+                input_backend.keyUp(self.loot_modifier)
                 time.sleep(SLEEP_LOOT_MODIFIER_SEC)
             if pressed_direction_key:
-                pyautogui.keyDown(pressed_direction_key)
+                input_backend.keyDown(pressed_direction_key)
         finally:
-            pyautogui.PAUSE = prev_pause
+            input_backend.PAUSE = prev_pause
 
 
     def _client_action(self, tibia_wid):
@@ -155,8 +157,8 @@ class LootMacro(ClientMacro):
 
 
 class MockLogger:
-    def log_action(self, level, msg):
-        print(str(level), msg)
+    def log_action(self, level, fmt, *args):
+        print(str(level), fmt % args)
 
 
 class MockKeystrokeSender(KeystrokeSender):
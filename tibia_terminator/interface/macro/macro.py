@@ -3,7 +3,7 @@
 import keyboard
 import pyautogui
 
-from typing import List, Set, Dict, NamedTuple
+from typing import Any, List, Set, Dict, NamedTuple
 from keyboard import KeyboardEvent
 
 from tibia_terminator.interface.client_interface import (
@@ -13,6 +13,19 @@ from tibia_terminator.interface.client_interface import (
 
 pyautogui.PAUSE = 0.02
 
+# Injects the keyboard and mouse input of macros, it can be pyautogui or
+# anything with the same interface, e.g. XTestInput.
+_input_backend: Any = pyautogui
+
+
+def get_input_backend() -> Any:
+    return _input_backend
+
+
+def set_input_backend(input_backend: Any) -> None:
+    global _input_backend
+    _input_backend = input_backend
+
 CENTER_Y = 385
 CENTER_X = 960
 SQM_LEN = 55
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3.8
+"""Keyboard and mouse input injected through the XTest extension.
+
+Events are injected in-process, on a dedicated display connection, instead of
+going through xdotool or pyautogui. Like with pyautogui, events are delivered
+to whichever window has the focus (or is under the pointer).
+"""
+
+import threading
+import time
+
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import Xlib.X
+import Xlib.XK
+import Xlib.display
+import Xlib.ext.xtest  # noqa: F401, registers the xtest_* display methods
+
+from tibia_terminator.interface.keystroke_sender import KeystrokeSender
+
+# Key names used by pyautogui and our hotkey configs that aren't X keysym names.
+KEYSYM_ALIASES: Dict[str, str] = {
+    "alt": "Alt_L",
+    "altleft": "Alt_L",
+    "altright": "Alt_R",
+    "backspace": "BackSpace",
+    "ctrl": "Control_L",
+    "ctrlleft": "Control_L",
+    "ctrlright": "Control_R",
+    "del": "Delete",
+    "delete": "Delete",
+    "down": "Down",
+    "end": "End",
+    "enter": "Return",
+    "esc": "Escape",
+    "escape": "Escape",
+    "home": "Home",
+    "insert": "Insert",
+    "left": "Left",
+    "pagedown": "Next",
+    "pageup": "Prior",
+    "return": "Return",
+    "right": "Right",
+    "shift": "Shift_L",
+    "shiftleft": "Shift_L",
+    "shiftright": "Shift_R",
+    "space": "space",
+    "tab": "Tab",
+    "up": "Up",
+}
+
+MOUSE_BUTTONS: Dict[str, int] = {
+    "left": 1,
+    "primary": 1,
+    "middle": 2,
+    "right": 3,
+    "secondary": 3,
+}
+
+
+def parse_keysym(key: str) -> int:
+    """Parses key names the way xdotool (X keysym names, e.g. Return, F1) and
+    pyautogui (e.g. enter, f1, shiftleft) name them."""
+    alias = KEYSYM_ALIASES.get(key.lower())
+    if alias is not None:
+        return Xlib.XK.string_to_keysym(alias)
+
+    for name in (key, key.upper(), key.capitalize()):
+        keysym = Xlib.XK.string_to_keysym(name)
+        if keysym != Xlib.X.NoSymbol:
+            return keysym
+
+    if len(key) == 1 and ord(key) < 0x100:
+        # Latin-1 keysyms are the same as their code points.
+        return ord(key)
+
+    raise Exception(f"Unknown key: {key}")
+
+
+def split_key_combo(key: str) -> List[str]:
+    """Splits xdotool-style key combos, e.g. Shift_L+End."""
+    if len(key) == 1:
+        return [key]
+    return key.split("+")
+
+
+def parse_button(button: Union[str, int]) -> int:
+    if isinstance(button, int):
+        return button
+    if button.isdigit():
+        return int(button)
+    return MOUSE_BUTTONS[button.lower()]
+
+
+class XTestInput:
+    """Injects keyboard and mouse events with XTest.
+
+    The method names are the same as pyautogui's, so that it can be used in
+    place of pyautogui by the macros, including the PAUSE attribute: the
+    number of seconds to wait after each call.
+    """
+
+    def __init__(self, display_name: Optional[str] = None, pause_sec: float = 0):
+        self.display = Xlib.display.Display(display_name)
+        if not self.display.has_extension("XTEST"):
+            self.display.close()
+            raise Exception("The X server does not support the XTEST extension.")
+        self.root = self.display.screen().root
+        self.keycodes: Dict[int, Tuple[int, bool]] = {}
+        self.lock = threading.RLock()
+        self.PAUSE = pause_sec
+
+    def close(self):
+        with self.lock:
+            self.display.close()
+
+    def __pause(self):
+        if self.PAUSE > 0:
+            time.sleep(self.PAUSE)
+
+    def get_keycode(self, key: str) -> Tuple[int, bool]:
+        """Returns the keycode of the key and whether it needs shift."""
+        keysym = parse_keysym(key)
+        keycode = self.keycodes.get(keysym)
+        if keycode is None:
+            code = self.display.keysym_to_keycode(keysym)
+            if code == 0:
+                raise Exception(f"Key {key} is not mapped to any keycode.")
+            needs_shift = (
+                self.display.keycode_to_keysym(code, 0) != keysym
+                and self.display.keycode_to_keysym(code, 1) == keysym
+            )
+            keycode = (code, needs_shift)
+            self.keycodes[keysym] = keycode
+        return keycode
+
+    def __fake_key(self, key: str, event_type: int):
+        code, needs_shift = self.get_keycode(key)
+        shift_code, _ = self.get_keycode("Shift_L")
+        if needs_shift and event_type == Xlib.X.KeyPress:
+            self.display.xtest_fake_input(Xlib.X.KeyPress, shift_code)
+        self.display.xtest_fake_input(event_type, code)
+        if needs_shift and event_type == Xlib.X.KeyRelease:
+            self.display.xtest_fake_input(Xlib.X.KeyRelease, shift_code)
+
+    def keyDown(self, key: str):
+        with self.lock:
+            self.__fake_key(key, Xlib.X.KeyPress)
+            self.display.flush()
+        self.__pause()
+
+    def keyUp(self, key: str):
+        with self.lock:
+            self.__fake_key(key, Xlib.X.KeyRelease)
+            self.display.flush()
+        self.__pause()
+
+    def press(self, keys: Union[str, Iterable[str]]):
+        if isinstance(keys, str):
+            keys = [keys]
+        with self.lock:
+            for key in keys:
+                self.__fake_key(key, Xlib.X.KeyPress)
+                self.__fake_key(key, Xlib.X.KeyRelease)
+            self.display.flush()
+        self.__pause()
+
+    def hotkey(self, *keys: str):
+        """Presses the keys in order and releases them in reverse order."""
+        with self.lock:
+            for key in keys:
+                self.__fake_key(key, Xlib.X.KeyPress)
+            for key in reversed(keys):
+                self.__fake_key(key, Xlib.X.KeyRelease)
+            self.display.flush()
+        self.__pause()
+
+    def position(self) -> Tuple[int, int]:
+        with self.lock:
+            pointer = self.root.query_pointer()
+        return pointer.root_x, pointer.root_y
+
+    def __fake_move(self, x: int, y: int):
+        self.display.xtest_fake_input(Xlib.X.MotionNotify, x=x, y=y)
+
+    def moveTo(self, x: int, y: int):
+        with self.lock:
+            self.__fake_move(x, y)
+            self.display.flush()
+        self.__pause()
+
+    def mouseDown(self, button: Union[str, int] = "left"):
+        with self.lock:
+            self.display.xtest_fake_input(Xlib.X.ButtonPress, parse_button(button))
+            self.display.flush()
+        self.__pause()
+
+    def mouseUp(self, button: Union[str, int] = "left"):
+        with self.lock:
+            self.display.xtest_fake_input(Xlib.X.ButtonRelease, parse_button(button))
+            self.display.flush()
+        self.__pause()
+
+    def click(
+        self,
+        x: Optional[int] = None,
+        y: Optional[int] = None,
+        button: Union[str, int] = "left",
+    ):
+        with self.lock:
+            if x is not None and y is not None:
+                self.__fake_move(x, y)
+            self.display.xtest_fake_input(Xlib.X.ButtonPress, parse_button(button))
+            self.display.xtest_fake_input(Xlib.X.ButtonRelease, parse_button(button))
+            self.display.flush()
+        self.__pause()
+
+    def leftClick(self, x: Optional[int] = None, y: Optional[int] = None):
+        self.click(x, y, button="left")
+
+
+class XTestKeystrokeSender(KeystrokeSender):
+    """Sends keystrokes (and xdotool-style key combos) to the focused window."""
+
+    def __init__(self, xtest_input: XTestInput):
+        self.xtest_input = xtest_input
+
+    def send_key(self, key: str) -> None:
+        self.xtest_input.hotkey(*split_key_combo(key))
+
+
+def make_keystroke_sender(input_backend: str) -> Optional[KeystrokeSender]:
+    """Keystroke sender for the --input_backend of the tools that send keys
+    one at a time, None sends each key with its own xdotool command."""
+    if input_backend == "xtest":
+        return XTestKeystrokeSender(XTestInput())
+    return None
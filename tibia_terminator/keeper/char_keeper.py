@@ -2,7 +2,10 @@
 
 from typing import List, Dict, Optional, Union
 
-from tibia_terminator.interface.client_interface import ClientInterface
+from tibia_terminator.interface.client_interface import (
+    ClientInterface,
+    command_origin,
+)
 from tibia_terminator.interface.macro.drag_macro import DragMacro
 from tibia_terminator.schemas.hotkeys_config_schema import HotkeysConfig
 from tibia_terminator.schemas.drag_macro_config_schema import DragMacroConfig
@@ -26,6 +29,7 @@ from tibia_terminator.keeper.emergency_reporter import (
     EmergencyReporter,
     SimpleModeReporter,
 )
+from tibia_terminator.keeper.common import RefillPriority
 from tibia_terminator.keeper.equipment_keeper import EquipmentKeeper
 from tibia_terminator.keeper.hp_keeper import HpKeeper
 from tibia_terminator.keeper.emergency_magic_shield_keeper import (
@@ -409,6 +413,10 @@ class CharKeeper:
             macro.hook_hotkey()
 
     def handle_char_status(self, char_status: CharStatus):
+        with command_origin(char_status.read_ts):
+            self.__handle_char_status(char_status)
+
+    def __handle_char_status(self, char_status: CharStatus):
         # First set the emergency status, so all sub-keepers can change their
         # their behaviours accordingly.
         self.handle_emergency_status_change(char_status)
@@ -433,6 +441,20 @@ class CharKeeper:
         self.handle_equipment(char_status)
         self.handle_speed_change(char_status)
 
+    def get_tick_priority(self, char_status: CharStatus) -> RefillPriority:
+        """How urgently the char status should be checked again, i.e. the most
+        urgent priority of the hp, mana and magic shield keepers."""
+        if self.emergency_reporter.is_mode_on():
+            return RefillPriority.CRITICAL
+        if char_status.hp < 0 or char_status.mana < 0:
+            # Stats are unknown, e.g. they aren't being read.
+            return RefillPriority.DOWNTIME
+        return max(
+            self.hp_keeper.get_refill_priority(char_status),
+            self.mana_keeper.get_refill_priority(char_status),
+            self.magic_shield_keeper.get_refill_priority(char_status),
+        )
+
     def handle_emergency_status_change(self, char_status: CharStatus):
         if self.emergency_reporter.is_mode_on():
             if self.emergency_reporter.should_stop_emergency(char_status):
@@ -497,3 +519,6 @@ class NoopKeeper:
 
     def is_healthy(self, _: CharStatus) -> bool:
         return True
+
+    def get_refill_priority(self, _: CharStatus) -> RefillPriority:
+        return RefillPriority.NO_REFILL
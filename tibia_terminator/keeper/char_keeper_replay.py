@@ -0,0 +1,208 @@
+#!/usr/bin/env python3.8
+"""Replays char status traces through CharKeeper, as fast as possible.
+
+Like in the live loop, char statuses go through a CharStatusWatcher, which
+skips the keepers whose inputs didn't change and re-dispatches them on their
+resend intervals. The watcher and the keepers read a fake clock that follows
+the timestamps in the trace, and the keepers issue their commands to a fake
+client interface, so the command stream of a replay is the same one the
+keepers would've produced in the live session.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import tibia_terminator.keeper.emergency_reporter as emergency_reporter
+
+from tibia_terminator.char_configs.char_config_loader import load_configs
+from tibia_terminator.common.char_status_trace import (
+    TracedCharStatus,
+    read_char_status_trace,
+)
+from tibia_terminator.keeper.char_keeper import CharKeeper
+from tibia_terminator.keeper.char_status_watcher import CharStatusWatcher
+from tibia_terminator.schemas.hotkeys_config_schema import HotkeysConfigSchema
+
+parser = argparse.ArgumentParser(
+    description="Replays a char status trace through CharKeeper."
+)
+parser.add_argument("trace_path", help="Char status trace recorded by main.py.")
+parser.add_argument(
+    "--char_configs_path",
+    help="Directory with the .charconfig files and hotkeys_config.json.",
+    required=True,
+)
+parser.add_argument(
+    "--config_name",
+    help=(
+        "<char_name>.<battle_config_name> of the config to replay with, "
+        "defaults to the first one."
+    ),
+    default=None,
+)
+parser.add_argument(
+    "--print_commands",
+    help="Print the command stream produced by the replay.",
+    action="store_true",
+    default=False,
+)
+
+
+class FakeClock:
+    def __init__(self, now_sec: float = 0.0):
+        self.now_sec = now_sec
+
+    def time(self) -> float:
+        return self.now_sec
+
+
+@contextmanager
+def fake_time(clock: FakeClock) -> Iterator[None]:
+    """Makes the keepers read the time from the fake clock."""
+    prev_time = time.time
+    prev_emergency_reporter_time = emergency_reporter.time
+    time.time = clock.time
+    emergency_reporter.time = clock.time
+    try:
+        yield
+    finally:
+        time.time = prev_time
+        emergency_reporter.time = prev_emergency_reporter_time
+
+
+class ReplayCommand(NamedTuple):
+    # Seconds since the first char status in the trace.
+    ts_sec: float
+    name: str
+    args: Tuple[Any, ...]
+    kwargs: Dict[str, Any]
+
+    def __str__(self):
+        params = [repr(arg) for arg in self.args]
+        params += [f"{key}={value!r}" for key, value in self.kwargs.items()]
+        return f"{self.ts_sec:.3f} {self.name}({', '.join(params)})"
+
+
+class FakeClientInterface:
+    """Records every ClientInterface call instead of sending it to Tibia."""
+
+    def __init__(self, clock: FakeClock, start_sec: float = 0.0):
+        self.clock = clock
+        self.start_sec = start_sec
+        self.commands: List[ReplayCommand] = []
+
+    def __getattr__(self, name: str) -> Callable[..., None]:
+        def record_command(*args, **kwargs):
+            self.commands.append(
+                ReplayCommand(self.clock.time() - self.start_sec, name, args, kwargs)
+            )
+
+        return record_command
+
+
+class ReplayReport(NamedTuple):
+    ticks: int
+    # Keepers dispatched by the watcher, across all of the ticks.
+    dispatches: int
+    # Time spent in CharStatusWatcher.handle_char_status.
+    elapsed_sec: float
+    decisions_per_sec: float
+    # Net memory blocks allocated (and not freed) per tick.
+    allocated_blocks_per_tick: float
+    commands: List[ReplayCommand]
+
+    def gen_summary_lines(self) -> List[str]:
+        return [
+            f"Ticks: {self.ticks}",
+            f"Keeper dispatches: {self.dispatches}",
+            f"Elapsed: {self.elapsed_sec * 1000:.1f} ms",
+            f"Decisions per second: {self.decisions_per_sec:.0f}",
+            f"Allocated blocks per tick: {self.allocated_blocks_per_tick:.2f}",
+            f"Commands: {len(self.commands)}",
+        ]
+
+
+# The fake clock starts at an arbitrary time, keepers treat 0 as "never".
+REPLAY_START_SEC = 1_000_000.0
+
+
+def replay_trace(
+    trace: List[TracedCharStatus],
+    make_char_keeper: Callable[[FakeClientInterface], CharKeeper],
+) -> ReplayReport:
+    """The char keeper is made by make_char_keeper, so that every keeper
+    reads the fake clock from the start."""
+    clock = FakeClock(REPLAY_START_SEC)
+    client = FakeClientInterface(clock, REPLAY_START_SEC)
+    dispatches = 0
+    elapsed_sec = 0.0
+    allocated_blocks = 0
+    with fake_time(clock):
+        char_status_watcher = CharStatusWatcher(
+            make_char_keeper(client), clock=lambda: clock.time() * 1000
+        )
+        for ts_sec, char_status in trace:
+            clock.now_sec = REPLAY_START_SEC + ts_sec
+            start_blocks = sys.getallocatedblocks()
+            start = time.perf_counter()
+            dispatched = char_status_watcher.handle_char_status(char_status)
+            elapsed_sec += time.perf_counter() - start
+            allocated_blocks += sys.getallocatedblocks() - start_blocks
+            dispatches += len(dispatched)
+
+    ticks = len(trace)
+    return ReplayReport(
+        ticks,
+        dispatches,
+        elapsed_sec,
+        ticks / elapsed_sec if elapsed_sec > 0 else 0.0,
+        allocated_blocks / ticks if ticks > 0 else 0.0,
+        client.commands,
+    )
+
+
+def main(
+    trace_path: str,
+    char_configs_path: str,
+    config_name: Optional[str] = None,
+    print_commands: bool = False,
+):
+    hotkeys_config = HotkeysConfigSchema().loadf(
+        os.path.join(char_configs_path, "hotkeys_config.json")
+    )
+    configs = [
+        (f"{char_config.char_name}.{battle_config.config_name}", char_config, battle_config)
+        for char_config in load_configs(char_configs_path)
+        for battle_config in char_config.battle_configs
+    ]
+    if len(configs) == 0:
+        raise Exception(f"No .charconfig files found in {char_configs_path}")
+    matching_configs = [c for c in configs if config_name in (None, c[0])]
+    if len(matching_configs) == 0:
+        raise Exception(
+            f"Config {config_name} not found. Available configs: "
+            f"{[c[0] for c in configs]}"
+        )
+    _, char_config, battle_config = matching_configs[0]
+    # The trace is loaded upfront so that reading it isn't benchmarked.
+    trace = list(read_char_status_trace(trace_path))
+
+    def make_char_keeper(client: FakeClientInterface) -> CharKeeper:
+        return CharKeeper(client, char_config, battle_config, hotkeys_config)
+
+    report = replay_trace(trace, make_char_keeper)
+    if print_commands:
+        for command in report.commands:
+            print(command)
+    for line in report.gen_summary_lines():
+        print(line)
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    main(args.trace_path, args.char_configs_path, args.config_name, args.print_commands)
@@ -0,0 +1,184 @@
+"""Dispatches char status snapshots to the keepers whose inputs changed."""
+
+import time
+
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+from tibia_terminator.common.char_status import CharStatus
+from tibia_terminator.common.latency_histogram import get_latency_histograms
+from tibia_terminator.interface.client_interface import command_origin
+from tibia_terminator.keeper.char_keeper import CharKeeper
+
+# Keepers have to spam their actions until the effect takes place (e.g. a
+# heal ignored due to exhaustion), so they are re-dispatched with unchanged
+# inputs after these intervals. They're all below the shortest client
+# throttle, so repeated commands go out as often as they did before.
+VITALS_RESEND_INTERVAL_MS = 100
+EQUIPMENT_RESEND_INTERVAL_MS = 250
+HASTE_RESEND_INTERVAL_MS = 250
+
+
+def timestamp_ms() -> float:
+    return time.time() * 1000
+
+
+class WatchedKeeper(NamedTuple):
+    name: str
+    # The char status values (and modes) the keeper's decisions depend on.
+    get_inputs: Callable[[CharStatus], Tuple[Any, ...]]
+    handle: Callable[[CharStatus], None]
+    resend_interval_ms: int
+
+
+class CharStatusWatcher:
+    """Sits between the char reader and the char keeper.
+
+    Every snapshot is compared against the inputs each keeper was last
+    dispatched with, and only the keepers whose inputs changed are handled.
+    Keepers whose inputs haven't changed are still handled once their resend
+    interval elapses, which also drives the time-based behaviors, like eating
+    food and re-casting haste.
+    """
+
+    def __init__(
+        self,
+        char_keeper: CharKeeper,
+        vitals_resend_interval_ms: int = VITALS_RESEND_INTERVAL_MS,
+        equipment_resend_interval_ms: int = EQUIPMENT_RESEND_INTERVAL_MS,
+        haste_resend_interval_ms: int = HASTE_RESEND_INTERVAL_MS,
+        clock: Callable[[], float] = timestamp_ms,
+    ):
+        self.char_keeper = char_keeper
+        self.clock = clock
+        # The order is the same as in CharKeeper.handle_char_status, and it
+        # matters for the same reasons.
+        self.watched_keepers: List[WatchedKeeper] = [
+            WatchedKeeper(
+                "hp",
+                self.get_vitals_inputs,
+                char_keeper.handle_hp_change,
+                vitals_resend_interval_ms,
+            ),
+            WatchedKeeper(
+                "shield",
+                self.get_shield_inputs,
+                char_keeper.handle_shield_change,
+                vitals_resend_interval_ms,
+            ),
+            WatchedKeeper(
+                "mana",
+                self.get_vitals_inputs,
+                char_keeper.handle_mana_change,
+                vitals_resend_interval_ms,
+            ),
+            WatchedKeeper(
+                "equipment",
+                self.get_equipment_inputs,
+                char_keeper.handle_equipment,
+                equipment_resend_interval_ms,
+            ),
+            WatchedKeeper(
+                "speed",
+                self.get_speed_inputs,
+                char_keeper.handle_speed_change,
+                haste_resend_interval_ms,
+            ),
+        ]
+        self.prev_inputs: Dict[str, Tuple[Any, ...]] = {}
+        self.dispatch_timestamps: Dict[str, float] = {}
+        self.latency_histograms = get_latency_histograms()
+
+    def reset(self):
+        """Forgets the previous snapshot, so that the next one is dispatched to
+        every keeper. e.g. after loading a char config, the keepers are new."""
+        self.prev_inputs = {}
+        self.dispatch_timestamps = {}
+
+    def handle_char_status(self, char_status: CharStatus) -> List[str]:
+        """Returns the names of the keepers that were dispatched."""
+        with command_origin(char_status.read_ts):
+            return self.__handle_char_status(char_status)
+
+    def __handle_char_status(self, char_status: CharStatus) -> List[str]:
+        # The emergency status is time-based and every other keeper depends on
+        # it, so it is always handled first.
+        self.dispatch(
+            "emergency", self.char_keeper.handle_emergency_status_change, char_status
+        )
+        dispatched = []
+        for keeper in self.watched_keepers:
+            # Inputs are read right before dispatching, so that slow equipment
+            # pixels don't delay the keepers before them.
+            inputs = keeper.get_inputs(char_status)
+            if self.should_dispatch(keeper, inputs):
+                self.dispatch(keeper.name, keeper.handle, char_status)
+                self.prev_inputs[keeper.name] = inputs
+                self.dispatch_timestamps[keeper.name] = self.clock()
+                dispatched.append(keeper.name)
+        return dispatched
+
+    def dispatch(
+        self, name: str, handle: Callable[[CharStatus], None], char_status: CharStatus
+    ):
+        start = time.perf_counter()
+        try:
+            handle(char_status)
+        finally:
+            self.latency_histograms.record_ms(
+                f"keeper.{name}", (time.perf_counter() - start) * 1000
+            )
+
+    def should_dispatch(self, keeper: WatchedKeeper, inputs: Tuple[Any, ...]) -> bool:
+        if keeper.name not in self.prev_inputs:
+            return True
+        if self.prev_inputs[keeper.name] != inputs:
+            return True
+        elapsed_ms = self.clock() - self.dispatch_timestamps[keeper.name]
+        return elapsed_ms >= keeper.resend_interval_ms
+
+    def get_modes(self) -> Tuple[bool, bool, bool]:
+        return (
+            self.char_keeper.emergency_reporter.is_mode_on(),
+            self.char_keeper.tank_mode_reporter.is_mode_on(),
+            self.char_keeper.defensive_mode_reporter.is_mode_on(),
+        )
+
+    def get_vitals_inputs(self, char_status: CharStatus) -> Tuple[Any, ...]:
+        return (
+            self.get_modes(),
+            char_status.hp,
+            char_status.mana,
+            char_status.speed,
+        )
+
+    def get_shield_inputs(self, char_status: CharStatus) -> Tuple[Any, ...]:
+        return (
+            self.get_modes(),
+            char_status.hp,
+            char_status.mana,
+            char_status.magic_shield_level,
+            char_status.magic_shield_status,
+        )
+
+    def get_equipment_inputs(self, char_status: CharStatus) -> Tuple[Any, ...]:
+        return (
+            self.get_modes(),
+            char_status.normal_action_amulet,
+            char_status.emergency_action_amulet,
+            char_status.tank_action_amulet,
+            char_status.equipped_amulet,
+            char_status.normal_action_ring,
+            char_status.emergency_action_ring,
+            char_status.tank_action_ring,
+            char_status.equipped_ring,
+        )
+
+    def get_speed_inputs(self, char_status: CharStatus) -> Tuple[Any, ...]:
+        return (
+            self.get_modes(),
+            char_status.hp,
+            char_status.mana,
+            char_status.speed,
+            char_status.magic_shield_level,
+            char_status.magic_shield_status,
+        )
@@ -91,3 +91,13 @@ class ThresholdCalculator:
             return self.priority_threshold_map[RefillPriority.NO_REFILL]
 
         raise Exception("This should never happen.")
+
+    def gen_priority(self, current: int) -> RefillPriority:
+        """Same stat ranges as gen_threshold_ms, as a RefillPriority."""
+        if current <= self.stat_config.critical:
+            return RefillPriority.CRITICAL
+        if current <= (self.stat_config.hi + self.stat_config.lo) / 2:
+            return RefillPriority.HIGH_PRIORITY
+        if current <= self.stat_config.downtime:
+            return RefillPriority.DOWNTIME
+        return RefillPriority.NO_REFILL
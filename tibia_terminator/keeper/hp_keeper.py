@@ -80,5 +80,8 @@ class HpKeeper:
     def is_healthy(self, char_status: CharStatus) -> bool:
         return self.get_missing_hp(char_status.hp) < self.heal_at_missing
 
+    def get_refill_priority(self, char_status: CharStatus) -> RefillPriority:
+        return self.threshold_calculator.gen_priority(char_status.hp)
+
     def is_critical_hp(self, current_hp: int) -> bool:
         return current_hp <= self.emergency_hp_threshold
@@ -136,6 +136,11 @@ class KnightPotionKeeper:
         else:
             self.drink_mana_potion(char_status)
 
+    def get_refill_priority(self, char_status: CharStatus) -> RefillPriority:
+        # potions refill both hp and mana
+        return max(self.priorities_strategy.get_hp_priority(char_status),
+                   self.priorities_strategy.get_mana_priority(char_status))
+
     def drink_hp_potion(self, refill_priority: RefillPriority,
                         char_status: CharStatus) -> bool:
         threshold_ms = self.get_threshold_ms(char_status.hp, self.hp_config)
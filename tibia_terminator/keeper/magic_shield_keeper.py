@@ -2,6 +2,7 @@
 
 import time
 from tibia_terminator.common.char_status import CharStatus
+from tibia_terminator.keeper.common import RefillPriority
 from tibia_terminator.reader.equipment_reader import MagicShieldStatus
 
 MAGIC_SHIELD_DURATION_SECS = 180
@@ -49,6 +50,12 @@ class MagicShieldKeeper:
             not self.should_cast(char_status)
         )
 
+    def get_refill_priority(self, char_status: CharStatus) -> RefillPriority:
+        if (self.should_cast(char_status) and
+                char_status.magic_shield_status is MagicShieldStatus.OFF_COOLDOWN):
+            return RefillPriority.HIGH_PRIORITY
+        return RefillPriority.NO_REFILL
+
     def should_cast(self, char_status: CharStatus):
         # Do not cast magic shield if mana is at less than or equal to 150% HP.
         # In that case we have better chances casting healing spells.
@@ -82,3 +82,6 @@ class ManaKeeper:
 
     def get_threshold_ms(self, current_mana: int) -> int:
         return self.threshold_calculator.gen_threshold_ms(current_mana)
+
+    def get_refill_priority(self, char_status: CharStatus) -> RefillPriority:
+        return self.threshold_calculator.gen_priority(char_status.mana)
@@ -7,6 +7,7 @@ from typing import Callable, Optional
 
 from tibia_terminator.interface.client_interface import ClientInterface
 from tibia_terminator.common.char_status import CharStatus
+from tibia_terminator.keeper.common import RefillPriority
 from tibia_terminator.keeper.emergency_reporter import SimpleModeReporter
 
 
@@ -51,6 +52,11 @@ class ProtectorKeeper:
     def is_healthy(self, _: CharStatus) -> bool:
         return not self.should_cast(_)
 
+    def get_refill_priority(self, _: CharStatus) -> RefillPriority:
+        if self.should_cast(_):
+            return RefillPriority.HIGH_PRIORITY
+        return RefillPriority.NO_REFILL
+
     def should_cast(self, _: Optional[CharStatus] = None) -> bool:
         now = self.timestamp_sec_fn()
         return (now - self.last_cast_ts >= CAST_FREQUENCY_SEC and
@@ -7,7 +7,7 @@ import sys
 
 from argparse import ArgumentParser, Namespace
 from collections import deque
-from typing import List, Iterable, NamedTuple, Optional, Any, Union
+from typing import List, Iterable, NamedTuple, Optional, Any, Tuple, Union
 
 from tibia_terminator.char_configs.char_config_loader import load_configs
 from tibia_terminator.schemas.reader.interface_config_schema import (
@@ -21,7 +21,10 @@ from tibia_terminator.schemas.hotkeys_config_schema import (
 from tibia_terminator.schemas.char_config_schema import BattleConfig, CharConfig
 from tibia_terminator.schemas.app_config_schema import AppConfigsSchema, AppConfig
 from tibia_terminator.common.char_status import CharStatus, CharStatusAsync
+from tibia_terminator.common.char_status_trace import CharStatusRecorder
+from tibia_terminator.common.latency_histogram import get_latency_histograms
 from tibia_terminator.common.logger import set_debug_level, StatsLogger
+from tibia_terminator.common.tick_scheduler import TickScheduler
 from tibia_terminator.interface.client_interface import (
     ClientInterface,
     CommandProcessor,
@@ -31,7 +34,14 @@ from tibia_terminator.interface.keystroke_sender import (
     XdotoolKeystrokeSender,
 )
 from tibia_terminator.interface.macro.loot_macro import LootMacro
+from tibia_terminator.interface.macro.macro import set_input_backend
+from tibia_terminator.interface.xtest_input import (
+    XTestInput,
+    XTestKeystrokeSender,
+)
 from tibia_terminator.keeper.char_keeper import CharKeeper
+from tibia_terminator.keeper.char_status_watcher import CharStatusWatcher
+from tibia_terminator.keeper.common import RefillPriority
 from tibia_terminator.reader.char_reader38 import CharReader38 as CharReader
 from tibia_terminator.reader.equipment_reader import EquipmentReader
 from tibia_terminator.reader.memory_reader38 import MemoryReader38 as MemoryReader
@@ -41,6 +51,8 @@ from tibia_terminator.view.view_renderer import (
     PausedView,
     RunView,
     ConfigSelectionView,
+    RunViewState,
+    gen_run_view_state,
 )
 from tibia_terminator.schemas.app_status_schema import (
     AppStatus,
@@ -115,6 +127,35 @@ def build_parser(
         type=str,
         required=True,
     )
+    parser.add_argument(
+        "--input_backend",
+        help=("How keystrokes and macro input are sent to Tibia. xdotool sends"
+              " keystrokes to the Tibia window through an xdotool process,"
+              " xtest injects them in-process into the focused window."),
+        choices=["xdotool", "xtest"],
+        default="xdotool",
+    )
+    parser.add_argument(
+        "--latency_histograms_path",
+        help=("File where the latency histograms of the tick pipeline stages"
+              " are written (as JSON) on exit."),
+        type=str,
+        default=None,
+    )
+    parser.add_argument(
+        "--char_status_trace_path",
+        help=("File where the char status of every tick in the running state is"
+              " recorded, to be replayed with keeper/char_keeper_replay.py."),
+        type=str,
+        default=None,
+    )
+    parser.add_argument(
+        "--action_log_path",
+        help=("File where the latest action log entries are spilled (in binary)"
+              " on exit, for postmortems."),
+        type=str,
+        default=None,
+    )
     return parser
 
 
@@ -122,8 +163,8 @@ SPACE_KEYCODE_A = 263
 SPACE_KEYCODE_B = 32
 ENTER_KEYCODE = 10
 ESCAPE_KEY = 27
-LOOP_FREQ_MS = 50
 AVG_LOOP_TIME_SAMPLE_SIZE = 50
+LATENCY_LINES_REFRESH_MS = 1000
 
 RUNNING_STATE_MAIN_OPTIONS_MSG = (
     "[Space]: Pause, [Esc]: Exit, [Enter]: Config selection.")
@@ -166,9 +207,11 @@ class TibiaTerminator:
         enable_magic_shield: bool = True,
         enable_speed: bool = True,
         only_monitor: bool = False,
+        char_status_recorder: Optional[CharStatusRecorder] = None,
     ):
         self.tibia_wid = tibia_wid
         self.char_keeper = char_keeper
+        self.char_status_watcher = CharStatusWatcher(char_keeper)
         self.char_reader = char_reader
         self.app_config = app_config
         self.char_config_entries = list(self.gen_config_entries(char_configs))
@@ -178,6 +221,7 @@ class TibiaTerminator:
         self.stats_logger = stats_logger
         self.view_renderer = view_renderer
         self.cmd_processor = cmd_processor
+        self.char_status_recorder = char_status_recorder
 
         self.app_status_file = app_status_file
         app_status = self.load_app_status()
@@ -199,12 +243,18 @@ class TibiaTerminator:
         self.loop_times = deque([0], AVG_LOOP_TIME_SAMPLE_SIZE)
         self.loop_times_sum = 0
         self.avg_loop_time_ms = 0
+        self.latency_histograms = get_latency_histograms()
+        self.latency_lines_ts = 0.0
+        self.tick_scheduler = TickScheduler()
+        # Priority of the last char status handled in the running state.
+        self.tick_priority: Optional[RefillPriority] = None
 
     def load_config(self, config_name: str) -> bool:
         for config in self.char_config_entries:
             if config.name == config_name:
                 self.char_keeper.load_char_config(config.char_config,
                                                   config.battle_config)
+                self.char_status_watcher.reset()
                 return True
         return False
 
@@ -265,6 +315,7 @@ class TibiaTerminator:
         if self.enable_magic_shield:
             self.char_reader.init_magic_shield_address(magic_shield_address)
 
+        self.char_reader.open()
         self.equipment_reader.open()
         self.view_renderer.start()
         self.cmd_processor.start()
@@ -278,7 +329,6 @@ class TibiaTerminator:
                 self.enter_next_app_state(initial_state)
 
             while self.app_state != AppState.EXIT:
-                start_ms = time.time() * 1000
                 keycode = self.cliwin.getch()
                 next_state = self.get_next_app_state(keycode)
                 self.enter_next_app_state(next_state)
@@ -292,12 +342,10 @@ class TibiaTerminator:
                 elif self.app_state == AppState.CONFIG_SELECTION:
                     self.handle_config_selection_state()
 
-                end_ms = time.time() * 1000
                 # Throttle loop frequency
-                loop_wait_ms = LOOP_FREQ_MS - (end_ms - start_ms)
-                if loop_wait_ms > 0:
-                    time.sleep(loop_wait_ms / 1000)
+                self.tick_scheduler.wait_next_tick(self.get_tick_priority())
         finally:
+            self.char_reader.close()
             self.equipment_reader.close()
             self.view_renderer.stop()
             self.cmd_processor.stop()
@@ -355,47 +403,67 @@ class TibiaTerminator:
         self.loot_macro.hook_hotkey()
         self.char_keeper.hook_macros()
         self.char_keeper.unhook_drag_macros()
-        self.view = RunView()
+        # The char status may have changed arbitrarily while not running.
+        self.char_status_watcher.reset()
+        self.view = RunView(self.stats_logger.action_log)
         self.view.title = self.gen_title()
         self.view.main_options = RUNNING_STATE_MAIN_OPTIONS_MSG
         self.stats_logger.run_view = self.view
         self.view_renderer.change_views(self.view)
 
-    def gen_char_status(self, view: RunView) -> CharStatus:
+    def gen_char_status(self) -> CharStatus:
+        # Stamped before the reads are issued, so that reaction times include
+        # the time it takes to read the char status.
+        read_ts = time.perf_counter()
         return CharStatusAsync(
             self.char_reader.get_stats(),
-            self.equipment_reader.get_equipment_status(
-                emergency_action_amulet_cb=view.
-                set_emergency_action_amulet,
-                emergency_action_ring_cb=view.set_emergency_action_ring,
-                tank_action_amulet_cb=view.set_tank_action_amulet,
-                tank_action_ring_cb=view.set_tank_action_ring,
-                equipped_amulet_cb=view.set_equipped_amulet,
-                equipped_ring_cb=view.set_equipped_ring,
-                magic_shield_status_cb=view.set_magic_shield_status,
-                normal_action_amulet_cb=view.set_normal_action_amulet,
-                normal_action_ring_cb=view.set_normal_action_ring,
-            ),
+            self.equipment_reader.get_equipment_status(),
+            read_ts,
         )
 
     def handle_running_state(self, view: RunView):
         start_ms = int(time.time() * 1000)
-        char_status = self.gen_char_status(view)
-        self.char_keeper.handle_char_status(char_status)
+        start = time.perf_counter()
+        char_status = self.gen_char_status()
+        self.char_status_watcher.handle_char_status(char_status)
+        self.tick_priority = self.char_keeper.get_tick_priority(char_status)
         self.equipment_reader.cancel_pending_futures()
-        # implicitly waits for all FutureValue objects, since it
-        # tries to fetch all values in order to print to screen
-        view.set_char_stats(char_status)
-        view.set_active_mode(self.char_keeper.equipment_keeper.get_next_mode())
         end_ms = int(time.time() * 1000)
-        self.add_elapsed_loop_time(view, end_ms - start_ms)
+        self.latency_histograms.record_ms("tick", (time.perf_counter() - start) * 1000)
+        self.add_elapsed_loop_time(end_ms - start_ms)
+        # The view state is published once per tick, equipment values that
+        # weren't read in this tick keep their previous value.
+        view.publish(
+            gen_run_view_state(
+                view.state,
+                char_status,
+                active_mode=str(self.char_keeper.equipment_keeper.get_next_mode()),
+                debug_line_1=f"Avg loop time: {self.avg_loop_time_ms} ms",
+                latency_lines=self.refresh_latency_lines(view.state, end_ms),
+            )
+        )
+        if self.char_status_recorder is not None:
+            self.char_status_recorder.record(char_status)
+
+    def refresh_latency_lines(self, state: RunViewState, now_ms: int) -> Tuple[str, ...]:
+        if now_ms - self.latency_lines_ts >= LATENCY_LINES_REFRESH_MS:
+            self.latency_lines_ts = now_ms
+            return tuple(self.latency_histograms.gen_summary_lines(worst_first=True))
+        return state.latency_lines
+
+    def get_tick_priority(self) -> Optional[RefillPriority]:
+        if self.app_state == AppState.RUNNING:
+            return self.tick_priority
+        if self.app_state == AppState.CONFIG_SELECTION:
+            # Keep typing responsive, one key is handled per tick.
+            return RefillPriority.DOWNTIME
+        # Idle, there is no char status to keep.
+        return None
 
-    def add_elapsed_loop_time(self, view: RunView, elapsed_ms: int):
+    def add_elapsed_loop_time(self, elapsed_ms: int):
         self.loop_times_sum += elapsed_ms - self.loop_times[0]
         self.loop_times.append(elapsed_ms)
         self.avg_loop_time_ms = int(self.loop_times_sum / len(self.loop_times))
-        view.set_debug_line(
-            f"Avg loop time: {self.avg_loop_time_ms} ms")
 
     def exit_running_state(self):
         self.stats_logger.run_view = None
@@ -432,6 +500,7 @@ class TibiaTerminator:
                     self.selected_config_name = selected.name
                     self.char_keeper.load_char_config(selected.char_config,
                                                       selected.battle_config)
+                    self.char_status_watcher.reset()
                     self.enter_next_app_state(AppState.PAUSED)
         elif keycode == EXIT_KEYCODE:
             self.app_state = AppState.EXIT
@@ -483,6 +552,10 @@ def curses_main(
     enable_speed: bool,
     only_monitor: bool,
     x_offset: int = 0,
+    input_backend: str = "xdotool",
+    latency_histograms_path: Optional[str] = None,
+    char_status_trace_path: Optional[str] = None,
+    action_log_path: Optional[str] = None,
 ):
     tibia_wid = get_tibia_wid(pid)
     window_geometry = get_window_geometry(tibia_wid)
@@ -490,18 +563,32 @@ def curses_main(
     stats_logger = StatsLogger()
 
     def print_async(obj: Any) -> None:
-        stats_logger.log_action(2, str(obj))
+        stats_logger.log_action(2, "%s", obj)
 
     view_renderer = ViewRenderer(cliwin)
-    cmd_processor = CommandProcessor(tibia_wid, stats_logger, only_monitor)
     xdotool_proc = XdotoolProcess()
-    xdotool_proc.start()
+    if input_backend == "xtest":
+        keystroke_sender = XTestKeystrokeSender(XTestInput())
+        # Macros change the pause between events, so they get their own
+        # display connection.
+        set_input_backend(XTestInput())
+    else:
+        xdotool_proc.start()
+        keystroke_sender = XdotoolKeystrokeSender(xdotool_proc, tibia_wid)
+    cmd_processor = CommandProcessor(tibia_wid,
+                                     stats_logger,
+                                     only_monitor,
+                                     keystroke_sender=keystroke_sender)
+    char_status_recorder = None
+    if char_status_trace_path:
+        char_status_recorder = CharStatusRecorder(char_status_trace_path)
+        char_status_recorder.open()
     try:
         client = ClientInterface(
             hotkeys_config,
             logger=stats_logger,
             cmd_processor=cmd_processor,
-            keystroke_sender=XdotoolKeystrokeSender(xdotool_proc, tibia_wid),
+            keystroke_sender=keystroke_sender,
         )
         char_keeper = CharKeeper(client, char_configs[0],
                                  char_configs[0].battle_configs[0],
@@ -527,10 +614,17 @@ def curses_main(
             enable_magic_shield=enable_magic_shield,
             enable_speed=enable_speed,
             only_monitor=only_monitor,
+            char_status_recorder=char_status_recorder,
         )
         tibia_terminator.monitor_char()
     finally:
         xdotool_proc.stop()
+        if char_status_recorder is not None:
+            char_status_recorder.close()
+        if latency_histograms_path:
+            get_latency_histograms().dump(latency_histograms_path)
+        if action_log_path:
+            stats_logger.action_log.spill(action_log_path)
 
 
 def main(args: Namespace):
@@ -571,6 +665,10 @@ def main(args: Namespace):
         enable_speed=not args.no_speed,
         only_monitor=args.only_monitor,
         x_offset=args.x_offset,
+        input_backend=args.input_backend,
+        latency_histograms_path=args.latency_histograms_path,
+        char_status_trace_path=args.char_status_trace_path,
+        action_log_path=args.action_log_path,
     )
 
 
@@ -1,16 +1,36 @@
 #!/usr/bin/env python3.8
 
 import argparse
+import mmap
+import struct
 
-from typing import Dict
+from typing import Dict, Optional, List, Tuple
 from ctypes import c_int, c_int16
 
 from tibia_terminator.schemas.app_config_schema import AppConfigsSchema
-from tibia_terminator.common.lazy_evaluator import future, FutureValue
+from tibia_terminator.common.latency_histogram import get_latency_histograms
+from tibia_terminator.common.lazy_evaluator import future, immediate_call, FutureValue
 from tibia_terminator.reader.memory_reader38 import MemoryReader38 as MemoryReader
 
 # common value
 MAGIC_SHIELD_TO_SPEED_OFFSET = 204
+# Stats that are read from memory, and the layout of their values, these
+# must match the ctypes used by CharReader38.__fetch_stats
+STAT_STRUCTS = {
+    "mana": struct.Struct("<i"),
+    "hp": struct.Struct("<i"),
+    "magic_shield": struct.Struct("<h"),
+    "speed": struct.Struct("<h"),
+    "soul_points": struct.Struct("<h"),
+}
+INT_STRUCT = struct.Struct("<i")
+DEFAULT_STATS = {
+    "mana": 99999,
+    "hp": 99999,
+    "speed": 999,
+    "soul_points": 0,
+    "magic_shield": 9999,
+}
 
 parser = argparse.ArgumentParser(
     description=(
@@ -70,6 +90,68 @@ parser.add_argument(
 )
 
 
+class StatsSnapshot:
+    """Reads all of the stat addresses at once from an open memory reader.
+
+    When the addresses fall within a single page span, all of them are read
+    with a single positional read into a preallocated buffer and each stat is
+    decoded from that buffer. Otherwise each address is read with its own
+    positional read.
+    """
+
+    def __init__(
+        self, stat_addresses: Dict[str, int], max_span: int = mmap.PAGESIZE
+    ):
+        self.fields: List[Tuple[str, int, struct.Struct]] = []
+        self.base_address = 0
+        self.buffer: Optional[bytearray] = None
+        self.field_buffers: Dict[str, bytearray] = {}
+        if len(stat_addresses) == 0:
+            return
+
+        self.base_address = min(stat_addresses.values())
+        end_address = max(
+            address + STAT_STRUCTS[name].size
+            for name, address in stat_addresses.items()
+        )
+        for name, address in stat_addresses.items():
+            self.fields.append(
+                (name, address - self.base_address, STAT_STRUCTS[name])
+            )
+
+        if end_address - self.base_address <= max_span:
+            self.buffer = bytearray(end_address - self.base_address)
+        else:
+            for name, address in stat_addresses.items():
+                self.field_buffers[name] = bytearray(STAT_STRUCTS[name].size)
+
+    @property
+    def is_single_read(self) -> bool:
+        return self.buffer is not None
+
+    def read(self, memory_reader: MemoryReader) -> Dict[str, int]:
+        stats = dict(DEFAULT_STATS)
+        if self.buffer is not None:
+            read_into(memory_reader, self.base_address, self.buffer)
+            for name, offset, stat_struct in self.fields:
+                stats[name] = stat_struct.unpack_from(self.buffer, offset)[0]
+        else:
+            for name, offset, stat_struct in self.fields:
+                field_buffer = self.field_buffers[name]
+                read_into(memory_reader, self.base_address + offset, field_buffer)
+                stats[name] = stat_struct.unpack_from(field_buffer)[0]
+        return stats
+
+
+def read_into(memory_reader: MemoryReader, address: int, buffer: bytearray) -> None:
+    read_size = memory_reader.read_into(address, buffer)
+    # e.g. the page got unmapped, the rest of the buffer would be stale
+    if read_size != len(buffer):
+        raise OSError(
+            f"Read {read_size} of {len(buffer)} bytes from address {hex(address)}"
+        )
+
+
 class CharReader38:
     def __init__(self, memory_reader, verbose=True):
         self.memory_reader = memory_reader
@@ -81,15 +163,48 @@ class CharReader38:
         self.max_hp_address = None
         self.max_mana_address = None
         self.verbose = verbose
+        self.snapshot: Optional[StatsSnapshot] = None
+        self.int_buffer = bytearray(INT_STRUCT.size)
 
-    def __fetch_stats(self):
-        stats = {
-            "mana": 99999,
-            "hp": 99999,
-            "speed": 999,
-            "soul_points": 0,
-            "magic_shield": 9999,
+    def __enter__(self, *args, **kwargs) -> "CharReader38":
+        self.open()
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+    def open(self):
+        """Keeps the process memory open and reads the stats as a snapshot
+        until close() is called.
+
+        Call this after the memory addresses have been initialized.
+        """
+        self.memory_reader.open_fd()
+        self.snapshot = StatsSnapshot(self.gen_stat_addresses())
+
+    def close(self):
+        self.snapshot = None
+        self.memory_reader.close_fd()
+
+    def gen_stat_addresses(self) -> Dict[str, int]:
+        addresses = {
+            "mana": self.mana_address,
+            "hp": self.hp_address,
+            "magic_shield": self.magic_shield_address,
+            "speed": self.speed_address,
+            "soul_points": self.soul_points_address,
+        }
+        return {
+            name: address
+            for name, address in addresses.items()
+            if address is not None
         }
+
+    def __fetch_snapshot(self) -> Dict[str, int]:
+        return self.snapshot.read(self.memory_reader)
+
+    def __fetch_stats(self):
+        stats = dict(DEFAULT_STATS)
         self.memory_reader.open()
         try:
             if self.mana_address is not None:
@@ -117,11 +232,24 @@ class CharReader38:
         return stats
 
     def get_stats(self) -> FutureValue[Dict[str, int]]:
-        return future(self.__fetch_stats)
+        latency_histograms = get_latency_histograms()
+        if self.snapshot is not None:
+            # A snapshot costs one pread, which is cheaper than handing it
+            # over to a different thread.
+            return immediate_call(
+                latency_histograms.timed("memory_read", self.__fetch_snapshot)
+            )
+        return future(latency_histograms.timed("memory_read", self.__fetch_stats))
+
+    def __read_int(self, address: int) -> int:
+        read_into(self.memory_reader, address, self.int_buffer)
+        return INT_STRUCT.unpack_from(self.int_buffer)[0]
 
     def get_max_hp(self):
         if self.max_hp_address is None:
             return 99999
+        if self.memory_reader.is_fd_open():
+            return self.__read_int(self.max_hp_address)
         self.memory_reader.open()
         try:
             return self.memory_reader.read_address_ctype(self.max_hp_address, c_int())
@@ -131,6 +259,8 @@ class CharReader38:
     def get_max_mana(self):
         if self.max_mana_address is None:
             return 99999
+        if self.memory_reader.is_fd_open():
+            return self.__read_int(self.max_mana_address)
         self.memory_reader.open()
         try:
             return self.memory_reader.read_address_ctype(self.max_mana_address, c_int())
@@ -290,13 +420,14 @@ def main(
     if max_mana_address is not None:
         reader.init_max_mana_address(int(max_mana_address, 16))
 
-    stats = reader.get_stats().get()
-    print(
-        f"HP={stats['hp']};MANA={stats['mana']};SPEED={stats['speed']};"
-        f"SOUL_POINTS={stats['soul_points']};"
-        f"MAGIC_SHIELD={stats['magic_shield']};"
-        f"MAX_MANA={reader.get_max_mana()};MAX_HP={reader.get_max_hp()}"
-    )
+    with reader:
+        stats = reader.get_stats().get()
+        print(
+            f"HP={stats['hp']};MANA={stats['mana']};SPEED={stats['speed']};"
+            f"SOUL_POINTS={stats['soul_points']};"
+            f"MAGIC_SHIELD={stats['magic_shield']};"
+            f"MAX_MANA={reader.get_max_mana()};MAX_HP={reader.get_max_hp()}"
+        )
 
 
 if __name__ == "__main__":
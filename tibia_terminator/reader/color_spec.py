@@ -23,7 +23,7 @@ class ItemName:
 
     @staticmethod
     def from_name(cls, name: str):
-        return cls.items().get(name, None)
+        return cls.items(cls).get(name, None)
 
     @staticmethod
     def register(cls, item):
@@ -1,24 +1,36 @@
 #!/usr/bin/env python3.8
 
 import sys
-import time
 
-from typing import Tuple, Dict, Any, Callable, Iterable, List, Union
+from functools import partial
+from typing import Tuple, Dict, Any, Callable, List, Union, Optional
 
-from tibia_terminator.common.lazy_evaluator import immediate, FutureValue, TaskLoop
+from tibia_terminator.common.latency_histogram import get_latency_histograms
+from tibia_terminator.common.lazy_evaluator import (
+    immediate,
+    FutureValue,
+    MultiLaneTaskLoop,
+    TaskCancelledError,
+)
 from tibia_terminator.reader.color_spec import (
     ItemName,
     AmuletName,
     RingName,
 )
-from tibia_terminator.reader.window_utils import ScreenReader
-from tibia_terminator.schemas.reader.common import Coord
+from tibia_terminator.reader.window_utils import (
+    CaptureBackend,
+    ScreenReader,
+    PixelSource,
+    gen_bounding_rect,
+)
+from tibia_terminator.schemas.reader.common import Coord, parse_hex_color
 from tibia_terminator.reader.item_repository_container import ItemRepositoryContainer
 from tibia_terminator.schemas.reader.interface_config_schema import (
     TibiaWindowSpec,
     EquipmentCoords,
     ItemEntry,
     ItemColors,
+    Rect,
 )
 
 
@@ -33,8 +45,8 @@ class MagicShieldStatus:
 
 UNKNOWN_ITEM = ItemEntry(
     name="unknown",
-    equipped_colors=ItemColors("FFF", "FFF", "FFF", "FFF"),
-    action_bar_colors=ItemColors("FFF", "FFF", "FFF", "FFF"),
+    equipped_colors=ItemColors(0xFFF, 0xFFF, 0xFFF, 0xFFF),
+    action_bar_colors=ItemColors(0xFFF, 0xFFF, 0xFFF, 0xFFF),
 )
 
 
@@ -94,15 +106,49 @@ class FutureEquipmentStatus(EquipmentStatus):
 
 NOOP: Callable[[str], None] = lambda x: None
 
+# Distance from the center of action bar slots to the pixels that identify
+# their item.
+ACTION_BAR_AMULET_DELTA = 10
+ACTION_BAR_RING_DELTA = 3
+
+
+def gen_square_coords(center: Coord, delta: int) -> EquipmentCoords:
+    return EquipmentCoords(
+        north=Coord(center.x, center.y - delta),
+        south=Coord(center.x, center.y + delta),
+        left=Coord(center.x - delta, center.y),
+        right=Coord(center.x + delta, center.y),
+    )
+
+# Areas of the window read by get_equipment_status, each one is pinned to
+# lane region % lanes of the task loop.
+ACTION_BAR_REGION = 0
+CHAR_EQUIPMENT_REGION = 1
+
 
 class EquipmentReader(ScreenReader):
-    def __init__(self, tibia_wid: int, tibia_window_spec: TibiaWindowSpec):
-        super().__init__(tibia_wid=tibia_wid)
+    def __init__(
+        self,
+        tibia_wid: int,
+        tibia_window_spec: TibiaWindowSpec,
+        frame_sampling: bool = True,
+        lanes: int = 2,
+        capture_backend: str = CaptureBackend.AUTO,
+    ):
+        super().__init__(tibia_wid=tibia_wid, capture_backend=capture_backend)
         self.tibia_window_spec = tibia_window_spec
         self.item_repository = ItemRepositoryContainer(
             tibia_window_spec.item_repository
         )
-        self.task_loop = TaskLoop()
+        self.task_loop = MultiLaneTaskLoop(lanes)
+        # Xlib connections are not thread-safe, so every lane reads pixels
+        # through its own connection. Lane 0 uses this reader's connection.
+        self.lane_readers: List[ScreenReader] = [self] + [
+            ScreenReader(tibia_wid=tibia_wid, capture_backend=capture_backend)
+            for _ in range(1, lanes)
+        ]
+        self.frame_sampling = frame_sampling
+        self.frame_rects = self.gen_frame_rects()
 
     def __enter__(self, *args, **kwargs) -> 'EquipmentReader':
         self.open()
@@ -113,15 +159,62 @@ class EquipmentReader(ScreenReader):
 
     def open(self):
         super().open()
+        for lane_reader in self.lane_readers[1:]:
+            lane_reader.open()
         self.task_loop.start()
 
     def close(self):
         super().close()
+        for lane_reader in self.lane_readers[1:]:
+            lane_reader.close()
         self.task_loop.stop()
 
-    def cancel_pending_futures(self):
-        """Cancels pending future values for equipment status"""
-        self.task_loop.cancel_pending_tasks()
+    def gen_frame_rects(self) -> List[Rect]:
+        """Rectangles that cover every pixel read by get_equipment_status,
+        indexed by region."""
+        action_bar = self.tibia_window_spec.action_bar
+        action_bar_coords = [action_bar.magic_shield.coord]
+        for center in (
+            action_bar.amulet_center,
+            action_bar.emergency_amulet_center,
+            action_bar.tank_amulet_center,
+        ):
+            if center:
+                action_bar_coords.extend(self.gen_action_bar_amulet_coords(center))
+        for center in (
+            action_bar.ring_center,
+            action_bar.emergency_ring_center,
+            action_bar.tank_ring_center,
+        ):
+            if center:
+                action_bar_coords.extend(self.gen_action_bar_ring_coords(center))
+
+        char_equipment = self.tibia_window_spec.char_equipment
+        return [
+            gen_bounding_rect(action_bar_coords),
+            gen_bounding_rect(list(char_equipment.amulet) + list(char_equipment.ring)),
+        ]
+
+    def get_region_lane(self, region: int) -> int:
+        return region % len(self.task_loop)
+
+    def new_lane_frames(self) -> List[PixelSource]:
+        """One source of pixels per lane, backed by the lane's reader."""
+        if not self.frame_sampling:
+            return list(self.lane_readers)
+
+        lane_rects: List[List[Rect]] = [[] for _ in self.lane_readers]
+        for region, rect in enumerate(self.frame_rects):
+            lane_rects[self.get_region_lane(region)].append(rect)
+        return [
+            lane_reader.new_frame(rects)
+            for lane_reader, rects in zip(self.lane_readers, lane_rects)
+        ]
+
+    def cancel_pending_futures(self) -> int:
+        """Cancels pending future values for equipment status, returns how
+        many were cancelled."""
+        return self.task_loop.cancel_pending_tasks()
 
     def get_equipment_status(
         self,
@@ -136,72 +229,104 @@ class EquipmentReader(ScreenReader):
         normal_action_ring_cb: Callable[[str], None] = NOOP,
 
     ) -> EquipmentStatus:
+        # Each lane grabs its areas of the window once per call, and reads
+        # its pixels from them in parallel with the other lanes.
+        frames = self.new_lane_frames()
+        latency_histograms = get_latency_histograms()
+
+        def add_future(
+            name: str,
+            region: int,
+            getter: Callable[[PixelSource], str],
+            cb: Callable[[str], None],
+        ) -> FutureValue[str]:
+            def failure_cb(e: Exception):
+                # Cancelled reads keep the last value that was reported.
+                if not isinstance(e, TaskCancelledError):
+                    cb("ERROR, check logs")
+
+            lane = self.get_region_lane(region)
+            return self.task_loop.add_future(
+                latency_histograms.timed(
+                    f"equipment.{name}", partial(getter, frames[lane])
+                ),
+                cb,
+                failure_cb,
+                lane=lane,
+            )
+
         return FutureEquipmentStatus(
             {
-                "equipped_amulet": self.task_loop.add_future(
+                "equipped_amulet": add_future(
+                    "equipped_amulet",
+                    CHAR_EQUIPMENT_REGION,
                     self.get_equipped_amulet_name,
                     equipped_amulet_cb,
-                    lambda e: equipped_amulet_cb("ERROR, check logs"),
                 ),
-                "equipped_ring": self.task_loop.add_future(
+                "equipped_ring": add_future(
+                    "equipped_ring",
+                    CHAR_EQUIPMENT_REGION,
                     self.get_equipped_ring_name,
                     equipped_ring_cb,
-                    lambda e: equipped_ring_cb("ERROR, check logs"),
                 ),
-                "magic_shield_status": self.task_loop.add_future(
+                "magic_shield_status": add_future(
+                    "magic_shield_status",
+                    ACTION_BAR_REGION,
                     self.get_magic_shield_status,
                     magic_shield_status_cb,
-                    lambda e: magic_shield_status_cb("ERROR, check logs"),
                 ),
-                "emergency_action_amulet": self.task_loop.add_future(
+                "emergency_action_amulet": add_future(
+                    "emergency_action_amulet",
+                    ACTION_BAR_REGION,
                     self.get_emergency_action_bar_amulet_name,
                     emergency_action_amulet_cb,
-                    lambda e: emergency_action_amulet_cb("ERROR, check logs"),
                 ),
-                "emergency_action_ring": self.task_loop.add_future(
+                "emergency_action_ring": add_future(
+                    "emergency_action_ring",
+                    ACTION_BAR_REGION,
                     self.get_emergency_action_bar_ring_name,
                     emergency_action_ring_cb,
-                    lambda e: emergency_action_ring_cb("ERROR, check logs"),
                 ),
-                "tank_action_amulet": self.task_loop.add_future(
+                "tank_action_amulet": add_future(
+                    "tank_action_amulet",
+                    ACTION_BAR_REGION,
                     self.get_tank_action_bar_amulet_name,
                     tank_action_amulet_cb,
-                    lambda e: tank_action_amulet_cb("ERROR, check logs"),
                 ),
-                "tank_action_ring": self.task_loop.add_future(
+                "tank_action_ring": add_future(
+                    "tank_action_ring",
+                    ACTION_BAR_REGION,
                     self.get_tank_action_bar_ring_name,
                     tank_action_ring_cb,
-                    lambda e: tank_action_ring_cb("ERROR, check logs"),
                 ),
-                "normal_action_amulet": self.task_loop.add_future(
+                "normal_action_amulet": add_future(
+                    "normal_action_amulet",
+                    ACTION_BAR_REGION,
                     self.get_normal_action_bar_amulet_name,
                     normal_action_amulet_cb,
-                    lambda e: normal_action_amulet_cb("ERROR, check logs"),
                 ),
-                "normal_action_ring": self.task_loop.add_future(
+                "normal_action_ring": add_future(
+                    "normal_action_ring",
+                    ACTION_BAR_REGION,
                     self.get_normal_action_bar_ring_name,
                     normal_action_ring_cb,
-                    lambda e: normal_action_ring_cb("ERROR, check logs"),
                 ),
-
             }
         )
 
-    def read_equipment_colors(self, coords: EquipmentCoords) -> ItemColors:
+    def read_equipment_colors(
+        self, coords: EquipmentCoords, frame: Optional[PixelSource] = None
+    ) -> ItemColors:
+        pixels = frame or self
         return ItemColors(
-            north=self.get_coord_color(coords.north),
-            south=self.get_coord_color(coords.south),
-            left=self.get_coord_color(coords.left),
-            right=self.get_coord_color(coords.right),
+            north=pixels.get_coord_rgb(coords.north),
+            south=pixels.get_coord_rgb(coords.south),
+            left=pixels.get_coord_rgb(coords.left),
+            right=pixels.get_coord_rgb(coords.right),
         )
 
     def gen_square_coords(self, center: Coord, delta: int) -> EquipmentCoords:
-        return EquipmentCoords(
-            north=Coord(center.x, center.y - delta),
-            south=Coord(center.x, center.y + delta),
-            left=Coord(center.x - delta, center.y),
-            right=Coord(center.x + delta, center.y),
-        )
+        return gen_square_coords(center, delta)
 
     def matches_screen_item(
         self, coords: EquipmentCoords, color_specs: List[ItemColors]
@@ -237,53 +362,74 @@ class EquipmentReader(ScreenReader):
 
     # start: read ring methods
     def gen_action_bar_ring_coords(self, center: Coord) -> EquipmentCoords:
-        return self.gen_square_coords(center, 3)
+        return self.gen_square_coords(center, ACTION_BAR_RING_DELTA)
 
-    def get_normal_action_bar_ring_name(self) -> str:
+    def get_normal_action_bar_ring_name(
+        self, frame: Optional[PixelSource] = None
+    ) -> str:
         return self.lookup_ring_by_action_bar_colors(
-            self.read_action_bar_normal_ring_colors()
+            self.read_action_bar_normal_ring_colors(frame)
         ).name
 
-    def read_action_bar_normal_ring_colors(self) -> ItemColors:
+    def read_action_bar_normal_ring_colors(
+        self, frame: Optional[PixelSource] = None
+    ) -> ItemColors:
         return self.read_equipment_colors(
             self.gen_action_bar_ring_coords(
                 self.tibia_window_spec.action_bar.ring_center
-            )
+            ),
+            frame,
         )
 
-    def get_emergency_action_bar_ring_name(self) -> str:
+    def get_emergency_action_bar_ring_name(
+        self, frame: Optional[PixelSource] = None
+    ) -> str:
         return self.lookup_ring_by_action_bar_colors(
-            self.read_action_bar_emergency_ring_colors()
+            self.read_action_bar_emergency_ring_colors(frame)
         ).name
 
-    def read_action_bar_emergency_ring_colors(self) -> ItemColors:
+    def read_action_bar_emergency_ring_colors(
+        self, frame: Optional[PixelSource] = None
+    ) -> ItemColors:
         return self.read_equipment_colors(
             self.gen_action_bar_ring_coords(
                 self.tibia_window_spec.action_bar.emergency_ring_center
-            )
+            ),
+            frame,
         )
 
-    def read_action_bar_tank_ring_colors(self) -> ItemColors:
+    def read_action_bar_tank_ring_colors(
+        self, frame: Optional[PixelSource] = None
+    ) -> ItemColors:
         return self.read_equipment_colors(
             self.gen_action_bar_ring_coords(
                 self.tibia_window_spec.action_bar.tank_ring_center
-            )
+            ),
+            frame,
         )
 
-    def get_tank_action_bar_ring_name(self) -> str:
+    def get_tank_action_bar_ring_name(
+        self, frame: Optional[PixelSource] = None
+    ) -> str:
         if not self.tibia_window_spec.action_bar.tank_ring_center:
             return RingName.UNKNOWN.name
 
         return self.lookup_ring_by_action_bar_colors(
-            self.read_action_bar_tank_ring_colors()
+            self.read_action_bar_tank_ring_colors(frame)
         ).name
 
-    def read_equipped_ring_colors(self) -> ItemColors:
-        return self.read_equipment_colors(self.tibia_window_spec.char_equipment.ring)
+    def read_equipped_ring_colors(
+        self, frame: Optional[PixelSource] = None
+    ) -> ItemColors:
+        return self.read_equipment_colors(
+            self.tibia_window_spec.char_equipment.ring, frame
+        )
 
-    def get_equipped_ring_name(self) -> str:
+    def get_equipped_ring_name(
+        self, frame: Optional[PixelSource] = None
+    ) -> str:
         return self.lookup_ring_by_equipped_colors(
-            self.read_equipped_ring_colors()
+            self.read_equipped_ring_colors(frame)
         ).name
 
     def is_normal_action_bar_ring(self, name: ItemName):
@@ -327,56 +473,77 @@ class EquipmentReader(ScreenReader):
     # start: read amulet methods
 
     def gen_action_bar_amulet_coords(self, center: Coord) -> EquipmentCoords:
-        return self.gen_square_coords(center, 10)
+        return self.gen_square_coords(center, ACTION_BAR_AMULET_DELTA)
 
-    def read_action_bar_normal_amulet_colors(self) -> ItemColors:
+    def read_action_bar_normal_amulet_colors(
+        self, frame: Optional[PixelSource] = None
+    ) -> ItemColors:
         return self.read_equipment_colors(
             self.gen_action_bar_amulet_coords(
                 self.tibia_window_spec.action_bar.amulet_center
-            )
+            ),
+            frame,
         )
 
-    def get_normal_action_bar_amulet_name(self) -> str:
+    def get_normal_action_bar_amulet_name(
+        self, frame: Optional[PixelSource] = None
+    ) -> str:
         return self.lookup_amulet_by_action_bar_colors(
-            self.read_action_bar_normal_amulet_colors()
+            self.read_action_bar_normal_amulet_colors(frame)
         ).name
 
-    def read_action_bar_emergency_amulet_colors(self) -> ItemColors:
+    def read_action_bar_emergency_amulet_colors(
+        self, frame: Optional[PixelSource] = None
+    ) -> ItemColors:
         return self.read_equipment_colors(
             self.gen_action_bar_amulet_coords(
                 self.tibia_window_spec.action_bar.emergency_amulet_center
-            )
+            ),
+            frame,
         )
 
-    def get_emergency_action_bar_amulet_name(self) -> str:
+    def get_emergency_action_bar_amulet_name(
+        self, frame: Optional[PixelSource] = None
+    ) -> str:
         return self.lookup_amulet_by_action_bar_colors(
-            self.read_action_bar_emergency_amulet_colors()
+            self.read_action_bar_emergency_amulet_colors(frame)
         ).name
 
-    def read_action_bar_tank_amulet_colors(self) -> ItemColors:
+    def read_action_bar_tank_amulet_colors(
+        self, frame: Optional[PixelSource] = None
+    ) -> ItemColors:
         if not self.tibia_window_spec.action_bar.tank_amulet_center:
             raise Exception("tibia_window_spec.action_bar.tank_amulet_center is not set")
 
         return self.read_equipment_colors(
             self.gen_action_bar_amulet_coords(
                 self.tibia_window_spec.action_bar.tank_amulet_center
-            )
+            ),
+            frame,
         )
 
-    def get_tank_action_bar_amulet_name(self) -> str:
-        if not self.tibia_window_spec.action_bar.amulet_center:
+    def get_tank_action_bar_amulet_name(
+        self, frame: Optional[PixelSource] = None
+    ) -> str:
+        if not self.tibia_window_spec.action_bar.tank_amulet_center:
             return AmuletName.UNKNOWN.name
 
         return self.lookup_amulet_by_action_bar_colors(
-            self.read_action_bar_tank_amulet_colors()
+            self.read_action_bar_tank_amulet_colors(frame)
         ).name
 
-    def read_equipped_amulet_colors(self) -> ItemColors:
-        return self.read_equipment_colors(self.tibia_window_spec.char_equipment.amulet)
+    def read_equipped_amulet_colors(
+        self, frame: Optional[PixelSource] = None
+    ) -> ItemColors:
+        return self.read_equipment_colors(
+            self.tibia_window_spec.char_equipment.amulet, frame
+        )
 
-    def get_equipped_amulet_name(self) -> str:
+    def get_equipped_amulet_name(
+        self, frame: Optional[PixelSource] = None
+    ) -> str:
         return self.lookup_amulet_by_equipped_colors(
-            self.read_equipped_amulet_colors()
+            self.read_equipped_amulet_colors(frame)
         ).name
 
     def is_normal_action_bar_amulet(self, name: ItemName) -> bool:
@@ -417,12 +584,14 @@ class EquipmentReader(ScreenReader):
 
     # end: read amulet methods
 
-    def get_magic_shield_status(self) -> str:
+    def get_magic_shield_status(
+        self, frame: Optional[PixelSource] = None
+    ) -> str:
         magic_shield_spec = self.tibia_window_spec.action_bar.magic_shield
-        color_str = self.get_coord_color(magic_shield_spec.coord)
-        if color_str in magic_shield_spec.off_cooldown_color:
+        rgb = (frame or self).get_coord_rgb(magic_shield_spec.coord)
+        if rgb in magic_shield_spec.off_cooldown_color:
             return MagicShieldStatus.OFF_COOLDOWN
-        if color_str in magic_shield_spec.recently_cast_color:
+        if rgb in magic_shield_spec.recently_cast_color:
             return MagicShieldStatus.RECENTLY_CAST
 
         # There are only 3 possible states: recently cast, off cooldown and
@@ -434,6 +603,7 @@ if __name__ == "__main__":
     import argparse
     import json
 
+    from tibia_terminator.common.benchmark import run_benchmark
     from tibia_terminator.schemas.reader.interface_config_schema import (
         TibiaWindowSpecSchema,
     )
@@ -477,19 +647,20 @@ if __name__ == "__main__":
 
     class EquipmentReaderSlow(EquipmentReader):
         def __init__(self, tibia_wid: int, tibia_window_spec: TibiaWindowSpec):
-            super().__init__(tibia_wid, tibia_window_spec)
+            super().__init__(tibia_wid, tibia_window_spec, frame_sampling=False)
 
-        def get_pixels(self, coords: Iterable[XY]) -> List[str]:
-            return self.get_pixels_slow(coords)
+        def get_pixel_rgb(self, x: int, y: int) -> int:
+            return parse_hex_color(self.get_pixel_color_slow(x, y))
 
-    def time_perf(title: str, fn: Callable) -> None:
-        start = time.time() * 1000
+    def time_perf(title: str, fn: Callable, rounds: int = 10) -> None:
         value = fn()
-        end = time.time() * 1000
-        elapsed = end - start
+        result = run_benchmark(title, fn, rounds=rounds, warmup_rounds=0)
         print(title)
         print(f"  Result: {value}")
-        print(f"  Elapsed time: {elapsed} ms")
+        print(
+            f"  Elapsed time: median {result.median_ms:.3f} ms, "
+            f"max {result.max_ms:.3f} ms ({result.rounds} rounds)"
+        )
 
     def check_specs(tibia_wid: int, tibia_window_spec: TibiaWindowSpec) -> None:
         eq_reader = EquipmentReader(tibia_wid, tibia_window_spec)
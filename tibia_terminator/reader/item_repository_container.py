@@ -1,6 +1,6 @@
 #!/usr/bin/env python3.8
 
-from typing import Union, List, Dict
+from typing import Callable, Dict, Iterable, List, Union
 
 from tibia_terminator.reader.color_spec import ItemName
 
@@ -13,108 +13,87 @@ from tibia_terminator.schemas.reader.interface_config_schema import (
 
 UNKNOWN_ITEM = ItemEntry(
     name="unknown",
-    equipped_colors=ItemColors("FFF", "FFF", "FFF", "FFF"),
-    action_bar_colors=ItemColors("FFF", "FFF", "FFF", "FFF"),
+    equipped_colors=ItemColors(0xFFF, 0xFFF, 0xFFF, 0xFFF),
+    action_bar_colors=ItemColors(0xFFF, 0xFFF, 0xFFF, 0xFFF),
 )
 
 
+def index_by_name(items: Iterable[ItemEntry]) -> Dict[str, List[ItemEntry]]:
+    index: Dict[str, List[ItemEntry]] = {}
+    for item in items:
+        index.setdefault(item.name, []).append(item)
+    return index
+
+
+def index_by_colors(
+    items: Iterable[ItemEntry], get_colors: Callable[[ItemEntry], List[ItemColors]]
+) -> Dict[ItemColors, ItemEntry]:
+    """Maps every color profile to its item. When the same colors are listed
+    by more than one item, the last one in the configuration wins."""
+    index: Dict[ItemColors, ItemEntry] = {}
+    for item in items:
+        for colors in get_colors(item):
+            index[colors] = item
+    return index
+
+
 class ItemRepositoryContainer:
+    """Item lookups by name and by colors.
+
+    All of the indexes are built up-front, so a lookup is a single dict access
+    regardless of the size of the repository, and colors that match no item
+    are resolved to UNKNOWN_ITEM without scanning anything.
+    """
+
     def __init__(self, item_repository: ItemRepositorySpec):
         self.item_repository = item_repository
-        self.rings_by_name: Dict[str, ItemEntry] = {}
-        self.rings_by_action_bar_colors: Dict[ItemColors, ItemEntry] = {}
-        self.rings_by_equipped_colors: Dict[ItemColors, ItemEntry] = {}
-        self.amulets_by_name: Dict[str, ItemEntry] = {}
-        self.amulets_by_action_bar_colors: Dict[ItemColors, ItemEntry] = {}
-        self.amulets_by_equipped_colors: Dict[ItemColors, ItemEntry] = {}
+        self.rings_by_name = index_by_name(item_repository.rings)
+        self.rings_by_action_bar_colors = index_by_colors(
+            item_repository.rings, lambda ring: ring.action_bar_colors
+        )
+        self.rings_by_equipped_colors = index_by_colors(
+            item_repository.rings, lambda ring: ring.equipped_colors
+        )
+        self.amulets_by_name = index_by_name(item_repository.amulets)
+        self.amulets_by_action_bar_colors = index_by_colors(
+            item_repository.amulets, lambda amulet: amulet.action_bar_colors
+        )
+        self.amulets_by_equipped_colors = index_by_colors(
+            item_repository.amulets, lambda amulet: amulet.equipped_colors
+        )
 
     def lookup_ring_by_name(self, name: Union[str, ItemName]) -> ItemEntry:
         name = str(name)
-        ring = self.rings_by_name.get(name, UNKNOWN_ITEM)
-        if ring is not UNKNOWN_ITEM:
-            return ring
-
-        rings = self.item_repository.rings
-        ring_matches = tuple(filter(lambda r: r.name == str(name), rings))
+        ring_matches = self.rings_by_name.get(name, ())
         if len(ring_matches) == 0:
             raise Exception(f"Ring {name} has no specification in the configuration!")
         if len(ring_matches) > 1:
             raise Exception(
                 f"Ring {name} has multiple specification in the configuration!"
             )
-
-        ring = ring_matches[0]
-        self.rings_by_name[name] = ring
-        return ring
+        return ring_matches[0]
 
     def lookup_amulet_by_name(self, name: Union[str, ItemName]) -> ItemEntry:
         name = str(name)
-        amulet = self.amulets_by_name.get(name, UNKNOWN_ITEM)
-        if amulet is not UNKNOWN_ITEM:
-            return amulet
-
-        amulets = self.item_repository.amulets
-        amulet_matches = tuple(filter(lambda a: a.name == name, amulets))
+        amulet_matches = self.amulets_by_name.get(name, ())
         if len(amulet_matches) == 0:
             raise Exception(f"Amulet {name} has no specification in the configuration!")
         if len(amulet_matches) > 1:
             raise Exception(
                 f"Amulet {name} has multiple specification in the configuration!"
             )
-        amulet = amulet_matches[0]
-        self.amulets_by_name[name] = amulet
-        return amulet
+        return amulet_matches[0]
 
     def lookup_amulet_by_action_bar_colors(
         self, colors: ItemColors
     ) -> ItemEntry:
-        result = self.amulets_by_action_bar_colors.get(colors, UNKNOWN_ITEM)
-        if result is not UNKNOWN_ITEM:
-            return result
-
-        for amulet in self.item_repository.amulets:
-            for spec_colors in amulet.action_bar_colors:
-                if spec_colors == colors:
-                    result = amulet
-
-        self.amulets_by_action_bar_colors[colors] = result
-        return result
+        return self.amulets_by_action_bar_colors.get(colors, UNKNOWN_ITEM)
 
     def lookup_ring_by_action_bar_colors(self, colors: ItemColors) -> ItemEntry:
-        result = self.rings_by_action_bar_colors.get(colors, UNKNOWN_ITEM)
-        if result is not UNKNOWN_ITEM:
-            return result
-
-        for ring in self.item_repository.rings:
-            for spec_colors in ring.action_bar_colors:
-                if spec_colors == colors:
-                    result = ring
-
-        self.rings_by_action_bar_colors[colors] = result
-        return result
+        return self.rings_by_action_bar_colors.get(colors, UNKNOWN_ITEM)
 
     def lookup_ring_by_equipped_colors(self, colors: ItemColors) -> ItemEntry:
-        result = self.rings_by_equipped_colors.get(colors, UNKNOWN_ITEM)
-        if result is not UNKNOWN_ITEM:
-            return result
-
-        for ring in self.item_repository.rings:
-            for spec_colors in ring.equipped_colors:
-                if spec_colors == colors:
-                    result = ring
-
-        self.rings_by_equipped_colors[colors] = result
-        return result
+        return self.rings_by_equipped_colors.get(colors, UNKNOWN_ITEM)
 
     def lookup_amulet_by_equipped_colors(self, colors: ItemColors) -> ItemEntry:
-        result = self.rings_by_equipped_colors.get(colors, UNKNOWN_ITEM)
-        if result is not UNKNOWN_ITEM:
-            return result
-
-        for amulet in self.item_repository.amulets:
-            for spec_colors in amulet.equipped_colors:
-                if spec_colors == colors:
-                    result = amulet
-
-        self.amulets_by_equipped_colors[colors] = result
-        return result
+        return self.amulets_by_equipped_colors.get(colors, UNKNOWN_ITEM)
@@ -1,17 +1,72 @@
 #!/usr/bin/env python3.8
 
-from typing import List, Optional, Callable, Tuple
+from typing import List, NamedTuple, Optional, Callable, Tuple
 from ctypes import c_int
 
 import time
 import logging
 import math
 
+import numpy as np
+
+from tibia_terminator.interface.keystroke_sender import KeystrokeSender
 from tibia_terminator.reader.ocr_number_reader import OcrNumberReader, Rect
 from tibia_terminator.reader.window_utils import get_tibia_wid, send_key
 from tibia_terminator.reader.read_only_process import ReadOnlyProcess, MemRegion, MemRegionType
+from tibia_terminator.reader.memory_snapshot import (
+    diff_memory_snapshots,
+    take_memory_snapshot,
+)
+from tibia_terminator.reader.typed_memory_search import (
+    Changed,
+    Decreased,
+    EqualTo,
+    Increased,
+    TypedMatches,
+    Unchanged,
+    ValuePredicate,
+    search_addresses_typed,
+)
 
 logger = logging.getLogger(__name__)
+SNAPSHOT_PREDICATES = {
+    "changed": Changed,
+    "unchanged": Unchanged,
+    "increased": Increased,
+    "decreased": Decreased,
+}
+
+
+class SnapshotStep(NamedTuple):
+    """Key to send to the client (None to not send any), and how the value
+    at the address changes because of it, e.g. Decreased() for the mana after
+    casting a spell, or Unchanged() after not sending any key."""
+
+    update_key: Optional[str]
+    predicate: ValuePredicate
+
+
+def make_mem_region_filter(only_search_heap: bool) -> Callable[[MemRegion], bool]:
+    def mem_region_filter(mem_region: MemRegion) -> bool:
+        if only_search_heap:
+            return (
+                mem_region.region_type is MemRegionType.HEAP or
+                "[heap]" in mem_region.filename
+            )
+        return True
+
+    return mem_region_filter
+
+
+def search_addresses_equal_to(
+    proc: ReadOnlyProcess, addresses: List[int], ctype_ctor: Callable, value: int
+) -> List[int]:
+    """Vectorized proc.search_addresses(addresses, ctype_ctor(value))."""
+    dtype = np.dtype(ctype_ctor)
+    candidates = TypedMatches(
+        np.array(sorted(addresses), np.uint64), np.zeros(len(addresses), dtype)
+    )
+    return search_addresses_typed(proc, candidates, EqualTo(value)).addresses.tolist()
 
 
 class MemoryAddressFinder:
@@ -19,9 +74,15 @@ class MemoryAddressFinder:
         self,
         ocr_reader: OcrNumberReader,
         tibia_pid: int,
+        search_processes: Optional[int] = None,
+        keystroke_sender: Optional[KeystrokeSender] = None,
     ):
         self.tibia_pid = tibia_pid
         self.ocr_reader = ocr_reader
+        # Processes that search all of the memory, defaults to os.cpu_count().
+        self.search_processes = search_processes
+        # Sends the update keys, defaults to an xdotool command per key.
+        self.keystroke_sender = keystroke_sender
 
     def read_ocr_value(
         self, rect: Rect, prev_value: Optional[int] = None
@@ -117,33 +178,22 @@ class MemoryAddressFinder:
         *,
         initial_address_space: Optional[List[int]] = None,
         stop_gap_matches: int = 1,
-        verbatim: bool = True,
         only_search_heap: bool = True,
     ) -> Tuple[List[int], Rect]:
-        def mem_region_filter(mem_region: MemRegion) -> bool:
-            if only_search_heap:
-                return (
-                    mem_region.region_type is MemRegionType.HEAP or
-                    "[heap]" in mem_region.filename
-                )
-            return True
-
+        mem_region_filter = make_mem_region_filter(only_search_heap)
         with ReadOnlyProcess(self.tibia_pid) as proc:
             prev_value = None
             tibia_wid = int(get_tibia_wid(self.tibia_pid))
             value, _, __ = self.read_ocr_value(text_field_rectangle, prev_value)
             if initial_address_space is None:
-                # never search all of the memory with verbatim False
-                addresses = proc.search_all_memory(
+                addresses = proc.parallel_search_all_memory(
                     ctype_ctor(value), writeable_only=True, verbatim=True,
-                    mem_region_filter=mem_region_filter
+                    mem_region_filter=mem_region_filter,
+                    processes=self.search_processes,
                 )
             else:
-                use_verbatim = verbatim or len(addresses) > 250
-                addresses = proc.search_addresses(
-                    addresses,
-                    ctype_ctor(value),
-                    verbatim=use_verbatim
+                addresses = search_addresses_equal_to(
+                    proc, initial_address_space, ctype_ctor, value
                 )
 
             logger.info("OCR Scan of %s: %s", text_field_rectangle, value)
@@ -156,7 +206,7 @@ class MemoryAddressFinder:
                 if i > 0:
                     time.sleep(0.75)  # Wait for next key press
                 logger.info("Sending key %s to window %s", update_key, tibia_wid)
-                send_key(tibia_wid, update_key)
+                send_key(tibia_wid, update_key, self.keystroke_sender)
                 time.sleep(0.25)  # Wait for the memory to update
                 new_value, should_discard_value, new_rect = self.read_ocr_value(
                     text_field_rectangle, value
@@ -171,11 +221,74 @@ class MemoryAddressFinder:
                     value = new_value
                     text_field_rectangle = new_rect
                     logger.info("Searching %s addresses.", len(addresses))
-                    addresses = proc.search_addresses(addresses, ctype_ctor(value))
+                    addresses = search_addresses_equal_to(
+                        proc, addresses, ctype_ctor, value
+                    )
                     logger.info("OCR Scan of %s: %s", text_field_rectangle, value)
                     logger.info("Found %s matching.", len(addresses))
             return (addresses, text_field_rectangle)
 
+    def find_address_by_snapshots(
+        self,
+        steps: List[SnapshotStep],
+        ctype_ctor: Callable = c_int,
+        *,
+        text_field_rectangle: Optional[Rect] = None,
+        stop_gap_matches: int = 1,
+        only_search_heap: bool = True,
+    ) -> List[int]:
+        """Finds the address by how its value changes after each step, without
+        knowing the value. The memory is snapshotted before the first step and
+        after it, later steps only narrow down the candidates. If more than
+        stop_gap_matches candidates are left, and a text field rectangle is
+        given, the value is read once with OCR to narrow them down."""
+        if len(steps) == 0:
+            raise Exception("At least one snapshot step is needed.")
+
+        with ReadOnlyProcess(self.tibia_pid) as proc:
+            tibia_wid = int(get_tibia_wid(self.tibia_pid))
+            mem_regions = list(
+                filter(
+                    make_mem_region_filter(only_search_heap),
+                    proc.list_mapped_regions(writeable_only=True),
+                )
+            )
+            prev_snapshot = take_memory_snapshot(proc, mem_regions)
+            candidates = None
+            try:
+                for i, (update_key, predicate) in enumerate(steps):
+                    if candidates is not None and len(candidates) <= stop_gap_matches:
+                        break
+
+                    if update_key is not None:
+                        if i > 0:
+                            time.sleep(0.75)  # Wait for next key press
+                        logger.info("Sending key %s to window %s", update_key, tibia_wid)
+                        send_key(tibia_wid, update_key, self.keystroke_sender)
+                    time.sleep(0.25)  # Wait for the memory to update
+                    if candidates is None:
+                        with take_memory_snapshot(proc, mem_regions) as snapshot:
+                            candidates = diff_memory_snapshots(
+                                prev_snapshot, snapshot, ctype_ctor, predicate
+                            )
+                        prev_snapshot.close()
+                    else:
+                        candidates = search_addresses_typed(proc, candidates, predicate)
+                    logger.info("Found %s matching %s.", len(candidates), predicate)
+            finally:
+                prev_snapshot.close()
+
+            if text_field_rectangle is not None and len(candidates) > stop_gap_matches:
+                value, should_discard_value, _ = self.read_ocr_value(text_field_rectangle)
+                if should_discard_value:
+                    logger.warning(
+                        "OCR had poor results, ignoring value read (%s).", value
+                    )
+                else:
+                    candidates = search_addresses_typed(proc, candidates, EqualTo(value))
+                    logger.info("Found %s matching %s.", len(candidates), value)
+            return candidates.addresses.tolist()
+
     def read_memory(self, addr: int, ctype_ctor: Callable = c_int) -> int:
         with ReadOnlyProcess(self.tibia_pid) as proc:
             return proc.read_memory(addr, ctype_ctor())
@@ -183,6 +296,7 @@ class MemoryAddressFinder:
 
 if __name__ == "__main__":
     from argparse import ArgumentParser, Namespace
+    from tibia_terminator.interface.xtest_input import make_keystroke_sender
     from tibia_terminator.reader.window_utils import ScreenReader
     from tesserocr import PyTessBaseAPI
 
@@ -190,12 +304,21 @@ if __name__ == "__main__":
         logging.basicConfig(level=args.log_level)
         with ScreenReader(int(get_tibia_wid(args.tibia_pid))) as screen_reader:
             with OcrNumberReader(screen_reader, PyTessBaseAPI()) as ocr_reader:
-                f = MemoryAddressFinder(ocr_reader, args.tibia_pid)
-                addresses, _ = f.find_address(
-                    args.update_keys,
-                    Rect(args.x, args.y, args.width, args.height),
-                    c_int,
+                f = MemoryAddressFinder(
+                    ocr_reader,
+                    args.tibia_pid,
+                    keystroke_sender=make_keystroke_sender(args.input_backend),
                 )
+                rect = Rect(args.x, args.y, args.width, args.height)
+                if args.snapshot_predicate is None:
+                    addresses, _ = f.find_address(args.update_keys, rect, c_int)
+                else:
+                    predicate = SNAPSHOT_PREDICATES[args.snapshot_predicate]()
+                    addresses = f.find_address_by_snapshots(
+                        [SnapshotStep(key, predicate) for key in args.update_keys],
+                        c_int,
+                        text_field_rectangle=rect,
+                    )
                 for address in addresses:
                     value = f.read_memory(address, c_int)
                     print(f"Address: {hex(address)}")
@@ -235,6 +358,24 @@ if __name__ == "__main__":
         type=str,
         help="Key to send to the client in order to update the value",
     )
+    parser.add_argument(
+        "--input_backend",
+        help=("How the update keys are sent to Tibia. xdotool sends them to"
+              " the Tibia window, xtest injects them into the focused window."),
+        choices=["xdotool", "xtest"],
+        default="xdotool",
+    )
+    parser.add_argument(
+        "--snapshot_predicate",
+        choices=list(SNAPSHOT_PREDICATES.keys()),
+        required=False,
+        default=None,
+        help=(
+            "Find the address by how the value changes after each update key "
+            "(e.g. decreased after casting a spell) with memory snapshots, "
+            "the value is only read via OCR at the end."
+        ),
+    )
     parser.add_argument(
         "--log_level",
         type=int,
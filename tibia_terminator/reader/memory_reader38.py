@@ -1,5 +1,7 @@
 #!/usr/bin/env python3.8
 
+import os
+
 from typing import Union
 
 import ctypes
@@ -15,6 +17,7 @@ class MemoryReader38:
         self.proc_id = proc_id
         self.print_async = print_async
         self.mem_file = None
+        self.mem_fd = None
 
     def open(self):
         self.mem_file = open("/proc/{}/mem".format(self.proc_id), "rb")
@@ -22,6 +25,31 @@ class MemoryReader38:
     def close(self):
         self.mem_file.close()
 
+    def open_fd(self) -> int:
+        """Opens a file descriptor that stays open until close_fd is called,
+        addresses are then read with positional reads (no seek)."""
+        if self.mem_fd is None:
+            self.mem_fd = os.open("/proc/{}/mem".format(self.proc_id), os.O_RDONLY)
+        return self.mem_fd
+
+    def close_fd(self):
+        if self.mem_fd is not None:
+            os.close(self.mem_fd)
+            self.mem_fd = None
+
+    def is_fd_open(self) -> bool:
+        return self.mem_fd is not None
+
+    def read_into(self, address: int, buffer: bytearray) -> int:
+        """Reads len(buffer) bytes starting at address with a single syscall.
+
+        Returns:
+            int: The number of bytes read.
+        """
+        if self.mem_fd is None:
+            raise Exception("Please open_fd before reading an address.")
+        return os.preadv(self.mem_fd, [buffer], address)
+
     def read_address(self, address, size):
         if self.mem_file is None:
             raise Exception("Please open_mem_file before reading an address.")
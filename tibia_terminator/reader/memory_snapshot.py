@@ -0,0 +1,147 @@
+#!/usr/bin/env python3.8
+"""Snapshots of the memory of a process, to find addresses by how their values
+change between snapshots (like scanmem), rather than by their exact value.
+
+The contents of the snapshot regions are written to a temp file which is
+memory-mapped, so snapshots of the whole heap don't stay in the process'
+memory and are compared in chunks.
+"""
+
+from typing import Any, BinaryIO, Iterable, List, NamedTuple, Optional
+from traceback import format_exc
+
+import logging
+import mmap
+import tempfile
+
+import numpy as np
+
+from tibia_terminator.reader.read_only_process import (
+    SEARCH_CHUNK_SIZE,
+    MemRegion,
+    ReadOnlyProcess,
+)
+from tibia_terminator.reader.typed_memory_search import (
+    TypedMatches,
+    ValuePredicate,
+    concat_matches,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotRegion(NamedTuple):
+    start: int
+    end: int
+    # Offset of the contents of the region in the snapshot file.
+    offset: int
+
+    @property
+    def size(self) -> int:
+        return self.end - self.start
+
+
+class MemorySnapshot:
+    def __init__(
+        self,
+        regions: List[SnapshotRegion],
+        file: BinaryIO,
+        mapping: Optional[mmap.mmap],
+    ):
+        self.regions = regions
+        self.file = file
+        self.mapping = mapping
+
+    def __enter__(self) -> "MemorySnapshot":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        if self.mapping is not None:
+            self.mapping.close()
+            self.mapping = None
+        self.file.close()
+
+    def get_values(
+        self, region: SnapshotRegion, dtype: Any, address: int, count: int
+    ) -> np.ndarray:
+        """View of count values of the dtype from the address of the region,
+        only valid until the snapshot is closed."""
+        return np.frombuffer(
+            self.mapping, dtype, count, region.offset + address - region.start
+        )
+
+
+def take_memory_snapshot(
+    proc: ReadOnlyProcess,
+    mem_regions: Iterable[MemRegion],
+    chunk_size: int = SEARCH_CHUNK_SIZE,
+) -> MemorySnapshot:
+    """Regions that fail to be read are left out of the snapshot."""
+    file = tempfile.TemporaryFile()
+    regions = []
+    offset = 0
+    for mem_region in mem_regions:
+        try:
+            for chunk_start in range(mem_region.start, mem_region.end, chunk_size):
+                read_size = min(chunk_size, mem_region.end - chunk_start)
+                # raises on a short read, so no stale bytes get written
+                file.write(proc.read_bytes(chunk_start, read_size))
+        except OSError as error:
+            logger.warning("Error: %s", error)
+            logger.warning("Traceback: %s", format_exc())
+            logger.warning("Failed to read map region: %s", mem_region)
+            file.seek(offset)
+            file.truncate()
+            continue
+        regions.append(SnapshotRegion(mem_region.start, mem_region.end, offset))
+        offset += mem_region.size
+
+    file.flush()
+    mapping = None
+    if offset > 0:
+        mapping = mmap.mmap(file.fileno(), offset, access=mmap.ACCESS_READ)
+    return MemorySnapshot(regions, file, mapping)
+
+
+def diff_memory_snapshots(
+    prev_snapshot: MemorySnapshot,
+    snapshot: MemorySnapshot,
+    dtype: Any,
+    predicate: ValuePredicate,
+    chunk_size: int = SEARCH_CHUNK_SIZE,
+) -> TypedMatches:
+    """Addresses aligned to the dtype whose value in the snapshot matches the
+    predicate, given their value in the previous snapshot, e.g. Decreased().
+    Only the memory that is in both snapshots is compared."""
+    dtype = np.dtype(dtype)
+    itemsize = dtype.itemsize
+    chunk_size -= chunk_size % itemsize
+    prev_regions = {region.start: region for region in prev_snapshot.regions}
+    matches = []
+    for region in snapshot.regions:
+        prev_region = prev_regions.get(region.start)
+        if prev_region is None:
+            continue
+        start = -(-region.start // itemsize) * itemsize
+        end = min(region.end, prev_region.end)
+        for chunk_start in range(start, end - itemsize + 1, chunk_size):
+            count = (min(chunk_start + chunk_size, end) - chunk_start) // itemsize
+            values = snapshot.get_values(region, dtype, chunk_start, count)
+            prev_values = prev_snapshot.get_values(
+                prev_region, dtype, chunk_start, count
+            )
+            indexes = np.flatnonzero(predicate.matches(values, prev_values))
+            if len(indexes) > 0:
+                matches.append(
+                    TypedMatches(
+                        np.uint64(chunk_start) + indexes.astype(np.uint64) * itemsize,
+                        # fancy indexing copies, the snapshot gets closed
+                        values[indexes],
+                    )
+                )
+            # release the views, the mappings can't be closed while in use
+            del values, prev_values
+    return concat_matches(matches, dtype)
@@ -88,60 +88,34 @@ class OcrNumberReader:
 
 
 if __name__ == "__main__":
+    from tibia_terminator.common.benchmark import gen_benchmark_table, run_benchmark
     from tibia_terminator.reader.window_utils import get_tibia_wid
-    import time
-
-    def percentile(times: List[int], percentile_value: float) -> float:
-        return times[int(len(times) * percentile_value)] * 1000
 
     def main(args: Namespace):
         tibia_wid = get_tibia_wid(args.tibia_pid)
         with ScreenReader(int(tibia_wid)) as screen_reader:
             with OcrNumberReader(screen_reader, PyTessBaseAPI()) as ocr_reader:
-                times = []
-                text = None
                 rect = Rect(
                     x=args.coords[0],
                     y=args.coords[1],
                     width=args.width,
                     height=args.height,
                 )
-                # warm-up
-                logger.info("Performing warm-up")
-                for _ in range(10):
-                    text = ocr_reader.read_number(rect)
-
                 logger.info("Reading %s samples", args.samples)
-                for _ in range(args.samples):
-                    start = time.time()
-                    text = ocr_reader.read_number(rect)
-                    end = time.time()
-                    times.append(end - start)
+                result = run_benchmark(
+                    "read_number",
+                    lambda: ocr_reader.read_number(rect),
+                    rounds=args.samples,
+                    warmup_rounds=10,
+                )
+                text = ocr_reader.read_number(rect)
 
                 if args.show_image:
                     (_, image) = ocr_reader.read_number(rect, True)
                     image.show()
 
-                times.sort()
-                avg_ms = sum(times) * 1000 / len(times)
-                max_ms = times[-1] * 1000
-                min_ms = times[0] * 1000
-                median_ms = percentile(times, 0.5)
-                p99_ms = percentile(times, 0.99)
-                p95_ms = percentile(times, 0.95)
-                p75_ms = percentile(times, 0.75)
-                p25_ms = percentile(times, 0.25)
-                p90_ms = percentile(times, 0.90)
-                p01_ms = percentile(times, 0.01)
-                p05_ms = percentile(times, 0.05)
-                p10_ms = percentile(times, 0.10)
-
-                print(f"samples: {args.samples}")
-                print(f"avg: {avg_ms:.1f} median: {median_ms:.1f}")
-                print(f"max: {max_ms:.1f} min: {min_ms:.1f}")
-                print(f"p99: {p99_ms:.1f} p95: {p95_ms:.1f} p90: {p90_ms:.1f}")
-                print(f"p75: {p75_ms:.1f} p50: {median_ms:.1f} p25: {p25_ms:.1f}")
-                print(f"p10: {p10_ms:.1f} p05: {p05_ms:.1f} p01: {p01_ms:.1f}")
+                for line in gen_benchmark_table([result]):
+                    print(line)
                 print(f"Read text: {text}")
 
     parser = ArgumentParser(
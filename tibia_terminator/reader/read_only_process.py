@@ -1,12 +1,25 @@
 #!/usr/bin/env python3.8
 
-from typing import List, IO, NamedTuple, Optional, Mapping, Any, Callable
+from typing import (
+    List,
+    IO,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Mapping,
+    Any,
+    Callable,
+    Tuple,
+)
 from ctypes import sizeof, c_byte
 from traceback import format_exc
 from enum import Enum
 
 import copy
 import logging
+import mmap
+import multiprocessing
 import re
 import os
 
@@ -20,6 +33,15 @@ from mem_edit.utils import (
 
 logger = logging.getLogger(__name__)
 
+# Memory regions are searched in chunks of this size, so that searching the
+# heap doesn't need a buffer as large as the heap.
+SEARCH_CHUNK_SIZE = 1 << 20
+# Regions are split into spans of this size to be searched in parallel.
+SEARCH_SPAN_SIZE = 16 << 20
+# Candidate addresses on runs of consecutive pages are read together, in reads
+# of at most this size.
+MAX_GROUP_READ_SIZE = 64 * mmap.PAGESIZE
+
 
 class MemRegionType(Enum):
     EXE = 0
@@ -87,7 +109,9 @@ class ReadOnlyProcess(Process):
     def open(self):
         if not self.mem and not self.pid:
             raise Exception("Process is already closed.")
-        self.mem = open("/proc/{}/mem".format(self.pid), mode="rb")
+        # Unbuffered, a buffered reader would return stale memory when the
+        # same addresses are read again.
+        self.mem = open("/proc/{}/mem".format(self.pid), mode="rb", buffering=0)
 
     def close(self):
         self.pid = None
@@ -102,7 +126,10 @@ class ReadOnlyProcess(Process):
     ) -> ctypes_buffer_t:
         try:
             self.mem.seek(base_address)
-            self.mem.readinto(read_buffer)
+            read_size = self.mem.readinto(read_buffer)
+            # e.g. the region shrunk, the rest of the buffer would be stale
+            if read_size != sizeof(read_buffer):
+                raise OSError(f"Short read of {read_size} bytes")
         except OSError as ex:
             logging.error(
                 "Error while reading a %s of size %s from address %s to %s",
@@ -114,6 +141,14 @@ class ReadOnlyProcess(Process):
             raise ex
         return read_buffer
 
+    def read_bytes(self, base_address: int, size: int) -> bytes:
+        data = os.pread(self.mem.fileno(), size, base_address)
+        if len(data) != size:
+            raise OSError(
+                f"Read {len(data)} of {size} bytes from address {hex(base_address)}"
+            )
+        return data
+
     def parse_memory_map_entry(self, entry: str) -> MemRegion:
         result = MAP_ENTRY_PARSER.match(entry.strip())
         if result:
@@ -228,6 +263,9 @@ class ReadOnlyProcess(Process):
         Search for the provided value at each of the provided addresses, and return the addresses
           where it is found.
 
+        The addresses are grouped by runs of consecutive pages, and each group is read with a
+          single pread, rather than reading every address on its own.
+
         Args:
             addresses: List of addresses which should be probed.
             needle_buffer: The value to search for. This should be a `ctypes` object of the same
@@ -237,8 +275,43 @@ class ReadOnlyProcess(Process):
                 If `False`, perform `utils.ctypes_equal`-based comparison. Default `True`.
 
         Returns:
-            List of addresses where the `needle_buffer` was found.
+            List of addresses where the `needle_buffer` was found, in ascending order.
         """
+        found = []
+        needle_size = sizeof(needle_buffer)
+        needle_bytes = bytes(needle_buffer)
+        needle_type = type(needle_buffer)
+
+        if verbatim:
+            def matches(data: bytes, offset: int) -> bool:
+                return data[offset:offset + needle_size] == needle_bytes
+
+        else:
+            def matches(data: bytes, offset: int) -> bool:
+                return ctypes_equal(
+                    needle_buffer, needle_type.from_buffer_copy(data, offset)
+                )
+
+        for group_start, group_end, group in group_addresses(addresses, needle_size):
+            try:
+                data = self.read_bytes(group_start, group_end - group_start)
+            except OSError:
+                # e.g. a page of the group got unmapped, read one by one
+                found += self.__search_addresses_one_by_one(
+                    group, needle_buffer, verbatim
+                )
+                continue
+            found += [
+                address for address in group if matches(data, address - group_start)
+            ]
+        return found
+
+    def __search_addresses_one_by_one(
+        self,
+        addresses: List[int],
+        needle_buffer: ctypes_buffer_t,
+        verbatim: bool = True,
+    ) -> List[int]:
         found = []
         read_buffer = copy.copy(needle_buffer)
 
@@ -255,13 +328,63 @@ class ReadOnlyProcess(Process):
                 found.append(address)
         return found
 
+    def search_region(
+        self,
+        mem_region: MemRegion,
+        needle_buffer: ctypes_buffer_t,
+        verbatim: bool = True,
+        chunk_size: int = SEARCH_CHUNK_SIZE,
+    ) -> Iterator[int]:
+        """
+        Search a memory region for the provided value, reading it in chunks into a single
+          reused buffer, and yield the addresses where it is found as the chunks are read.
+
+        Consecutive chunks overlap by the size of the needle, so that values that straddle
+          a chunk boundary are found too. A short read raises OSError, which stops the search
+          of the region.
+        """
+        if verbatim:
+            search = search_buffer_verbatim
+        else:
+            search = search_buffer
+
+        overlap = sizeof(needle_buffer)
+        chunk_buffer = (c_byte * (chunk_size + overlap))()
+        for chunk_start in range(mem_region.start, mem_region.end, chunk_size):
+            read_size = min(chunk_size + overlap, mem_region.end - chunk_start)
+            read_buffer = (c_byte * read_size).from_buffer(chunk_buffer)
+            self.read_memory(chunk_start, read_buffer)
+            for offset in search(needle_buffer, read_buffer):
+                # matches in the overlap are found again in the next chunk
+                if offset < chunk_size:
+                    yield chunk_start + offset
+
+    def iter_search_all_memory(
+        self,
+        needle_buffer: ctypes_buffer_t,
+        writeable_only: bool = True,
+        verbatim: bool = True,
+        mem_region_filter: Callable[[MemRegion], bool] = bool,
+        chunk_size: int = SEARCH_CHUNK_SIZE,
+    ) -> Iterator[int]:
+        """Like search_all_memory, but yields the addresses as they are found."""
+        for map_region in filter(mem_region_filter, self.list_mapped_regions(writeable_only)):
+            try:
+                yield from self.search_region(
+                    map_region, needle_buffer, verbatim, chunk_size
+                )
+            except OSError as error:
+                logger.warning("Error: %s", error)
+                logger.warning("Traceback: %s", format_exc())
+                logger.warning("Failed to read map region: %s", map_region)
+
     def search_all_memory(
         self,
         needle_buffer: ctypes_buffer_t,
         writeable_only: bool = True,
         verbatim: bool = True,
         mem_region_filter: Callable[[MemRegion], bool] = bool
-    ) -> List[MemRegion]:
+    ) -> List[int]:
         """
         Search the entire memory space accessible to the process for the provided value.
 
@@ -279,22 +402,103 @@ class ReadOnlyProcess(Process):
         Returns:
             List of addresses where the `needle_buffer` was found.
         """
-        found = []
-        if verbatim:
-            search = search_buffer_verbatim
-        else:
-            search = search_buffer
+        return list(
+            self.iter_search_all_memory(
+                needle_buffer, writeable_only, verbatim, mem_region_filter
+            )
+        )
 
-        for map_region in filter(mem_region_filter, self.list_mapped_regions(writeable_only)):
-            try:
-                region_buffer = (c_byte * (map_region.end - map_region.start))()
-                self.read_memory(map_region.start, region_buffer)
-                found += [
-                    offset + map_region.start
-                    for offset in search(needle_buffer, region_buffer)
-                ]
-            except OSError as error:
-                logger.warning("Error: %s", error)
-                logger.warning("Traceback: %s", format_exc())
-                logger.warning("Failed to read map region: %s", map_region)
+    def parallel_search_all_memory(
+        self,
+        needle_buffer: ctypes_buffer_t,
+        writeable_only: bool = True,
+        verbatim: bool = True,
+        mem_region_filter: Callable[[MemRegion], bool] = bool,
+        processes: Optional[int] = None,
+        span_size: int = SEARCH_SPAN_SIZE,
+    ) -> List[int]:
+        """
+        Like search_all_memory, but the regions are split into spans of at most span_size
+          bytes that are searched by a pool of processes (os.cpu_count() by default), each
+          with its own /proc/<pid>/mem handle.
+
+        Returns:
+            List of addresses where the `needle_buffer` was found, in address order.
+        """
+        regions = filter(mem_region_filter, self.list_mapped_regions(writeable_only))
+        tasks = [
+            (span, span_size, needle_buffer, verbatim)
+            for span in gen_search_spans(regions, span_size, sizeof(needle_buffer))
+        ]
+        found = []
+        with multiprocessing.Pool(
+            processes, initializer=open_search_process, initargs=(self.pid,)
+        ) as pool:
+            # imap keeps the order of the tasks, which are in address order.
+            for span_found in pool.imap(search_span, tasks):
+                found += span_found
         return found
+
+
+def group_addresses(
+    addresses: Iterable[int], needle_size: int
+) -> Iterator[Tuple[int, int, List[int]]]:
+    """Sorts the addresses and groups them by runs of consecutive pages, so
+    that each group can be read at once. Yields the start and end of the read
+    of each group, and its addresses."""
+    group: List[int] = []
+    group_start = group_end = 0
+    for address in sorted(addresses):
+        end = address + needle_size
+        if group and (
+            address // mmap.PAGESIZE <= (group_end - 1) // mmap.PAGESIZE + 1
+            and end - group_start <= MAX_GROUP_READ_SIZE
+        ):
+            group.append(address)
+            group_end = max(group_end, end)
+        else:
+            if group:
+                yield group_start, group_end, group
+            group = [address]
+            group_start, group_end = address, end
+    if group:
+        yield group_start, group_end, group
+
+
+def gen_search_spans(
+    regions: Iterable[MemRegion], span_size: int, needle_size: int
+) -> Iterator[MemRegion]:
+    """Splits the regions into spans of span_size bytes, extended by the needle
+    size into the next span so that values that straddle spans are found."""
+    for region in regions:
+        for span_start in range(region.start, region.end, span_size):
+            span_end = min(span_start + span_size + needle_size, region.end)
+            yield region.copy(start=span_start, end=span_end)
+
+
+# The process that is searched by the worker processes of
+# parallel_search_all_memory, opened once per worker.
+search_process: Optional[ReadOnlyProcess] = None
+
+
+def open_search_process(pid: int):
+    global search_process
+    search_process = ReadOnlyProcess(pid)
+    search_process.open()
+
+
+def search_span(task: Tuple[MemRegion, int, ctypes_buffer_t, bool]) -> List[int]:
+    span, span_size, needle_buffer, verbatim = task
+    # matches in the extension of the span are found by the next span
+    span_limit = span.start + span_size
+    try:
+        return [
+            address
+            for address in search_process.search_region(span, needle_buffer, verbatim)
+            if address < span_limit
+        ]
+    except OSError as error:
+        logger.warning("Error: %s", error)
+        logger.warning("Traceback: %s", format_exc())
+        logger.warning("Failed to read map region: %s", span)
+        return []
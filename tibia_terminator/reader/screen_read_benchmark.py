@@ -0,0 +1,227 @@
+#!/usr/bin/env python3.8
+"""Benchmarks every screen-read path against a synthetic Tibia window.
+
+The synthetic window is painted on the current X display, or on a new Xvfb
+server when there is none, so it can run without a Tibia client.
+"""
+
+import argparse
+
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from tibia_terminator.common.benchmark import (
+    BenchmarkResult,
+    gen_benchmark_table,
+    run_benchmark,
+)
+from tibia_terminator.reader.equipment_reader import EquipmentReader
+from tibia_terminator.reader.menu_reader import MENU_SPECS
+from tibia_terminator.reader.synthetic_window import (
+    SCREEN_HEIGHT,
+    SCREEN_WIDTH,
+    SyntheticEquipment,
+    SyntheticTibiaWindow,
+    gen_equipment_pixels,
+    gen_menu_pixels,
+    gen_number_pixels,
+    start_xvfb,
+)
+from tibia_terminator.reader.window_utils import CaptureBackend, ScreenReader
+from tibia_terminator.schemas.reader.interface_config_schema import (
+    Rect,
+    TibiaWindowSpec,
+    TibiaWindowSpecSchema,
+)
+
+# Menu painted in the synthetic window.
+SYNTHETIC_MENU = "depot_box_open"
+SYNTHETIC_STATS = {
+    "hp_field": "1234",
+    "mana_field": "5678",
+    "speed_field": "390",
+    "soul_points_field": "100",
+}
+
+parser = argparse.ArgumentParser(
+    description="Benchmarks the screen readers against a synthetic Tibia window."
+)
+parser.add_argument(
+    "--tibia_window_config_path",
+    help="Path to the tibia window config JSON file",
+    type=str,
+    required=True,
+)
+parser.add_argument("--rounds", type=int, default=200)
+parser.add_argument("--warmup_rounds", type=int, default=20)
+parser.add_argument(
+    "--capture_backends",
+    nargs="+",
+    choices=[CaptureBackend.SHM, CaptureBackend.XLIB],
+    default=[CaptureBackend.SHM, CaptureBackend.XLIB],
+)
+
+Benchmark = Tuple[str, Callable[[], Any]]
+
+
+def gen_synthetic_equipment(spec: TibiaWindowSpec) -> SyntheticEquipment:
+    """Fills every slot with the first item of the repository."""
+    amulet = spec.item_repository.amulets[0].name
+    ring = spec.item_repository.rings[0].name
+    return SyntheticEquipment(
+        equipped_amulet=amulet,
+        equipped_ring=ring,
+        normal_action_amulet=amulet,
+        emergency_action_amulet=amulet,
+        tank_action_amulet=amulet,
+        normal_action_ring=ring,
+        emergency_action_ring=ring,
+        tank_action_ring=ring,
+    )
+
+
+def gen_stats_fields(spec: TibiaWindowSpec) -> Dict[str, Rect]:
+    if spec.stats_fields is None:
+        return {}
+    return {
+        name: rect
+        for name, rect in spec.stats_fields._asdict().items()
+        if rect is not None
+    }
+
+
+def paint_synthetic_window(
+    window: SyntheticTibiaWindow, spec: TibiaWindowSpec, equipment: SyntheticEquipment
+):
+    pixels = gen_menu_pixels(SYNTHETIC_MENU)
+    pixels.update(gen_equipment_pixels(spec, equipment))
+    for name, rect in gen_stats_fields(spec).items():
+        pixels.update(gen_number_pixels(rect, SYNTHETIC_STATS[name]))
+    window.paint(pixels)
+
+
+def gen_screen_reader_benchmarks(
+    screen_reader: ScreenReader, spec: TibiaWindowSpec
+) -> Iterable[Benchmark]:
+    magic_shield_coord = spec.action_bar.magic_shield.coord
+    yield "get_pixel_rgb", lambda: screen_reader.get_pixel_rgb(
+        magic_shield_coord.x, magic_shield_coord.y
+    )
+    for name, color_spec in MENU_SPECS.items():
+        coords = [(coord.x, coord.y) for coord in color_spec.keys()]
+        colors = list(color_spec.values())
+        yield f"matches_screen.{name}", (
+            lambda coords=coords, colors=colors: screen_reader.matches_screen(
+                coords, colors
+            )
+        )
+
+
+def gen_ocr_benchmarks(
+    screen_reader: ScreenReader, spec: TibiaWindowSpec
+) -> Iterable[Benchmark]:
+    stats_fields = gen_stats_fields(spec)
+    if not stats_fields:
+        return
+    try:
+        from tesserocr import PyTessBaseAPI
+        from tibia_terminator.reader.ocr_number_reader import OcrNumberReader
+    except ImportError:
+        return
+
+    ocr_reader = OcrNumberReader(screen_reader, PyTessBaseAPI())
+    ocr_reader.open()
+    try:
+        for name, rect in stats_fields.items():
+            yield f"ocr.{name}", lambda rect=rect: ocr_reader.read_number(rect)
+    finally:
+        ocr_reader.close()
+
+
+def gen_equipment_reader_benchmarks(
+    eq_reader: EquipmentReader, prefix: str = "equipment"
+) -> Iterable[Benchmark]:
+    for name in (
+        "get_equipped_amulet_name",
+        "get_equipped_ring_name",
+        "get_normal_action_bar_amulet_name",
+        "get_normal_action_bar_ring_name",
+        "get_magic_shield_status",
+    ):
+        yield f"{prefix}.{name}", getattr(eq_reader, name)
+
+    def read_equipment_status() -> Dict[str, Any]:
+        status = eq_reader.get_equipment_status()
+        return {key: status[key] for key in status.future_values}
+
+    yield f"{prefix}.get_equipment_status", read_equipment_status
+
+
+def run_benchmarks(
+    benchmarks: Iterable[Benchmark], prefix: str, rounds: int, warmup_rounds: int
+) -> List[BenchmarkResult]:
+    return [
+        run_benchmark(f"{prefix}.{name}", fn, rounds, warmup_rounds)
+        for name, fn in benchmarks
+    ]
+
+
+def run_screen_read_benchmarks(
+    tibia_wid: int,
+    spec: TibiaWindowSpec,
+    capture_backends: Iterable[str] = (CaptureBackend.SHM, CaptureBackend.XLIB),
+    rounds: int = 200,
+    warmup_rounds: int = 20,
+) -> List[BenchmarkResult]:
+    """Benchmarks every screen-read path with every capture backend."""
+    results = []
+    for backend in capture_backends:
+        with ScreenReader(tibia_wid, capture_backend=backend) as screen_reader:
+            results += run_benchmarks(
+                gen_screen_reader_benchmarks(screen_reader, spec),
+                backend,
+                rounds,
+                warmup_rounds,
+            )
+            results += run_benchmarks(
+                gen_ocr_benchmarks(screen_reader, spec), backend, rounds, warmup_rounds
+            )
+        for frame_sampling in (True, False):
+            with EquipmentReader(
+                tibia_wid,
+                spec,
+                frame_sampling=frame_sampling,
+                capture_backend=backend,
+            ) as eq_reader:
+                prefix = "equipment" if frame_sampling else "equipment_no_frames"
+                results += run_benchmarks(
+                    gen_equipment_reader_benchmarks(eq_reader, prefix),
+                    backend,
+                    rounds,
+                    warmup_rounds,
+                )
+    return results
+
+
+def main(args: argparse.Namespace):
+    spec = TibiaWindowSpecSchema().loadf(args.tibia_window_config_path)
+    xvfb = start_xvfb(screen=f"{SCREEN_WIDTH}x{SCREEN_HEIGHT}x24")
+    try:
+        with SyntheticTibiaWindow() as window:
+            paint_synthetic_window(window, spec, gen_synthetic_equipment(spec))
+            results = run_screen_read_benchmarks(
+                window.wid,
+                spec,
+                args.capture_backends,
+                args.rounds,
+                args.warmup_rounds,
+            )
+        for line in gen_benchmark_table(results):
+            print(line)
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+            xvfb.wait()
+
+
+if __name__ == "__main__":
+    main(parser.parse_args())
@@ -0,0 +1,393 @@
+"""Screen capture through the X shared memory extension (MIT-SHM).
+
+The X server writes the pixels of the window directly into a shared memory
+segment, so they never travel through the X socket and are read without any
+copies. Requires libX11 and libXext.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import threading
+
+from ctypes import (
+    POINTER,
+    CFUNCTYPE,
+    Structure,
+    c_char,
+    c_char_p,
+    c_int,
+    c_uint,
+    c_ulong,
+    c_ubyte,
+    c_void_p,
+    c_size_t,
+)
+from typing import Dict, Optional, Tuple
+
+from tibia_terminator.schemas.reader.interface_config_schema import Rect
+
+logger = logging.getLogger(__name__)
+
+Z_PIXMAP = 2
+ALL_PLANES = 0xFFFFFFFF
+IPC_PRIVATE = 0
+IPC_CREAT = 0o1000
+IPC_RMID = 0
+SHM_PERMISSIONS = 0o600
+
+
+class XImage(Structure):
+    _fields_ = [
+        ("width", c_int),
+        ("height", c_int),
+        ("xoffset", c_int),
+        ("format", c_int),
+        ("data", c_void_p),
+        ("byte_order", c_int),
+        ("bitmap_unit", c_int),
+        ("bitmap_bit_order", c_int),
+        ("bitmap_pad", c_int),
+        ("depth", c_int),
+        ("bytes_per_line", c_int),
+        ("bits_per_pixel", c_int),
+        ("red_mask", c_ulong),
+        ("green_mask", c_ulong),
+        ("blue_mask", c_ulong),
+        ("obdata", c_void_p),
+        # struct funcs: create_image, destroy_image, get_pixel, put_pixel,
+        # sub_image, add_pixel
+        ("f", c_void_p * 6),
+    ]
+
+
+class XShmSegmentInfo(Structure):
+    _fields_ = [
+        ("shmseg", c_ulong),
+        ("shmid", c_int),
+        ("shmaddr", c_void_p),
+        ("readOnly", c_int),
+    ]
+
+
+class XWindowAttributes(Structure):
+    _fields_ = [
+        ("x", c_int),
+        ("y", c_int),
+        ("width", c_int),
+        ("height", c_int),
+        ("border_width", c_int),
+        ("depth", c_int),
+        ("visual", c_void_p),
+        ("root", c_ulong),
+        ("class", c_int),
+        ("bit_gravity", c_int),
+        ("win_gravity", c_int),
+        ("backing_store", c_int),
+        ("backing_planes", c_ulong),
+        ("backing_pixel", c_ulong),
+        ("save_under", c_int),
+        ("colormap", c_ulong),
+        ("map_installed", c_int),
+        ("map_state", c_int),
+        ("all_event_masks", ctypes.c_long),
+        ("your_event_mask", ctypes.c_long),
+        ("do_not_propagate_mask", ctypes.c_long),
+        ("override_redirect", c_int),
+        ("screen", c_void_p),
+    ]
+
+
+class XErrorEvent(Structure):
+    _fields_ = [
+        ("type", c_int),
+        ("display", c_void_p),
+        ("resourceid", c_ulong),
+        ("serial", c_ulong),
+        ("error_code", c_ubyte),
+        ("request_code", c_ubyte),
+        ("minor_code", c_ubyte),
+    ]
+
+
+X_ERROR_HANDLER = CFUNCTYPE(c_int, c_void_p, POINTER(XErrorEvent))
+
+
+def load_library(name: str, fallback: str) -> ctypes.CDLL:
+    return ctypes.CDLL(ctypes.util.find_library(name) or fallback)
+
+
+class XLibs:
+    """Lazily loaded C bindings, shared by every ShmCapture."""
+
+    __instance: Optional["XLibs"] = None
+    __lock = threading.Lock()
+
+    def __init__(self):
+        self.x11 = load_library("X11", "libX11.so.6")
+        self.xext = load_library("Xext", "libXext.so.6")
+        self.libc = load_library("c", "libc.so.6")
+        self.last_error_code: Optional[int] = None
+
+        x11, xext, libc = self.x11, self.xext, self.libc
+        x11.XInitThreads.restype = c_int
+        x11.XOpenDisplay.argtypes = [c_char_p]
+        x11.XOpenDisplay.restype = c_void_p
+        x11.XCloseDisplay.argtypes = [c_void_p]
+        x11.XDefaultRootWindow.argtypes = [c_void_p]
+        x11.XDefaultRootWindow.restype = c_ulong
+        x11.XGetWindowAttributes.argtypes = [
+            c_void_p,
+            c_ulong,
+            POINTER(XWindowAttributes),
+        ]
+        x11.XGetWindowAttributes.restype = c_int
+        x11.XSync.argtypes = [c_void_p, c_int]
+        x11.XFree.argtypes = [c_void_p]
+        x11.XSetErrorHandler.argtypes = [X_ERROR_HANDLER]
+        x11.XSetErrorHandler.restype = c_void_p
+
+        xext.XShmQueryExtension.argtypes = [c_void_p]
+        xext.XShmQueryExtension.restype = c_int
+        xext.XShmCreateImage.argtypes = [
+            c_void_p,
+            c_void_p,
+            c_uint,
+            c_int,
+            c_void_p,
+            POINTER(XShmSegmentInfo),
+            c_uint,
+            c_uint,
+        ]
+        xext.XShmCreateImage.restype = POINTER(XImage)
+        xext.XShmAttach.argtypes = [c_void_p, POINTER(XShmSegmentInfo)]
+        xext.XShmAttach.restype = c_int
+        xext.XShmDetach.argtypes = [c_void_p, POINTER(XShmSegmentInfo)]
+        xext.XShmDetach.restype = c_int
+        xext.XShmGetImage.argtypes = [
+            c_void_p,
+            c_ulong,
+            POINTER(XImage),
+            c_int,
+            c_int,
+            c_ulong,
+        ]
+        xext.XShmGetImage.restype = c_int
+
+        libc.shmget.argtypes = [c_int, c_size_t, c_int]
+        libc.shmget.restype = c_int
+        libc.shmat.argtypes = [c_int, c_void_p, c_int]
+        libc.shmat.restype = c_void_p
+        libc.shmdt.argtypes = [c_void_p]
+        libc.shmdt.restype = c_int
+        libc.shmctl.argtypes = [c_int, c_int, c_void_p]
+        libc.shmctl.restype = c_int
+
+        # Must happen before any other Xlib call, python-xlib does not use
+        # libX11 so this is normally the first one.
+        x11.XInitThreads()
+        # The default handler terminates the process on any X error, e.g.
+        # when the window is unmapped or resized while we capture it.
+        self.error_handler = X_ERROR_HANDLER(self.handle_error)
+        x11.XSetErrorHandler(self.error_handler)
+
+    def handle_error(self, display, event) -> int:
+        self.last_error_code = event.contents.error_code
+        return 0
+
+    @classmethod
+    def get(cls) -> "XLibs":
+        with cls.__lock:
+            if cls.__instance is None:
+                cls.__instance = XLibs()
+            return cls.__instance
+
+
+class ShmSegment:
+    """A shared memory segment attached to both this process and the X server,
+    along with an XImage of a fixed width and height that points to it."""
+
+    def __init__(self, libs: XLibs, display: int, ximage, shminfo: XShmSegmentInfo):
+        self.libs = libs
+        self.display = display
+        self.ximage = ximage
+        self.shminfo = shminfo
+        image = ximage.contents
+        self.size = image.bytes_per_line * image.height
+        self.view = memoryview(
+            (c_char * self.size).from_address(shminfo.shmaddr)
+        ).cast("B")
+
+    @staticmethod
+    def create(
+        libs: XLibs, display: int, visual: int, depth: int, width: int, height: int
+    ) -> "ShmSegment":
+        shminfo = XShmSegmentInfo()
+        ximage = libs.xext.XShmCreateImage(
+            display, visual, depth, Z_PIXMAP, None, ctypes.byref(shminfo), width, height
+        )
+        if not ximage:
+            raise Exception(f"Unable to create a {width}x{height} shared XImage.")
+
+        image = ximage.contents
+        if image.bits_per_pixel != 32:
+            libs.x11.XFree(ximage)
+            raise Exception(
+                f"Only 32 bits per pixel are supported, got {image.bits_per_pixel}."
+            )
+
+        size = image.bytes_per_line * image.height
+        shminfo.shmid = libs.libc.shmget(
+            IPC_PRIVATE, size, IPC_CREAT | SHM_PERMISSIONS
+        )
+        if shminfo.shmid < 0:
+            libs.x11.XFree(ximage)
+            raise Exception(f"Unable to allocate a shared segment of {size} bytes.")
+
+        shmaddr = libs.libc.shmat(shminfo.shmid, None, 0)
+        if shmaddr is None or shmaddr == ctypes.c_void_p(-1).value:
+            libs.libc.shmctl(shminfo.shmid, IPC_RMID, None)
+            libs.x11.XFree(ximage)
+            raise Exception(f"Unable to attach shared segment {shminfo.shmid}.")
+
+        shminfo.shmaddr = shmaddr
+        shminfo.readOnly = 0
+        image.data = shmaddr
+        libs.last_error_code = None
+        attached = libs.xext.XShmAttach(display, ctypes.byref(shminfo))
+        libs.x11.XSync(display, 0)
+        # The segment is destroyed once both we and the X server detach it,
+        # even if this process dies unexpectedly.
+        libs.libc.shmctl(shminfo.shmid, IPC_RMID, None)
+        if not attached or libs.last_error_code is not None:
+            libs.libc.shmdt(shmaddr)
+            image.data = None
+            libs.x11.XFree(ximage)
+            raise Exception(
+                "The X server was unable to attach the shared segment "
+                f"(error code: {libs.last_error_code})."
+            )
+
+        return ShmSegment(libs, display, ximage, shminfo)
+
+    def capture(self, drawable: int, x: int, y: int) -> memoryview:
+        self.libs.last_error_code = None
+        ok = self.libs.xext.XShmGetImage(
+            self.display, drawable, self.ximage, x, y, ALL_PLANES
+        )
+        if not ok or self.libs.last_error_code is not None:
+            raise Exception(
+                f"Unable to capture ({x}, {y}) of window {drawable} "
+                f"(error code: {self.libs.last_error_code})."
+            )
+        return self.view
+
+    def destroy(self):
+        self.view.release()
+        self.libs.xext.XShmDetach(self.display, ctypes.byref(self.shminfo))
+        self.libs.x11.XSync(self.display, 0)
+        self.libs.libc.shmdt(self.shminfo.shmaddr)
+        # XDestroyImage would free() the data and obdata, which belong to
+        # the shared segment and to this object respectively.
+        self.ximage.contents.data = None
+        self.libs.x11.XFree(self.ximage)
+        self.ximage = None
+
+
+class ShmCapture:
+    """Captures areas of a window into shared memory segments.
+
+    One segment is kept for every distinct (slot, width, height), so capturing
+    the same areas every tick does not allocate anything. The memoryview
+    returned by capture is only valid until the next capture of an area of the
+    same size in the same slot, or until close is called. Use different slots
+    to keep several captures of the same size alive at once.
+    """
+
+    def __init__(self, wid: Optional[int] = None):
+        self.wid = wid
+        self.libs: Optional[XLibs] = None
+        self.display: Optional[int] = None
+        self.drawable: Optional[int] = None
+        self.visual: Optional[int] = None
+        self.depth: Optional[int] = None
+        self.segments: Dict[Tuple[int, int, int], ShmSegment] = {}
+        self.lock = threading.Lock()
+
+    def __enter__(self) -> "ShmCapture":
+        self.open()
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+    @staticmethod
+    def is_available() -> bool:
+        try:
+            with ShmCapture():
+                return True
+        except Exception:
+            return False
+
+    def is_open(self) -> bool:
+        return self.display is not None
+
+    def open(self):
+        if self.is_open():
+            return
+
+        libs = XLibs.get()
+        display = libs.x11.XOpenDisplay(None)
+        if not display:
+            raise Exception("Unable to open the X display.")
+
+        try:
+            if not libs.xext.XShmQueryExtension(display):
+                raise Exception("The X server does not support MIT-SHM.")
+
+            drawable = self.wid or libs.x11.XDefaultRootWindow(display)
+            attributes = XWindowAttributes()
+            libs.last_error_code = None
+            status = libs.x11.XGetWindowAttributes(
+                display, drawable, ctypes.byref(attributes)
+            )
+            if not status or libs.last_error_code is not None:
+                raise Exception(f"Unable to get the attributes of window {drawable}.")
+        except Exception:
+            libs.x11.XCloseDisplay(display)
+            raise
+
+        self.libs = libs
+        self.display = display
+        self.drawable = drawable
+        self.visual = attributes.visual
+        self.depth = attributes.depth
+
+    def close(self):
+        with self.lock:
+            if not self.is_open():
+                return
+            for segment in self.segments.values():
+                segment.destroy()
+            self.segments.clear()
+            self.libs.x11.XCloseDisplay(self.display)
+            self.display = None
+
+    def get_segment(self, slot: int, width: int, height: int) -> ShmSegment:
+        key = (slot, width, height)
+        segment = self.segments.get(key)
+        if segment is None:
+            segment = ShmSegment.create(
+                self.libs, self.display, self.visual, self.depth, width, height
+            )
+            self.segments[key] = segment
+        return segment
+
+    def capture(self, rect: Rect, slot: int = 0) -> memoryview:
+        """Captures an area of the window as BGRX bytes, 4 bytes per pixel and
+        rect.width * 4 bytes per row."""
+        with self.lock:
+            if not self.is_open():
+                raise Exception("Please open the ShmCapture before capturing.")
+            segment = self.get_segment(slot, rect.width, rect.height)
+            return segment.capture(self.drawable, rect.x, rect.y)
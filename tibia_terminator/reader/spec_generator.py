@@ -13,6 +13,7 @@ from tibia_terminator.schemas.reader.interface_config_schema import (
     ItemRepositorySpec,
 )
 from tibia_terminator.schemas.common import to_dict
+from tibia_terminator.schemas.reader.common import to_hex_color
 from tibia_terminator.reader.window_utils import get_tibia_wid
 from tibia_terminator.reader.equipment_reader import EquipmentReader
 
@@ -100,44 +101,44 @@ def generate_repository_spec(
         eq_reader.close()
 
 
-def to_terminal_rgb(rgb: str) -> str:
-    clean_rgb = rgb
-    if len(rgb) == 4:
-        clean_rgb += "00"
-    if len(rgb) == 3:
-        clean_rgb = rgb[0] * 2 + rgb[1] * 2 + rgb[2] * 2
-
-    red = str(int(clean_rgb[0:2], 16))
-    green = str(int(clean_rgb[2:4], 16))
-    blue = str(int(clean_rgb[4:6], 16))
+def to_terminal_rgb(rgb: int) -> str:
+    red = str((rgb >> 16) & 0xFF)
+    green = str((rgb >> 8) & 0xFF)
+    blue = str(rgb & 0xFF)
 
     return "\033[38;2;{R};{G};{B}m{COLOR}\033[0;00m".format(R=red,
                                                             G=green,
                                                             B=blue,
-                                                            COLOR=rgb)
+                                                            COLOR=to_hex_color(rgb))
 
 
-def replace_colors(colors: ItemColors) -> ItemColors:
+def replace_colors(
+        colors: ItemColors,
+        color_fn: Callable[[int], str] = to_hex_color) -> ItemColors:
     return ItemColors(
-        north=to_terminal_rgb(colors.north),
-        south=to_terminal_rgb(colors.south),
-        left=to_terminal_rgb(colors.left),
-        right=to_terminal_rgb(colors.right),
+        north=color_fn(colors.north),
+        south=color_fn(colors.south),
+        left=color_fn(colors.left),
+        right=color_fn(colors.right),
     )
 
 
-def replace_all_colors(all_colors: List[ItemColors]) -> List[ItemColors]:
+def replace_all_colors(
+        all_colors: List[ItemColors],
+        color_fn: Callable[[int], str] = to_hex_color) -> List[ItemColors]:
     result = []
     for colors in all_colors:
-        result.append(replace_colors(colors))
+        result.append(replace_colors(colors, color_fn))
     return result
 
 
-def replace_item_colors(item: ItemEntry) -> ItemEntry:
+def replace_item_colors(
+        item: ItemEntry,
+        color_fn: Callable[[int], str] = to_hex_color) -> ItemEntry:
     return ItemEntry(
         name=item.name,
-        equipped_colors=replace_all_colors(item.equipped_colors),
-        action_bar_colors=replace_all_colors(item.action_bar_colors),
+        equipped_colors=replace_all_colors(item.equipped_colors, color_fn),
+        action_bar_colors=replace_all_colors(item.action_bar_colors, color_fn),
     )
 
 
@@ -175,6 +176,8 @@ def print_repository_spec(spec: ItemRepositorySpec, config_path: str,
         )
         amulet = spec.amulets[0]
         if colored_output:
+            amulet = replace_item_colors(amulet, to_terminal_rgb)
+        else:
             amulet = replace_item_colors(amulet)
         print_dict(to_dict(amulet))
         print("")
@@ -186,6 +189,8 @@ def print_repository_spec(spec: ItemRepositorySpec, config_path: str,
         )
         ring = spec.rings[0]
         if colored_output:
+            ring = replace_item_colors(ring, to_terminal_rgb)
+        else:
             ring = replace_item_colors(ring)
         print_dict(to_dict(ring))
         print("")
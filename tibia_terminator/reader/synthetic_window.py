@@ -0,0 +1,249 @@
+#!/usr/bin/env python3.8
+"""Synthetic Tibia window content, to exercise the screen readers offline.
+
+The areas of a TibiaWindowSpec are painted into a plain X window (e.g. on
+Xvfb) with the colors of the item repository, the magic shield spec and the
+menu specs, and the stats fields are painted with digit bitmaps.
+"""
+
+import os
+import shutil
+import subprocess
+import time
+
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional
+
+import Xlib.X
+import Xlib.display
+
+from tibia_terminator.reader.equipment_reader import (
+    ACTION_BAR_AMULET_DELTA,
+    ACTION_BAR_RING_DELTA,
+    MagicShieldStatus,
+    gen_square_coords,
+)
+from tibia_terminator.reader.menu_reader import MENU_SPECS
+from tibia_terminator.schemas.reader.common import Coord, parse_hex_color
+from tibia_terminator.schemas.reader.interface_config_schema import (
+    EquipmentCoords,
+    ItemColors,
+    ItemEntry,
+    Rect,
+    TibiaWindowSpec,
+)
+
+XVFB_DISPLAY = ":97"
+# Large enough for the coordinates of a 1080p Tibia window.
+SCREEN_WIDTH = 1920
+SCREEN_HEIGHT = 1080
+# Doesn't match any item or magic shield color.
+BACKGROUND_COLOR = 0x102030
+# Bright text over a dark background, like the stats fields in Tibia.
+TEXT_COLOR = 0xF0F0F0
+TEXT_BACKGROUND_COLOR = 0x202020
+
+# 5x7 bitmaps of the digits, "#" pixels are painted with the text color.
+DIGIT_WIDTH = 5
+DIGIT_HEIGHT = 7
+DIGIT_BITMAPS: Dict[str, List[str]] = {
+    "0": [" ### ", "#   #", "#  ##", "# # #", "##  #", "#   #", " ### "],
+    "1": ["  #  ", " ##  ", "  #  ", "  #  ", "  #  ", "  #  ", " ### "],
+    "2": [" ### ", "#   #", "    #", "   # ", "  #  ", " #   ", "#####"],
+    "3": ["#####", "   # ", "  #  ", "   # ", "    #", "#   #", " ### "],
+    "4": ["   # ", "  ## ", " # # ", "#  # ", "#####", "   # ", "   # "],
+    "5": ["#####", "#    ", "#### ", "    #", "    #", "#   #", " ### "],
+    "6": ["  ## ", " #   ", "#    ", "#### ", "#   #", "#   #", " ### "],
+    "7": ["#####", "    #", "   # ", "  #  ", " #   ", " #   ", " #   "],
+    "8": [" ### ", "#   #", "#   #", " ### ", "#   #", "#   #", " ### "],
+    "9": [" ### ", "#   #", "#   #", " ####", "    #", "   # ", " ##  "],
+}
+
+
+def start_xvfb(
+    display: str = XVFB_DISPLAY,
+    screen: str = "320x240x24",
+) -> Optional[subprocess.Popen]:
+    """Starts an Xvfb server with MIT-SHM when no X display is available."""
+    if os.environ.get("DISPLAY") or shutil.which("Xvfb") is None:
+        return None
+
+    xvfb = subprocess.Popen(
+        ["Xvfb", display, "-screen", "0", screen, "+extension", "MIT-SHM"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    os.environ["DISPLAY"] = display
+    for _ in range(50):
+        try:
+            Xlib.display.Display().close()
+            return xvfb
+        except Exception:
+            time.sleep(0.1)
+    xvfb.terminate()
+    del os.environ["DISPLAY"]
+    return None
+
+
+class SyntheticEquipment(NamedTuple):
+    """Names of the items to paint, items that aren't in the item
+    repository (e.g. "unknown") are not painted."""
+
+    equipped_amulet: str = "unknown"
+    equipped_ring: str = "unknown"
+    normal_action_amulet: str = "unknown"
+    emergency_action_amulet: str = "unknown"
+    tank_action_amulet: str = "unknown"
+    normal_action_ring: str = "unknown"
+    emergency_action_ring: str = "unknown"
+    tank_action_ring: str = "unknown"
+    magic_shield_status: str = MagicShieldStatus.OFF_COOLDOWN
+
+
+def gen_item_pixels(coords: EquipmentCoords, colors: ItemColors) -> Dict[Coord, int]:
+    return {
+        coords.north: colors.north,
+        coords.south: colors.south,
+        coords.left: colors.left,
+        coords.right: colors.right,
+    }
+
+
+def find_item(items: List[ItemEntry], name: str) -> Optional[ItemEntry]:
+    for item in items:
+        if item.name == name:
+            return item
+    return None
+
+
+def gen_equipment_pixels(
+    spec: TibiaWindowSpec, equipment: SyntheticEquipment
+) -> Dict[Coord, int]:
+    action_bar = spec.action_bar
+    amulets = spec.item_repository.amulets
+    rings = spec.item_repository.rings
+    slots = [
+        (amulets, equipment.equipped_amulet, spec.char_equipment.amulet, True),
+        (rings, equipment.equipped_ring, spec.char_equipment.ring, True),
+    ]
+    for items, name, center, delta in [
+        (amulets, equipment.normal_action_amulet, action_bar.amulet_center,
+         ACTION_BAR_AMULET_DELTA),
+        (amulets, equipment.emergency_action_amulet,
+         action_bar.emergency_amulet_center, ACTION_BAR_AMULET_DELTA),
+        (amulets, equipment.tank_action_amulet, action_bar.tank_amulet_center,
+         ACTION_BAR_AMULET_DELTA),
+        (rings, equipment.normal_action_ring, action_bar.ring_center,
+         ACTION_BAR_RING_DELTA),
+        (rings, equipment.emergency_action_ring, action_bar.emergency_ring_center,
+         ACTION_BAR_RING_DELTA),
+        (rings, equipment.tank_action_ring, action_bar.tank_ring_center,
+         ACTION_BAR_RING_DELTA),
+    ]:
+        if center:
+            slots.append((items, name, gen_square_coords(center, delta), False))
+
+    pixels: Dict[Coord, int] = {}
+    for items, name, coords, is_equipped in slots:
+        item = find_item(items, name)
+        if item is not None:
+            colors = item.equipped_colors if is_equipped else item.action_bar_colors
+            pixels.update(gen_item_pixels(coords, colors[0]))
+
+    magic_shield = action_bar.magic_shield
+    if equipment.magic_shield_status == MagicShieldStatus.OFF_COOLDOWN:
+        pixels[magic_shield.coord] = min(magic_shield.off_cooldown_color)
+    elif equipment.magic_shield_status == MagicShieldStatus.RECENTLY_CAST:
+        pixels[magic_shield.coord] = min(magic_shield.recently_cast_color)
+    return pixels
+
+
+def gen_menu_pixels(menu_name: str) -> Dict[Coord, int]:
+    return {
+        Coord(coord.x, coord.y): parse_hex_color(color)
+        for coord, color in MENU_SPECS[menu_name].items()
+    }
+
+
+def gen_number_pixels(rect: Rect, number: str) -> Dict[Coord, int]:
+    """Digit bitmaps scaled to the height of the rect, with 1 pixel of
+    padding, over the text background."""
+    scale = max(1, (rect.height - 2) // DIGIT_HEIGHT)
+    pixels = {
+        Coord(x, y): TEXT_BACKGROUND_COLOR
+        for x in range(rect.x, rect.x + rect.width)
+        for y in range(rect.y, rect.y + rect.height)
+    }
+    left = rect.x + 1
+    for digit in number:
+        bitmap = DIGIT_BITMAPS[digit]
+        for row, line in enumerate(bitmap):
+            for col, pixel in enumerate(line):
+                if pixel != "#":
+                    continue
+                for dy in range(scale):
+                    for dx in range(scale):
+                        coord = Coord(left + col * scale + dx, rect.y + 1 + row * scale + dy)
+                        if coord in pixels:
+                            pixels[coord] = TEXT_COLOR
+        left += (DIGIT_WIDTH + 1) * scale
+    return pixels
+
+
+class SyntheticTibiaWindow:
+    """A top-level X window that pixels are painted into."""
+
+    def __init__(self, width: int = SCREEN_WIDTH, height: int = SCREEN_HEIGHT):
+        self.width = width
+        self.height = height
+        self.display: Optional[Xlib.display.Display] = None
+        self.window = None
+
+    def __enter__(self) -> "SyntheticTibiaWindow":
+        self.open()
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    @property
+    def wid(self) -> int:
+        return self.window.id
+
+    def open(self):
+        self.display = Xlib.display.Display()
+        screen = self.display.screen()
+        self.window = screen.root.create_window(
+            0,
+            0,
+            self.width,
+            self.height,
+            0,
+            screen.root_depth,
+            background_pixel=BACKGROUND_COLOR,
+        )
+        self.window.map()
+        self.display.sync()
+
+    def close(self):
+        if self.window is not None:
+            self.window.destroy()
+            self.window = None
+        if self.display is not None:
+            self.display.close()
+            self.display = None
+
+    def paint(self, pixels: Dict[Coord, int]):
+        points_by_color: Dict[int, List[Coord]] = defaultdict(list)
+        for coord, color in pixels.items():
+            points_by_color[color].append(coord)
+        gc = self.window.create_gc()
+        try:
+            for color, points in points_by_color.items():
+                gc.change(foreground=color)
+                self.window.poly_point(
+                    gc, Xlib.X.CoordModeOrigin, [(p.x, p.y) for p in points]
+                )
+        finally:
+            gc.free()
+        self.display.sync()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3.8
+"""Vectorized searches of typed values (e.g. c_int) in the memory of a process.
+
+Memory is viewed as numpy arrays of the needle's type, at the needle's
+alignment, and whole chunks are compared at once instead of one address at a
+time. Besides equality, values can be matched by range, or by how much they
+changed since the previous search (e.g. "decreased by 20..40").
+"""
+
+from ctypes import c_byte
+from typing import Any, Callable, List, NamedTuple, Optional, Tuple, Union
+from traceback import format_exc
+
+import logging
+
+import numpy as np
+
+from tibia_terminator.reader.read_only_process import (
+    SEARCH_CHUNK_SIZE,
+    MemRegion,
+    ReadOnlyProcess,
+    group_addresses,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class TypedMatches(NamedTuple):
+    # Ascending addresses of the matches, as uint64.
+    addresses: np.ndarray
+    # Values at the addresses when they matched, of the searched dtype.
+    values: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.addresses)
+
+
+class EqualTo(NamedTuple):
+    value: int
+
+    def matches(self, values: np.ndarray, prev_values: Optional[np.ndarray] = None):
+        return values == self.value
+
+
+class InRange(NamedTuple):
+    """Values between low and high, both inclusive."""
+
+    low: int
+    high: int
+
+    def matches(self, values: np.ndarray, prev_values: Optional[np.ndarray] = None):
+        return (values >= self.low) & (values <= self.high)
+
+
+def check_prev_values(predicate: Any, prev_values: Optional[np.ndarray]):
+    if prev_values is None:
+        raise Exception(
+            f"{type(predicate).__name__} needs the values of a previous search."
+        )
+
+
+class ChangedBy(NamedTuple):
+    """Values that changed by low..high (inclusive) since the previous search,
+    e.g. ChangedBy(-40, -20) matches values that decreased by 20 to 40."""
+
+    low: int
+    high: int
+
+    def matches(self, values: np.ndarray, prev_values: Optional[np.ndarray] = None):
+        check_prev_values(self, prev_values)
+        delta = values.astype(np.int64) - prev_values.astype(np.int64)
+        return (delta >= self.low) & (delta <= self.high)
+
+
+class Changed(NamedTuple):
+    def matches(self, values: np.ndarray, prev_values: Optional[np.ndarray] = None):
+        check_prev_values(self, prev_values)
+        return values != prev_values
+
+
+class Unchanged(NamedTuple):
+    def matches(self, values: np.ndarray, prev_values: Optional[np.ndarray] = None):
+        check_prev_values(self, prev_values)
+        return values == prev_values
+
+
+class Increased(NamedTuple):
+    def matches(self, values: np.ndarray, prev_values: Optional[np.ndarray] = None):
+        check_prev_values(self, prev_values)
+        return values > prev_values
+
+
+class Decreased(NamedTuple):
+    def matches(self, values: np.ndarray, prev_values: Optional[np.ndarray] = None):
+        check_prev_values(self, prev_values)
+        return values < prev_values
+
+
+ValuePredicate = Union[
+    EqualTo, InRange, ChangedBy, Changed, Unchanged, Increased, Decreased
+]
+
+
+def empty_matches(dtype: np.dtype) -> TypedMatches:
+    return TypedMatches(np.empty(0, np.uint64), np.empty(0, dtype))
+
+
+def concat_matches(matches: List[TypedMatches], dtype: np.dtype) -> TypedMatches:
+    if not matches:
+        return empty_matches(dtype)
+    return TypedMatches(
+        np.concatenate([m.addresses for m in matches]),
+        np.concatenate([m.values for m in matches]),
+    )
+
+
+def search_region_typed(
+    proc: ReadOnlyProcess,
+    mem_region: MemRegion,
+    dtype: Any,
+    predicate: ValuePredicate,
+    chunk_size: int = SEARCH_CHUNK_SIZE,
+) -> TypedMatches:
+    """Searches the addresses of the region that are aligned to the dtype,
+    reading it in chunks into a single reused buffer."""
+    dtype = np.dtype(dtype)
+    itemsize = dtype.itemsize
+    chunk_size -= chunk_size % itemsize
+    start = -(-mem_region.start // itemsize) * itemsize
+    chunk_buffer = (c_byte * chunk_size)()
+    matches = []
+    for chunk_start in range(start, mem_region.end - itemsize + 1, chunk_size):
+        read_size = min(chunk_size, mem_region.end - chunk_start)
+        read_size -= read_size % itemsize
+        read_buffer = (c_byte * read_size).from_buffer(chunk_buffer)
+        proc.read_memory(chunk_start, read_buffer)
+        values = np.frombuffer(read_buffer, dtype)
+        indexes = np.flatnonzero(predicate.matches(values))
+        if len(indexes) > 0:
+            matches.append(
+                TypedMatches(
+                    np.uint64(chunk_start) + indexes.astype(np.uint64) * itemsize,
+                    # fancy indexing copies, the buffer is reused
+                    values[indexes],
+                )
+            )
+    return concat_matches(matches, dtype)
+
+
+def search_all_memory_typed(
+    proc: ReadOnlyProcess,
+    dtype: Any,
+    predicate: ValuePredicate,
+    writeable_only: bool = True,
+    mem_region_filter: Callable[[MemRegion], bool] = bool,
+    chunk_size: int = SEARCH_CHUNK_SIZE,
+) -> TypedMatches:
+    """Vectorized counterpart of ReadOnlyProcess.search_all_memory, e.g.
+    search_all_memory_typed(proc, c_int, EqualTo(1234))."""
+    dtype = np.dtype(dtype)
+    matches = []
+    for mem_region in filter(mem_region_filter, proc.list_mapped_regions(writeable_only)):
+        try:
+            matches.append(
+                search_region_typed(proc, mem_region, dtype, predicate, chunk_size)
+            )
+        except OSError as error:
+            logger.warning("Error: %s", error)
+            logger.warning("Traceback: %s", format_exc())
+            logger.warning("Failed to read map region: %s", mem_region)
+    return concat_matches(matches, dtype)
+
+
+def read_typed_values(
+    proc: ReadOnlyProcess, addresses: np.ndarray, dtype: Any
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Current values at the ascending addresses, and whether each address
+    could be read. The addresses are read in the same page groups as
+    ReadOnlyProcess.search_addresses, and one by one if a group can't be read."""
+    dtype = np.dtype(dtype)
+    itemsize = dtype.itemsize
+    values = np.zeros(len(addresses), dtype)
+    readable = np.ones(len(addresses), bool)
+    byte_offsets = np.arange(itemsize, dtype=np.int64)
+    lo = 0
+    for group_start, group_end, group in group_addresses(addresses.tolist(), itemsize):
+        hi = lo + len(group)
+        try:
+            data = proc.read_bytes(group_start, group_end - group_start)
+        except OSError:
+            # e.g. a page of the group got unmapped, read one by one
+            for i, address in enumerate(group, lo):
+                try:
+                    values[i] = np.frombuffer(proc.read_bytes(address, itemsize), dtype)[0]
+                except OSError:
+                    readable[i] = False
+        else:
+            group_bytes = np.frombuffer(data, np.uint8)
+            offsets = np.array(group, np.int64) - group_start
+            # the bytes of each value, which doesn't need to be aligned
+            value_bytes = group_bytes[offsets[:, None] + byte_offsets]
+            values[lo:hi] = value_bytes.view(dtype).reshape(-1)
+        lo = hi
+    return values, readable
+
+
+def search_addresses_typed(
+    proc: ReadOnlyProcess,
+    candidates: TypedMatches,
+    predicate: ValuePredicate,
+) -> TypedMatches:
+    """Vectorized counterpart of ReadOnlyProcess.search_addresses, narrows the
+    candidates down to the ones whose current value matches the predicate.
+    ChangedBy predicates compare against the values of the candidates, and
+    addresses that can't be read anymore are dropped."""
+    values, readable = read_typed_values(
+        proc, candidates.addresses, candidates.values.dtype
+    )
+    mask = readable & predicate.matches(values, candidates.values)
+    return TypedMatches(candidates.addresses[mask], values[mask])
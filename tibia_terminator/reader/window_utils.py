@@ -7,13 +7,21 @@ import subprocess
 import os
 import logging
 
-from typing import Union, List, Tuple, Iterable, TypeVar
+from typing import Union, List, Tuple, Iterable, TypeVar, Optional
 
 import Xlib.display  # python-xlib
 import PIL.Image  # python-imaging
 import PIL.ImageStat  # python-imaging
 
-from tibia_terminator.schemas.reader.common import Coord
+from tibia_terminator.common.lazy_evaluator import lazy
+from tibia_terminator.interface.keystroke_sender import KeystrokeSender
+from tibia_terminator.reader.shm_capture import ShmCapture
+from tibia_terminator.schemas.reader.common import (
+    Coord,
+    parse_hex_color,
+    to_hex_color,
+)
+from tibia_terminator.schemas.reader.interface_config_schema import Rect
 
 logger = logging.getLogger(__name__)
 
@@ -147,7 +155,13 @@ def matches_screen_slow(wid, coords: Iterable[XY], color_spec: List[str]) -> boo
     return match
 
 
-def send_key(wid: str, key: str) -> None:
+def send_key(
+    wid: str, key: str, keystroke_sender: Optional[KeystrokeSender] = None
+) -> None:
+    if keystroke_sender is not None:
+        keystroke_sender.send_key(key)
+        return
+
     # synchronously send the keystroke
     output = run_cmd(
         ["/usr/bin/xdotool", "key", "--window", str(wid), str(key)]
@@ -187,6 +201,38 @@ def left_click(wid: str, x: int, y: int) -> None:
         logging.info(click_output)
 
 
+def gen_bounding_rect(coords: Iterable[Coord]) -> Rect:
+    """Smallest rectangle that contains all of the coordinates."""
+    coords = list(coords)
+    min_x = min(coord.x for coord in coords)
+    min_y = min(coord.y for coord in coords)
+    max_x = max(coord.x for coord in coords)
+    max_y = max(coord.y for coord in coords)
+    return Rect(min_x, min_y, max_x - min_x + 1, max_y - min_y + 1)
+
+
+def bgrx_to_rgb(bgrx_bytes: Union[bytes, memoryview], offset: int = 0) -> int:
+    """Packs the BGRX pixel at the offset into a 24-bit 0xRRGGBB int."""
+    return (
+        bgrx_bytes[offset + 2] << 16
+        | bgrx_bytes[offset + 1] << 8
+        | bgrx_bytes[offset]
+    )
+
+
+def bgrx_to_hex_color(bgrx_bytes: Union[bytes, memoryview], offset: int = 0) -> str:
+    return to_hex_color(bgrx_to_rgb(bgrx_bytes, offset))
+
+
+class CaptureBackend:
+    # Use MIT-SHM when the X server supports it, otherwise use Xlib.
+    AUTO = "auto"
+    # Pixels are copied into a shared memory segment by the X server.
+    SHM = "shm"
+    # Pixels are sent through the X socket on every request.
+    XLIB = "xlib"
+
+
 class ScreenReader:
     """Reads pixels in the screen."""
 
@@ -195,12 +241,15 @@ class ScreenReader:
         tibia_wid: int = None,
         screen: Xlib.protocol.display.Screen = None,
         display: Xlib.display.Display = None,
+        capture_backend: str = CaptureBackend.AUTO,
     ):
         self.screen = screen
         self.display = display
         self.tibia_wid = tibia_wid
         self.tibia_window: Xlib.xobject.drawable.Window = None
         self.is_open = False
+        self.capture_backend = capture_backend
+        self.shm_capture: Optional[ShmCapture] = None
 
     def __enter__(self, *args, **kwargs) -> "ScreenReader":
         self.open()
@@ -219,8 +268,25 @@ class ScreenReader:
             self.tibia_window = Xlib.xobject.drawable.Window(
                 self.display.display, self.tibia_wid
             )
+        self.open_shm_capture()
+
+    def open_shm_capture(self):
+        if self.capture_backend == CaptureBackend.XLIB:
+            return
+
+        shm_capture = ShmCapture(self.tibia_wid)
+        try:
+            shm_capture.open()
+            self.shm_capture = shm_capture
+        except Exception as e:
+            if self.capture_backend == CaptureBackend.SHM:
+                raise
+            logger.info(f"MIT-SHM is unavailable, falling back to Xlib: {e}")
 
     def close(self):
+        if self.shm_capture:
+            self.shm_capture.close()
+            self.shm_capture = None
         self.tibia_window = None
         self.screen = None
         self.display.close()
@@ -247,19 +313,36 @@ class ScreenReader:
     def get_coord_color(self, coord: Coord) -> str:
         return self.get_pixel_color(coord.x, coord.y)
 
-    def get_area_image(self, x: int, y: int, width: int, height: int) -> PIL.Image:
+    def get_coord_rgb(self, coord: Coord) -> int:
+        return self.get_pixel_rgb(coord.x, coord.y)
+
+    def get_area_bytes(self, rect: Rect, slot: int = 0) -> Union[bytes, memoryview]:
+        """Fetches the BGRX bytes of an area of the window in a single request.
+
+        With the MIT-SHM backend the result is a view of a shared segment that
+        is overwritten by the next request for an area of the same size in the
+        same slot.
+        """
+        if self.shm_capture:
+            return self.shm_capture.capture(rect, slot)
+
         img_rgb_res = self.get_window().get_image(
-            x, y, width, height, Xlib.X.ZPixmap, 0xFFFFFFFF
+            rect.x, rect.y, rect.width, rect.height, Xlib.X.ZPixmap, 0xFFFFFFFF
         )
 
         if isinstance(img_rgb_res.data, str):
-            img_rgb_bytes = bytes(img_rgb_res.data, "utf-8")
-        else:
-            img_rgb_bytes = img_rgb_res.data
+            return bytes(img_rgb_res.data, "utf-8")
+        return img_rgb_res.data
 
+    def get_area_image(self, x: int, y: int, width: int, height: int) -> PIL.Image:
+        img_rgb_bytes = self.get_area_bytes(Rect(x, y, width, height))
         return PIL.Image.frombytes("RGB", (width, height), img_rgb_bytes, "raw", "BGRX")
 
-    def get_pixel_color(self, x: int, y: int) -> str:
+    def get_pixel_rgb(self, x: int, y: int) -> int:
+        """Color of the pixel as a packed 24-bit 0xRRGGBB int."""
+        if self.shm_capture:
+            return bgrx_to_rgb(self.shm_capture.capture(Rect(x, y, 1, 1)))
+
         pixel_rgb_res = self.get_pixel_rgb_bytes_xlib(x, y)
         # Sometimes the byte data comes back as a string
         # but the data backing that string are the actual bytes
@@ -268,8 +351,13 @@ class ScreenReader:
         else:
             pixel_rgb_bytes = pixel_rgb_res.data
 
-        rgb = pixel_rgb_bytes[2] << 16 | pixel_rgb_bytes[1] << 8 | pixel_rgb_bytes[0]
-        return f"{rgb:03x}"
+        return bgrx_to_rgb(pixel_rgb_bytes)
+
+    def get_pixel_color(self, x: int, y: int) -> str:
+        return to_hex_color(self.get_pixel_rgb(x, y))
+
+    def new_frame(self, rects: Iterable[Rect]) -> "ScreenFrame":
+        return ScreenFrame(self, rects)
 
     def get_pixel_color_slow(self, x: int, y: int) -> str:
         # We do not offset this, since it uses values relative to the
@@ -286,16 +374,81 @@ class ScreenReader:
         return list(map(get_pixel, coords))
 
     def get_pixels(self, coords: Iterable[XY]) -> List[str]:
-        def get_pixel(coord: XY) -> str:
-            return self.get_pixel_color(*coord)
+        return list(map(to_hex_color, self.get_pixels_rgb(coords)))
+
+    def get_pixels_rgb(self, coords: Iterable[XY]) -> List[int]:
+        if self.shm_capture:
+            coords = [Coord(*coord) for coord in coords]
+            frame = self.new_frame([gen_bounding_rect(coords)])
+            return [frame.get_coord_rgb(coord) for coord in coords]
+
+        def get_pixel(coord: XY) -> int:
+            return self.get_pixel_rgb(*coord)
 
         return list(map(get_pixel, coords))
 
-    def pixels_match(self, pixels_a: List[str], pixels_b: List[str]) -> bool:
+    def pixels_match(
+        self, pixels_a: List[Union[str, int]], pixels_b: List[Union[str, int]]
+    ) -> bool:
         match = True
         for i in range(0, len(pixels_a)):
-            match &= str(pixels_a[i]).lower() == str(pixels_b[i]).lower()
+            match &= parse_hex_color(pixels_a[i]) == parse_hex_color(pixels_b[i])
         return match
 
-    def matches_screen(self, coords: Iterable[XY], color_spec: List[str]) -> bool:
-        return self.pixels_match(self.get_pixels(coords), color_spec)
+    def matches_screen(
+        self, coords: Iterable[XY], color_spec: List[Union[str, int]]
+    ) -> bool:
+        return self.pixels_match(self.get_pixels_rgb(coords), color_spec)
+
+
+class ScreenFrame:
+    """Pixels of a set of window areas, each area is grabbed at most once.
+
+    Areas are grabbed lazily the first time one of their pixels is read, pixels
+    outside of all areas are read directly from the screen reader.
+    """
+
+    def __init__(self, screen_reader: ScreenReader, rects: Iterable[Rect]):
+        self.screen_reader = screen_reader
+        # Each area gets its own slot, so areas of the same size do not
+        # overwrite each other when they are backed by shared memory.
+        self.areas = [
+            (
+                rect,
+                lazy(lambda rect=rect, slot=slot: screen_reader.get_area_bytes(rect, slot)),
+            )
+            for slot, rect in enumerate(rects)
+        ]
+
+    def find_area(
+        self, x: int, y: int
+    ) -> Optional[Tuple[Rect, Union[bytes, memoryview]]]:
+        for rect, area_bytes in self.areas:
+            if (
+                rect.x <= x < rect.x + rect.width
+                and rect.y <= y < rect.y + rect.height
+            ):
+                return rect, area_bytes.get()
+        return None
+
+    def get_pixel_rgb(self, x: int, y: int) -> int:
+        area = self.find_area(x, y)
+        if area is None:
+            return self.screen_reader.get_pixel_rgb(x, y)
+
+        rect, area_bytes = area
+        offset = ((y - rect.y) * rect.width + (x - rect.x)) * 4
+        return bgrx_to_rgb(area_bytes, offset)
+
+    def get_pixel_color(self, x: int, y: int) -> str:
+        return to_hex_color(self.get_pixel_rgb(x, y))
+
+    def get_coord_rgb(self, coord: Coord) -> int:
+        return self.get_pixel_rgb(coord.x, coord.y)
+
+    def get_coord_color(self, coord: Coord) -> str:
+        return self.get_pixel_color(coord.x, coord.y)
+
+
+# Anything that pixels can be read from.
+PixelSource = Union[ScreenReader, ScreenFrame]
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3.8
 
-from marshmallow import fields
-from typing import Optional, NamedTuple, List, Union, Dict, Any
+from marshmallow import fields, ValidationError
+from typing import Optional, NamedTuple, List, Union, Dict, Any, FrozenSet
 from tibia_terminator.schemas.common import FactorySchema
 
 
@@ -15,6 +15,46 @@ class CoordColor(NamedTuple):
     color: str
 
 
+def parse_hex_color(color: Union[str, int]) -> int:
+    """Packs a hex color string, e.g. "b9a022", into a 24-bit 0xRRGGBB int."""
+    if isinstance(color, int):
+        return color
+    return int(color, 16)
+
+
+def to_hex_color(rgb: int) -> str:
+    return f"{rgb:03x}"
+
+
+class HexColor(fields.Field):
+    """A hex color string in JSON, a packed 24-bit 0xRRGGBB int in Python."""
+
+    def _serialize(self, value, attr, obj, **kwargs):
+        if value is None:
+            return None
+        return to_hex_color(value)
+
+    def _deserialize(self, value, attr, data, **kwargs):
+        try:
+            rgb = parse_hex_color(value)
+        except (TypeError, ValueError) as e:
+            raise ValidationError(f"Invalid hex color: {value}") from e
+        if not 0 <= rgb <= 0xFFFFFF:
+            raise ValidationError(f"Color out of range: {value}")
+        return rgb
+
+
+class HexColorSet(fields.List):
+    """A list of hex color strings in JSON, a frozenset of packed ints in
+    Python."""
+
+    def __init__(self, **kwargs):
+        super().__init__(HexColor(), **kwargs)
+
+    def _deserialize(self, value, attr, data, **kwargs) -> FrozenSet[int]:
+        return frozenset(super()._deserialize(value, attr, data, **kwargs))
+
+
 class CoordSchema(FactorySchema[Coord]):
     ctor = Coord
     x = fields.Int(required=True)
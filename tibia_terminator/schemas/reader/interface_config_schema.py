@@ -1,9 +1,14 @@
 #!/usr/bin/env python3.8
 
-from typing import NamedTuple, List, Optional, Dict, Any
+from typing import NamedTuple, List, Optional, Dict, Any, FrozenSet
 from marshmallow import fields
 from tibia_terminator.schemas.common import FactorySchema
-from tibia_terminator.schemas.reader.common import Coord, CoordSchema
+from tibia_terminator.schemas.reader.common import (
+    Coord,
+    CoordSchema,
+    HexColor,
+    HexColorSet,
+)
 
 
 class Rect(NamedTuple):
@@ -26,8 +31,9 @@ class Rect(NamedTuple):
 
 class MagicShieldSpec(NamedTuple):
     coord: Coord
-    recently_cast_color: List[str]
-    off_cooldown_color: List[str]
+    # Colors are packed 24-bit 0xRRGGBB ints.
+    recently_cast_color: FrozenSet[int]
+    off_cooldown_color: FrozenSet[int]
 
 
 class ActionBarSpec(NamedTuple):
@@ -49,10 +55,11 @@ class EquipmentCoords(NamedTuple):
 
 
 class ItemColors(NamedTuple):
-    north: str
-    south: str
-    left: str
-    right: str
+    # Colors are packed 24-bit 0xRRGGBB ints.
+    north: int
+    south: int
+    left: int
+    right: int
 
 
 class ItemEntry(NamedTuple):
@@ -91,16 +98,16 @@ class TibiaWindowSpec(NamedTuple):
 class MagicShieldSpecSchema(FactorySchema[MagicShieldSpec]):
     ctor = MagicShieldSpec
     coord = fields.Nested(CoordSchema, required=True)
-    recently_cast_color = fields.List(fields.Str(), required=True)
-    off_cooldown_color = fields.List(fields.Str(), required=True)
+    recently_cast_color = HexColorSet(required=True)
+    off_cooldown_color = HexColorSet(required=True)
 
 
 class ItemColorsSchema(FactorySchema[ItemColors]):
     ctor = ItemColors
-    north = fields.Str(required=True)
-    south = fields.Str(required=True)
-    left = fields.Str(required=True)
-    right = fields.Str(required=True)
+    north = HexColor(required=True)
+    south = HexColor(required=True)
+    left = HexColor(required=True)
+    right = HexColor(required=True)
 
 
 class ItemEntrySchema(FactorySchema[ItemEntry]):
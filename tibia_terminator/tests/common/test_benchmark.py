@@ -0,0 +1,78 @@
+#!/usr/bin/env python3.8
+
+import unittest
+
+from unittest import TestCase
+
+from tibia_terminator.common.benchmark import (
+    gen_benchmark_table,
+    get_percentile,
+    run_benchmark,
+    summarize,
+)
+
+
+class FakeTimer:
+    def __init__(self, elapsed_secs):
+        self.times = []
+        now = 0.0
+        for elapsed_sec in elapsed_secs:
+            self.times += [now, now + elapsed_sec]
+            now += elapsed_sec + 1
+
+    def timer(self) -> float:
+        return self.times.pop(0)
+
+
+class TestBenchmark(TestCase):
+    def test_get_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(get_percentile(values, 50), 50)
+        self.assertEqual(get_percentile(values, 99), 99)
+        self.assertEqual(get_percentile(values, 100), 100)
+        self.assertEqual(get_percentile([7], 1), 7)
+        self.assertEqual(get_percentile([], 50), 0.0)
+
+    def test_run_benchmark(self):
+        # given
+        calls = []
+        fake_timer = FakeTimer([0.001, 0.003, 0.002])
+        # when
+        result = run_benchmark(
+            "bench",
+            lambda: calls.append(1),
+            rounds=3,
+            warmup_rounds=2,
+            timer=fake_timer.timer,
+        )
+        # then
+        self.assertEqual(len(calls), 5)
+        self.assertEqual(result.name, "bench")
+        self.assertEqual(result.rounds, 3)
+        self.assertAlmostEqual(result.min_ms, 1)
+        self.assertAlmostEqual(result.max_ms, 3)
+        self.assertAlmostEqual(result.mean_ms, 2)
+        self.assertAlmostEqual(result.stddev_ms, 1)
+        self.assertAlmostEqual(result.median_ms, 2)
+        self.assertAlmostEqual(result.ops_per_sec, 500)
+
+    def test_summarize_without_rounds(self):
+        with self.assertRaises(Exception):
+            summarize("bench", [])
+
+    def test_gen_benchmark_table(self):
+        # given
+        results = [summarize("fast", [1.0, 1.0]), summarize("slower.path", [2.0])]
+        # when
+        lines = gen_benchmark_table(results)
+        # then
+        self.assertEqual(len(lines), 6)
+        self.assertTrue(lines[1].startswith("Name (time in ms)"))
+        self.assertTrue(lines[3].startswith("fast "))
+        self.assertTrue(lines[4].startswith("slower.path "))
+        self.assertTrue(lines[4].endswith("  1"))
+        self.assertEqual(len({len(line) for line in lines}), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3.8
+
+import os
+import tempfile
+import unittest
+
+from unittest import TestCase
+
+from tibia_terminator.common.char_status import CharStatus
+from tibia_terminator.common.char_status_trace import (
+    EQUIPMENT_FIELDS,
+    CharStatusRecorder,
+    read_char_status_trace,
+)
+from tibia_terminator.reader.color_spec import AmuletName, RingName
+from tibia_terminator.reader.equipment_reader import MagicShieldStatus
+
+
+def status(read_ts, hp=100, mana=90, equipped_ring=RingName.UNKNOWN.name):
+    return CharStatus(
+        hp,
+        110,
+        mana,
+        5,
+        {
+            "normal_action_amulet": AmuletName.UNKNOWN.name,
+            "emergency_action_amulet": AmuletName.UNKNOWN.name,
+            "tank_action_amulet": AmuletName.UNKNOWN.name,
+            "equipped_amulet": AmuletName.EMPTY.name,
+            "normal_action_ring": RingName.UNKNOWN.name,
+            "emergency_action_ring": RingName.UNKNOWN.name,
+            "tank_action_ring": RingName.UNKNOWN.name,
+            "equipped_ring": equipped_ring,
+            "magic_shield_status": MagicShieldStatus.OFF_COOLDOWN,
+        },
+        read_ts,
+    )
+
+
+class TestCharStatusTrace(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "trace.bin")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        # given
+        statuses = [
+            status(10.0),
+            status(10.5, hp=-1, mana=99999),
+            status(11.25, equipped_ring=RingName.MIGHT.name),
+        ]
+        with CharStatusRecorder(self.path) as recorder:
+            for char_status in statuses:
+                recorder.record(char_status)
+        # when
+        trace = list(read_char_status_trace(self.path))
+        # then
+        self.assertEqual([traced.ts_sec for traced in trace], [0.0, 0.5, 1.25])
+        for expected, (_, actual) in zip(statuses, trace):
+            self.assertEqual(
+                (actual.hp, actual.mana, actual.speed, actual.magic_shield_level),
+                (expected.hp, expected.mana, expected.speed, expected.magic_shield_level),
+            )
+            for field in EQUIPMENT_FIELDS:
+                self.assertEqual(getattr(actual, field), getattr(expected, field))
+
+    def test_equipment_values_are_canonical(self):
+        # given
+        with CharStatusRecorder(self.path) as recorder:
+            recorder.record(status(10.0))
+        # when
+        (_, actual), = read_char_status_trace(self.path)
+        # then keepers compare some of them by identity
+        self.assertIs(actual.magic_shield_status, MagicShieldStatus.OFF_COOLDOWN)
+        self.assertIs(actual.equipped_amulet, AmuletName.EMPTY.name)
+        self.assertIs(actual.equipped_ring, RingName.UNKNOWN.name)
+
+    def test_equipment_values_are_written_once(self):
+        # given
+        with CharStatusRecorder(self.path) as recorder:
+            recorder.record(status(0.0))
+        one_status_size = os.path.getsize(self.path)
+        # when
+        with CharStatusRecorder(self.path) as recorder:
+            for i in range(11):
+                recorder.record(status(i))
+        # then
+        self.assertLess(os.path.getsize(self.path), one_status_size + 10 * 50)
+
+    def test_truncated_trace(self):
+        # given
+        with CharStatusRecorder(self.path) as recorder:
+            recorder.record(status(0.0))
+        with open(self.path, "rb+") as f:
+            f.truncate(os.path.getsize(self.path) - 1)
+        # when
+        with self.assertRaises(Exception):
+            list(read_char_status_trace(self.path))
+
+    def test_not_a_trace(self):
+        # given
+        with open(self.path, "wb") as f:
+            f.write(b"not a trace")
+        # when
+        with self.assertRaises(Exception):
+            list(read_char_status_trace(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3.8
+
+import json
+import os
+import tempfile
+import unittest
+
+from unittest import TestCase
+
+from tibia_terminator.common.latency_histogram import (
+    BUCKET_COUNT,
+    LatencyHistogram,
+    LatencyHistograms,
+    get_bucket_index,
+    get_bucket_value,
+)
+
+
+class TestBuckets(TestCase):
+    def test_bucket_round_trip(self):
+        for value_us in [0, 1, 127, 128, 129, 255, 256, 1000, 12345, 2_000_000]:
+            # when
+            bucket_value = get_bucket_value(get_bucket_index(value_us))
+            # then
+            self.assertGreaterEqual(bucket_value, value_us)
+            self.assertLessEqual(bucket_value - value_us, value_us / 64 + 1)
+
+    def test_bucket_indexes_are_contiguous(self):
+        # when
+        indexes = [get_bucket_index(get_bucket_value(i)) for i in range(BUCKET_COUNT)]
+        # then
+        self.assertEqual(indexes, list(range(BUCKET_COUNT)))
+
+    def test_huge_values_go_to_last_bucket(self):
+        self.assertEqual(get_bucket_index(1 << 40), BUCKET_COUNT - 1)
+
+
+class TestLatencyHistogram(TestCase):
+    def test_summary(self):
+        # given
+        target = LatencyHistogram()
+        for value_ms in range(1, 101):
+            target.record_ms(value_ms)
+        # when
+        summary = target.summary()
+        # then
+        self.assertEqual(summary.count, 100)
+        self.assertAlmostEqual(summary.p50_ms, 50, delta=1)
+        self.assertAlmostEqual(summary.p90_ms, 90, delta=1.5)
+        self.assertAlmostEqual(summary.p99_ms, 99, delta=1.6)
+        self.assertEqual(summary.max_ms, 100)
+
+    def test_empty_summary(self):
+        # when
+        summary = LatencyHistogram().summary()
+        # then
+        self.assertEqual(tuple(summary), (0, 0.0, 0.0, 0.0, 0.0))
+
+    def test_percentile_is_capped_to_max(self):
+        # given
+        target = LatencyHistogram()
+        target.record_ms(10.001)
+        # when
+        p50_ms = target.get_percentile_ms(50)
+        # then
+        self.assertEqual(p50_ms, 10.001)
+
+
+class TestLatencyHistograms(TestCase):
+    def test_timed(self):
+        # given
+        target = LatencyHistograms()
+        timed_fn = target.timed("stage", lambda x: x + 1)
+        # when
+        result = timed_fn(1)
+        # then
+        self.assertEqual(result, 2)
+        self.assertEqual(target.get("stage").count, 1)
+
+    def test_timed_records_failures(self):
+        # given
+        target = LatencyHistograms()
+
+        def fail():
+            raise Exception("failed")
+
+        # when
+        with self.assertRaises(Exception):
+            target.timed("stage", fail)()
+        # then
+        self.assertEqual(target.get("stage").count, 1)
+
+    def test_gen_summary_lines(self):
+        # given
+        target = LatencyHistograms()
+        target.record_ms("render", 2)
+        target.record_ms("memory_read", 1)
+        # when
+        lines = target.gen_summary_lines()
+        # then
+        self.assertEqual(
+            lines,
+            [
+                "memory_read: p50 1.0 p90 1.0 p99 1.0 max 1.0 ms (1)",
+                "render: p50 2.0 p90 2.0 p99 2.0 max 2.0 ms (1)",
+            ],
+        )
+
+    def test_gen_summary_lines_worst_first(self):
+        # given
+        target = LatencyHistograms()
+        target.record_ms("memory_read", 1)
+        target.record_ms("render", 2)
+        # when
+        lines = target.gen_summary_lines(worst_first=True)
+        # then
+        self.assertEqual(
+            lines,
+            [
+                "render: p50 2.0 p90 2.0 p99 2.0 max 2.0 ms (1)",
+                "memory_read: p50 1.0 p90 1.0 p99 1.0 max 1.0 ms (1)",
+            ],
+        )
+
+    def test_dump(self):
+        # given
+        target = LatencyHistograms()
+        target.record_ms("tick", 5)
+        target.record_ms("tick", 5)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "latencies.json")
+            # when
+            target.dump(path)
+            # then
+            with open(path, "r", encoding="utf-8") as f:
+                dump = json.load(f)
+        self.assertEqual(dump["tick"]["summary"]["count"], 2)
+        self.assertEqual(dump["tick"]["summary"]["max_ms"], 5)
+        self.assertEqual(sum(dump["tick"]["buckets_ms"].values()), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
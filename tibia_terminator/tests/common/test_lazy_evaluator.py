@@ -4,8 +4,17 @@ import unittest
 import time
 
 from unittest import TestCase
-from threading import Event
-from tibia_terminator.common.lazy_evaluator import LazyValue, FutureValueAsync, TaskLoop
+from threading import Barrier, Event
+from tibia_terminator.common.lazy_evaluator import (
+    LazyValue,
+    FutureValueAsync,
+    FutureTask,
+    MultiLaneTaskLoop,
+    TaskCancelledError,
+    TaskLoop,
+    WorkerPool,
+    future,
+)
 
 
 def get_value(time_ms: float = 10) -> int:
@@ -68,6 +77,137 @@ class TestFutureValueAsync(TestCase):
         self.assertRaises(ZeroDivisionError, target.get)
 
 
+class TestFutureTask(TestCase):
+    def test_run(self):
+        # given
+        results = []
+        target = FutureTask(lambda: 42, results.append)
+        # when
+        target.run()
+        target.run()
+        # then
+        self.assertEqual(target.get(), 42)
+        self.assertEqual(results, [42])
+
+    def test_cancel(self):
+        # given
+        errors = []
+        target = FutureTask(lambda: 42, failure_cb=errors.append)
+        # when
+        cancelled = target.cancel()
+        target.run()
+        # then
+        self.assertTrue(cancelled)
+        self.assertTrue(target.is_cancelled())
+        self.assertRaises(TaskCancelledError, target.get)
+        self.assertIsInstance(errors[0], TaskCancelledError)
+
+    def test_cancel_after_run(self):
+        # given
+        target = FutureTask(lambda: 42)
+        target.run()
+        # when
+        cancelled = target.cancel()
+        # then
+        self.assertFalse(cancelled)
+        self.assertEqual(target.get(), 42)
+
+    def test_peek(self):
+        # given
+        target = FutureTask(lambda: 42)
+        # when
+        before_run = target.peek("default")
+        target.run()
+        after_run = target.peek("default")
+        # then
+        self.assertEqual(before_run, "default")
+        self.assertEqual(after_run, 42)
+
+    def test_peek_cancelled(self):
+        # given
+        target = FutureTask(lambda: 42)
+        target.cancel()
+        # when
+        actual = target.peek("default")
+        # then
+        self.assertEqual(actual, "default")
+
+    def test_peek_error(self):
+        # given
+        target = FutureTask(lambda: 1 / 0)
+        target.run()
+        # when
+        self.assertRaises(ZeroDivisionError, target.peek, "default")
+
+
+class TestWorkerPool(TestCase):
+    def test_submit(self):
+        # given
+        target = WorkerPool(max_workers=2)
+        try:
+            # when
+            futures = [target.submit(lambda i=i: i * 2) for i in range(10)]
+            # then
+            self.assertEqual([f.get(1) for f in futures], list(range(0, 20, 2)))
+            self.assertLessEqual(len(target.workers), 2)
+        finally:
+            target.shutdown()
+
+    def test_submit_error(self):
+        # given
+        target = WorkerPool(max_workers=1)
+        try:
+            # when
+            actual = target.submit(lambda: 1 / 0)
+            # then
+            self.assertRaises(ZeroDivisionError, actual.get, 1)
+        finally:
+            target.shutdown()
+
+    def test_reuses_workers(self):
+        # given
+        target = WorkerPool(max_workers=4)
+        try:
+            # when
+            for _ in range(20):
+                target.submit(time.time).get(1)
+            # then
+            self.assertEqual(len(target.workers), 1)
+        finally:
+            target.shutdown()
+
+    def test_shutdown_cancels_pending_tasks(self):
+        # given
+        task_started = Event()
+        task_wait = Event()
+
+        def task():
+            task_started.set()
+            return task_wait.wait()
+
+        target = WorkerPool(max_workers=1)
+        running = target.submit(task)
+        pending = target.submit(lambda: True)
+        task_started.wait()
+        # when
+        target.shutdown()
+        task_wait.set()
+        # then
+        self.assertTrue(running.get(1))
+        self.assertRaises(TaskCancelledError, pending.get, 1)
+
+    def test_future(self):
+        # given
+        pool = WorkerPool(max_workers=1)
+        try:
+            # when
+            actual = future(lambda: 42, pool=pool, success_cb=lambda _: None)
+            # then
+            self.assertEqual(actual.get(1), 42)
+        finally:
+            pool.shutdown()
+
+
 class TestTaskLoop(TestCase):
     def test_add_task(self):
         # given
@@ -162,5 +302,101 @@ class TestTaskLoop(TestCase):
             target.stop()
 
 
+    def test_cancel_pending_futures(self):
+        # given
+        task_started = Event()
+        task_wait = Event()
+
+        def task():
+            task_started.set()
+            task_wait.wait()
+
+        errors = []
+        target = TaskLoop()
+        target.add_task(task)
+        cancelled_1 = target.add_future(lambda: 1, failure_cb=errors.append)
+        cancelled_2 = target.add_future(lambda: 2)
+        target.start()
+        try:
+            task_started.wait()
+            # when
+            discarded = target.cancel_pending_tasks()
+            task_wait.set()
+            # then
+            self.assertEqual(discarded, 2)
+            self.assertRaises(TaskCancelledError, cancelled_1.get, 1)
+            self.assertRaises(TaskCancelledError, cancelled_2.get, 1)
+            self.assertIsInstance(errors[0], TaskCancelledError)
+            self.assertTrue(target.add_future(lambda: True).get(1))
+        finally:
+            target.stop()
+
+    def test_cancel_pending_tasks_keeps_stop(self):
+        # given
+        target = TaskLoop()
+        target.add_task(lambda: None)
+        target.stop()
+        # when
+        discarded = target.cancel_pending_tasks()
+        target.start()
+        # then
+        target.join(1)
+        self.assertEqual(discarded, 1)
+        self.assertFalse(target.is_alive())
+
+    def test_add_future_after_stop(self):
+        # given
+        target = TaskLoop()
+        target.start()
+        target.stop()
+        target.join(1)
+        # when
+        actual = target.add_future(lambda: True)
+        # then
+        self.assertRaises(TaskCancelledError, actual.get, 1)
+
+
+class TestMultiLaneTaskLoop(TestCase):
+    def test_lanes_run_in_parallel(self):
+        # given
+        barrier = Barrier(2, timeout=1)
+        target = MultiLaneTaskLoop(lanes=2)
+        lane_0 = target.add_future(barrier.wait, lane=0)
+        lane_1 = target.add_future(barrier.wait, lane=1)
+        # when
+        target.start()
+        try:
+            # then
+            self.assertEqual({lane_0.get(1), lane_1.get(1)}, {0, 1})
+        finally:
+            target.stop()
+
+    def test_lane_runs_in_order(self):
+        # given
+        target = MultiLaneTaskLoop(lanes=2)
+        future_time_1 = target.add_future(time.time, lane=3)
+        future_time_2 = target.add_future(time.time, lane=1)
+        # when
+        target.start()
+        try:
+            # then
+            self.assertGreater(future_time_2.get(), future_time_1.get())
+            self.assertIs(target.get_lane(3), target.get_lane(1))
+        finally:
+            target.stop()
+
+
+    def test_cancel_pending_tasks(self):
+        # given
+        target = MultiLaneTaskLoop(lanes=3)
+        futures = [target.add_future(lambda: True, lane=lane) for lane in range(3)]
+        # when
+        discarded = target.cancel_pending_tasks()
+        # then
+        self.assertEqual(discarded, 3)
+        for future_value in futures:
+            self.assertRaises(TaskCancelledError, future_value.get, 1)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3.8
+
+import os
+import tempfile
+import unittest
+
+from unittest import TestCase
+
+from tibia_terminator.common.logger import (
+    ActionLogRing,
+    StatsLogger,
+    get_debug_level,
+    read_action_log_spill,
+    set_debug_level,
+)
+
+
+class Unformattable:
+    def __str__(self):
+        raise Exception("Formatted an entry that wasn't displayed.")
+
+
+class TestActionLogRing(TestCase):
+    def test_get_latest(self):
+        # given
+        target = ActionLogRing(4)
+        for i in range(3):
+            target.append(0, "entry %s", (i,))
+        # when
+        actual = [entry.format() for entry in target.get_latest(2)]
+        # then
+        self.assertEqual(actual, ["entry 2", "entry 1"])
+
+    def test_get_latest_wraps_around(self):
+        # given
+        target = ActionLogRing(4)
+        for i in range(10):
+            target.append(0, "entry %s", (i,))
+        # when
+        actual = [entry.format() for entry in target.get_latest(10)]
+        # then
+        self.assertEqual(actual, ["entry 9", "entry 8", "entry 7", "entry 6"])
+        self.assertEqual(target.next_seq, 10)
+
+    def test_get_latest_only_formats_displayed(self):
+        # given
+        target = ActionLogRing(4)
+        target.append(0, "hidden %s", (Unformattable(),))
+        target.append(0, "shown %s", ("entry",))
+        # when
+        actual = [entry.format() for entry in target.get_latest(1)]
+        # then
+        self.assertEqual(actual, ["shown entry"])
+
+    def test_format_without_args(self):
+        # given
+        target = ActionLogRing(4)
+        target.append(0, "100% raw")
+        # when
+        actual = target.get_latest(1)[0].format()
+        # then
+        self.assertEqual(actual, "100% raw")
+
+    def test_format_mismatched_args(self):
+        # given
+        target = ActionLogRing(4)
+        target.append(0, "%s and %s", ("one",))
+        target.append(0, "%d ms", ("fast",))
+        # when
+        actual = [entry.format() for entry in target.get_latest(2)]
+        # then
+        self.assertEqual(actual, ["%d ms ('fast',)", "%s and %s ('one',)"])
+
+    def test_spill(self):
+        # given
+        target = ActionLogRing(2)
+        for i in range(3):
+            target.append(i, "entry %s", (i,))
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        # when
+        target.spill(path)
+        actual = list(read_action_log_spill(path))
+        # then
+        self.assertEqual(
+            [(entry.seq, entry.debug_level, entry.format()) for entry in actual],
+            [(1, 1, "entry 1"), (2, 2, "entry 2")],
+        )
+
+
+class TestStatsLogger(TestCase):
+    def setUp(self):
+        prev_debug_level = get_debug_level()
+        self.addCleanup(set_debug_level, prev_debug_level)
+        set_debug_level(1)
+
+    def test_log_action(self):
+        # given
+        target = StatsLogger()
+        # when
+        target.log_action(1, "cast_minor_heal %s ms", 200)
+        # then
+        entry = target.action_log.get_latest(1)[0]
+        self.assertEqual(entry.format(), "cast_minor_heal 200 ms")
+
+    def test_log_action_above_debug_level(self):
+        # given
+        target = StatsLogger()
+        # when
+        target.log_action(2, "cast_minor_heal %s ms", 200)
+        # then
+        self.assertEqual(target.action_log.get_latest(1), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
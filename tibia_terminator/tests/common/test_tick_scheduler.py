@@ -0,0 +1,96 @@
+#!/usr/bin/env python3.8
+
+import unittest
+
+from unittest import TestCase
+
+from tibia_terminator.common.tick_scheduler import TickScheduler
+from tibia_terminator.keeper.common import RefillPriority
+
+INTERVAL_MS_BY_PRIORITY = {
+    RefillPriority.CRITICAL: 10,
+    RefillPriority.HIGH_PRIORITY: 20,
+    RefillPriority.DOWNTIME: 50,
+    RefillPriority.NO_REFILL: 100,
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now_sec = 1000.0
+        self.sleeps = []
+
+    def clock(self) -> float:
+        return self.now_sec
+
+    def sleep(self, secs: float):
+        self.sleeps.append(round(secs, 6))
+        self.now_sec += secs
+
+    def work(self, millis: float):
+        self.now_sec += millis / 1000
+
+
+class TestTickScheduler(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.target = TickScheduler(
+            INTERVAL_MS_BY_PRIORITY,
+            idle_interval_ms=250,
+            clock=self.clock.clock,
+            sleep=self.clock.sleep,
+        )
+
+    def test_wait_next_tick(self):
+        # given
+        self.target.wait_next_tick(RefillPriority.DOWNTIME)
+        self.clock.work(20)
+        # when
+        self.target.wait_next_tick(RefillPriority.DOWNTIME)
+        # then
+        self.assertEqual(self.clock.sleeps, [0.05, 0.03])
+
+    def test_wait_next_tick_does_not_drift(self):
+        # given
+        self.target.wait_next_tick(RefillPriority.DOWNTIME)
+        start_sec = self.clock.now_sec
+        # when
+        for work_ms in (5, 13, 40, 1, 22):
+            self.clock.work(work_ms)
+            self.target.wait_next_tick(RefillPriority.DOWNTIME)
+        # then
+        self.assertAlmostEqual(self.clock.now_sec - start_sec, 0.25)
+
+    def test_wait_next_tick_overrun(self):
+        # given
+        self.target.wait_next_tick(RefillPriority.DOWNTIME)
+        self.clock.work(80)
+        # when
+        slept = self.target.wait_next_tick(RefillPriority.DOWNTIME)
+        self.clock.work(10)
+        self.target.wait_next_tick(RefillPriority.DOWNTIME)
+        # then
+        self.assertEqual(slept, 0)
+        self.assertEqual(self.clock.sleeps, [0.05, 0.04])
+
+    def test_wait_next_tick_by_priority(self):
+        # when
+        self.target.wait_next_tick(RefillPriority.CRITICAL)
+        self.target.wait_next_tick(RefillPriority.HIGH_PRIORITY)
+        self.target.wait_next_tick(RefillPriority.NO_REFILL)
+        self.target.wait_next_tick(None)
+        # then
+        self.assertEqual(self.clock.sleeps, [0.01, 0.02, 0.1, 0.25])
+
+    def test_faster_priority_applies_immediately(self):
+        # given
+        self.target.wait_next_tick(None)
+        self.clock.work(30)
+        # when
+        slept = self.target.wait_next_tick(RefillPriority.CRITICAL)
+        # then
+        self.assertEqual(slept, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,20 +1,31 @@
 #!/usr/bin/env python3.8
 
+import threading
+import time
 import unittest
 
+from contextlib import contextmanager
+
 import tibia_terminator.interface.client_interface as sut
 
 from tibia_terminator.interface.client_interface import (
     Command,
-    ThrottleBehavior,
+    CommandScheduler,
     CommandSender,
+    KeeperHotkeyCommand,
+    MacroCommand,
+    ThrottleBehavior,
+    command_origin,
 )
+from tibia_terminator.common.latency_histogram import get_latency_histograms
+from tibia_terminator.common.lazy_evaluator import WorkerPool
+from tibia_terminator.interface.keystroke_sender import KeystrokeSender
 from unittest import TestCase
 from typing import List
 
 
 class FakeStatsLogger:
-    def log_action(self, debug_level: int, msg: str) -> None:
+    def log_action(self, debug_level: int, fmt: str, *args) -> None:
         pass
 
 
@@ -204,5 +215,328 @@ class TestClientInterface(TestCase):
         )
 
 
+class TestCommandOrigin(TestCase):
+    def test_cmds_are_stamped_with_origin(self) -> None:
+        # when
+        with command_origin(1.0):
+            with command_origin(2.0):
+                inner_cmd = FakeCommand("_test_cmd_type_", 0)
+            outer_cmd = FakeCommand("_test_cmd_type_", 0)
+        no_origin_cmd = FakeCommand("_test_cmd_type_", 0)
+        # then
+        self.assertEqual(inner_cmd.origin_ts, 2.0)
+        self.assertEqual(outer_cmd.origin_ts, 1.0)
+        self.assertIsNone(no_origin_cmd.origin_ts)
+
+    def test_origin_is_per_thread(self) -> None:
+        # given
+        other_thread_cmds = []
+        other_thread = threading.Thread(
+            target=lambda: other_thread_cmds.append(FakeCommand("_test_cmd_type_", 0))
+        )
+        # when
+        with command_origin(1.0):
+            other_thread.start()
+            other_thread.join()
+        # then
+        self.assertIsNone(other_thread_cmds[0].origin_ts)
+
+
+class FakeWorkerPool:
+    def __init__(self):
+        self.tasks = []
+
+    def submit(self, getter):
+        self.tasks.append(getter)
+
+
+class TestCommandScheduler(TestCase):
+    def setUp(self) -> None:
+        self.now_ms = 1000
+        sut.timestamp_ms = lambda: self.now_ms
+        self.worker_pool = FakeWorkerPool()
+        self.target = CommandScheduler(
+            "_test_tibia_wid_", FakeStatsLogger(), False, self.worker_pool
+        )
+
+    def tearDown(self) -> None:
+        self.target.stop()
+
+    def make_cmd(
+        self,
+        throttle_behavior: ThrottleBehavior,
+        throttle_ms: int = 0,
+        cmd_id: str = "_test_cmd_id_",
+        cmd_type: str = "_test_cmd_type_",
+    ) -> Command:
+        return FakeCommand(
+            cmd_type=cmd_type,
+            throttle_ms=throttle_ms,
+            cmd_id=cmd_id,
+            throttle_behavior=throttle_behavior,
+        )
+
+    def issue_next_cmd(self) -> Command:
+        cmd, _ = self.target.fetch_next_cmd()
+        if cmd is not None:
+            self.target.issue_cmd(cmd)
+        return cmd
+
+    def test_drop_throttled_cmd_on_send(self) -> None:
+        # given
+        self.target.send(self.make_cmd(ThrottleBehavior.DROP))
+        self.issue_next_cmd()
+        self.now_ms += 5
+        # when
+        self.target.send(self.make_cmd(ThrottleBehavior.DROP, throttle_ms=10))
+        # then
+        self.assertEqual(self.target.pending_cmds, [])
+
+    def test_requeued_cmd_waits_until_eligible(self) -> None:
+        # given
+        self.target.send(self.make_cmd(ThrottleBehavior.DROP, cmd_id="first"))
+        self.issue_next_cmd()
+        requeue_cmd = self.make_cmd(ThrottleBehavior.REQUEUE_TOP, throttle_ms=10)
+        self.target.send(requeue_cmd)
+        self.now_ms += 4
+        # when
+        throttled = self.target.fetch_next_cmd()
+        self.now_ms += 6
+        eligible = self.target.fetch_next_cmd()
+        # then
+        self.assertEqual(throttled, (None, 6))
+        self.assertEqual(eligible, (requeue_cmd, None))
+
+    def test_requeued_cmd_is_queued_once(self) -> None:
+        # given
+        self.target.send(self.make_cmd(ThrottleBehavior.DROP, cmd_id="first"))
+        self.issue_next_cmd()
+        # when
+        for _ in range(3):
+            self.target.send(self.make_cmd(ThrottleBehavior.REQUEUE_BACK, 10))
+        # then
+        self.assertEqual(len(self.target.pending_cmds), 1)
+
+    def test_pending_cmd_is_coalesced(self) -> None:
+        # given
+        self.target.send(self.make_cmd(ThrottleBehavior.DROP, cmd_id="first"))
+        self.issue_next_cmd()
+        self.target.send(self.make_cmd(ThrottleBehavior.REQUEUE_BACK, 50))
+        other_cmd = self.make_cmd(ThrottleBehavior.REQUEUE_BACK, 20, cmd_id="other")
+        self.target.send(other_cmd)
+        # when
+        coalesced_cmd = self.make_cmd(ThrottleBehavior.REQUEUE_TOP, 20)
+        self.target.send(coalesced_cmd)
+        self.now_ms += 20
+        cmd, _ = self.target.fetch_next_cmd()
+        # then
+        self.assertIs(cmd, coalesced_cmd)
+        self.assertEqual(len(self.target.pending_cmds), 1)
+        self.assertEqual(
+            list(self.target.pending_cmds_by_id.keys()), [("_test_cmd_type_", "other")]
+        )
+
+    def test_coalesced_cmd_keeps_first_origin(self) -> None:
+        # given
+        self.target.send(self.make_cmd(ThrottleBehavior.DROP, cmd_id="first"))
+        self.issue_next_cmd()
+        with command_origin(1.0):
+            self.target.send(self.make_cmd(ThrottleBehavior.REQUEUE_BACK, 50))
+        # when
+        with command_origin(2.0):
+            coalesced_cmd = self.make_cmd(ThrottleBehavior.REQUEUE_BACK, 50)
+        self.target.send(coalesced_cmd)
+        # then
+        self.assertEqual(coalesced_cmd.origin_ts, 1.0)
+
+    def test_reaction_time_is_recorded_by_cmd_id(self) -> None:
+        # given
+        histogram = get_latency_histograms().get("reaction._reaction_cmd_id_")
+        prev_count = histogram.count
+        with command_origin(time.perf_counter()):
+            self.target.send(self.make_cmd(ThrottleBehavior.DROP, cmd_id="_reaction_cmd_id_"))
+        self.target.send(self.make_cmd(ThrottleBehavior.DROP, cmd_id="_no_origin_"))
+        # when
+        self.issue_next_cmd()
+        self.issue_next_cmd()
+        # then
+        self.assertEqual(histogram.count, prev_count + 1)
+        self.assertNotIn(
+            "reaction._no_origin_", get_latency_histograms().summaries().keys()
+        )
+
+    def test_pending_cmds_bounded_by_cmd_ids(self) -> None:
+        # given
+        self.target.send(self.make_cmd(ThrottleBehavior.DROP, cmd_id="first"))
+        self.issue_next_cmd()
+        # when
+        for i in range(100):
+            for cmd_id in ("a", "b", "c"):
+                throttle_behavior = (
+                    ThrottleBehavior.REQUEUE_BACK if i % 2 else ThrottleBehavior.DROP
+                )
+                self.target.send(self.make_cmd(throttle_behavior, 10, cmd_id))
+        # then
+        self.assertEqual(len(self.target.pending_cmds), 3)
+
+    def test_cmd_order(self) -> None:
+        # given
+        back_cmd = self.make_cmd(ThrottleBehavior.REQUEUE_BACK, cmd_id="back")
+        drop_cmd = self.make_cmd(ThrottleBehavior.DROP, cmd_id="drop")
+        top_cmd = self.make_cmd(ThrottleBehavior.REQUEUE_TOP, cmd_id="top")
+        later_cmd = self.make_cmd(
+            ThrottleBehavior.REQUEUE_TOP, 20, cmd_id="later", cmd_type="other"
+        )
+        force_cmd = self.make_cmd(ThrottleBehavior.FORCE, cmd_id="force")
+        for cmd in (later_cmd, back_cmd, drop_cmd, top_cmd, force_cmd):
+            self.target.send(cmd)
+        self.now_ms += 20
+        # when
+        cmds = [self.issue_next_cmd() for _ in range(5)]
+        # then
+        self.assertEqual(cmds, [force_cmd, top_cmd, drop_cmd, back_cmd, later_cmd])
+
+    def test_throttled_by_cmd_issued_while_pending(self) -> None:
+        # given
+        first_cmd = self.make_cmd(ThrottleBehavior.DROP, 10, cmd_id="first")
+        drop_cmd = self.make_cmd(ThrottleBehavior.DROP, 10, cmd_id="drop")
+        requeue_cmd = self.make_cmd(ThrottleBehavior.REQUEUE_BACK, 10)
+        for cmd in (first_cmd, drop_cmd, requeue_cmd):
+            self.target.send(cmd)
+        # when
+        issued_cmd = self.issue_next_cmd()
+        throttled = self.target.fetch_next_cmd()
+        self.now_ms += 10
+        requeued = self.target.fetch_next_cmd()
+        # then
+        self.assertIs(issued_cmd, first_cmd)
+        self.assertEqual(throttled, (None, 10))
+        self.assertEqual(requeued, (requeue_cmd, None))
+
+    def test_background_cmd_blocks_its_type(self) -> None:
+        # given
+        macro_calls = []
+        macro_cmd = MacroCommand(
+            "_test_cmd_type_", 0, macro_calls.append, "macro", ThrottleBehavior.FORCE
+        )
+        cmd = self.make_cmd(ThrottleBehavior.FORCE)
+        other_cmd = self.make_cmd(ThrottleBehavior.FORCE, cmd_type="other")
+        for pending_cmd in (macro_cmd, cmd, other_cmd):
+            self.target.send(pending_cmd)
+        # when
+        self.issue_next_cmd()
+        blocked = self.issue_next_cmd()
+        self.worker_pool.tasks.pop()()
+        unblocked = self.issue_next_cmd()
+        # then
+        self.assertEqual(macro_calls, ["_test_tibia_wid_"])
+        self.assertIs(blocked, other_cmd)
+        self.assertIs(unblocked, cmd)
+
+    def test_run(self) -> None:
+        # given
+        sut.timestamp_ms = lambda: int(time.time() * 1000)
+        issued = threading.Event()
+        cmd = MacroCommand(
+            "_test_cmd_type_", 0, lambda _: issued.set(), "macro", ThrottleBehavior.FORCE
+        )
+        self.target.worker_pool = WorkerPool(1)
+        self.target.start()
+        # when
+        self.target.send(cmd)
+        # then
+        self.assertTrue(issued.wait(1))
+
+    def test_run_issues_eligible_cmds_in_one_batch(self) -> None:
+        # given
+        sut.timestamp_ms = lambda: int(time.time() * 1000)
+        keystroke_sender = FakeKeystrokeSender()
+        self.target.keystroke_sender = keystroke_sender
+        for cmd_type in ("a", "b", "c"):
+            self.target.send(
+                KeeperHotkeyCommand(
+                    cmd_type, 0, cmd_type, keystroke_sender, cmd_type,
+                    ThrottleBehavior.FORCE,
+                )
+            )
+        # when
+        self.target.start()
+        # then
+        self.assertTrue(keystroke_sender.batch_sent.wait(1))
+        self.assertEqual(keystroke_sender.batches, [["a", "b", "c"]])
+
+    def test_run_records_cmds_after_batch_is_sent(self) -> None:
+        # given
+        sut.timestamp_ms = lambda: int(time.time() * 1000)
+        histogram = get_latency_histograms().get("reaction._batch_cmd_id_")
+        prev_count = histogram.count
+        flushed_counts = []
+        keystroke_sender = FakeKeystrokeSender()
+        keystroke_sender.on_batch_sent = lambda: flushed_counts.append(
+            histogram.count
+        )
+        logged = threading.Event()
+        self.target.logger.log_action = lambda *_: logged.set()
+        self.target.keystroke_sender = keystroke_sender
+        with command_origin(time.perf_counter()):
+            self.target.send(
+                KeeperHotkeyCommand(
+                    "a", 0, "a", keystroke_sender, "_batch_cmd_id_",
+                    ThrottleBehavior.FORCE,
+                )
+            )
+        # when
+        self.target.start()
+        # then
+        self.assertTrue(logged.wait(1))
+        self.assertEqual(flushed_counts, [prev_count])
+        self.assertEqual(histogram.count, prev_count + 1)
+
+    def test_run_logs_keystroke_sender_backlog(self) -> None:
+        # given
+        sut.timestamp_ms = lambda: int(time.time() * 1000)
+        keystroke_sender = FakeKeystrokeSender()
+        keystroke_sender.is_behind = lambda: True
+        keystroke_sender.get_backlog_bytes = lambda: 512
+        actions = []
+        logged = threading.Event()
+
+        def log_action(debug_level: int, fmt: str, *args) -> None:
+            actions.append((debug_level, fmt % args))
+            if debug_level == 1:
+                logged.set()
+
+        self.target.logger.log_action = log_action
+        self.target.keystroke_sender = keystroke_sender
+        self.target.send(
+            KeeperHotkeyCommand(
+                "a", 0, "a", keystroke_sender, "a", ThrottleBehavior.FORCE
+            )
+        )
+        # when
+        self.target.start()
+        # then
+        self.assertTrue(logged.wait(1))
+        self.assertIn((1, "Keystroke sender is behind by 512 bytes"), actions)
+
+
+class FakeKeystrokeSender(KeystrokeSender):
+    def __init__(self):
+        self.batches = []
+        self.batch_sent = threading.Event()
+        self.on_batch_sent = lambda: None
+
+    def send_key(self, key: str) -> None:
+        self.batches[-1].append(key)
+
+    @contextmanager
+    def batch(self):
+        self.batches.append([])
+        yield
+        self.on_batch_sent()
+        self.batch_sent.set()
+
+
+
 if __name__ == "__main__":
     unittest.main()
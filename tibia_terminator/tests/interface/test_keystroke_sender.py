@@ -0,0 +1,110 @@
+#!/usr/bin/env python3.8
+
+import unittest
+
+from typing import List
+from unittest import TestCase
+
+from tibia_terminator.interface.keystroke_sender import (
+    XdotoolKeystrokeSender,
+    XdotoolProcess,
+)
+
+
+class FakeXdotoolProcess(XdotoolProcess):
+    def __init__(self):
+        super().__init__()
+        self.writes: List[List[str]] = []
+
+    def send_cmds(self, cmds: List[str]) -> None:
+        self.writes.append(list(cmds))
+
+    def get_backlog_bytes(self) -> int:
+        return sum(len(cmd) + 1 for write in self.writes for cmd in write)
+
+
+class TestXdotoolKeystrokeSender(TestCase):
+    def test_send_key(self):
+        # given
+        xdotool_proc = FakeXdotoolProcess()
+        target = XdotoolKeystrokeSender(xdotool_proc, "123")
+        # when
+        target.send_key("F1")
+        target.send_key("F2")
+        # then
+        self.assertEqual(
+            xdotool_proc.writes,
+            [["key --window 123 F1"], ["key --window 123 F2"]],
+        )
+
+    def test_batch(self):
+        # given
+        xdotool_proc = FakeXdotoolProcess()
+        target = XdotoolKeystrokeSender(xdotool_proc, "123")
+        # when
+        with target.batch():
+            target.send_key("F1")
+            with target.batch():
+                target.send_key("F2")
+            batched_writes = list(xdotool_proc.writes)
+        target.send_key("F3")
+        # then
+        self.assertEqual(batched_writes, [])
+        self.assertEqual(
+            xdotool_proc.writes,
+            [
+                ["key --window 123 F1", "key --window 123 F2"],
+                ["key --window 123 F3"],
+            ],
+        )
+
+    def test_is_behind(self):
+        # given
+        xdotool_proc = FakeXdotoolProcess()
+        target = XdotoolKeystrokeSender(xdotool_proc, "123")
+        # when
+        target.send_key("F1")
+        short_backlog = target.is_behind()
+        with target.batch():
+            for _ in range(14):
+                target.send_key("F1")
+        # then
+        self.assertFalse(short_backlog)
+        self.assertTrue(target.is_behind())
+        self.assertEqual(target.get_backlog_bytes(), 15 * 20)
+
+
+class TestXdotoolProcess(TestCase):
+    def test_send_cmds(self):
+        # given
+        target = XdotoolProcess(["cat"])
+        target.start()
+        try:
+            # when
+            target.send_cmds(["a", "b"])
+            target.proc.stdin.close()
+            target.proc.wait(1)
+            # then
+            self.assertFalse(target.is_running())
+        finally:
+            target.stop()
+
+    def test_is_behind(self):
+        # given a process that never reads its stdin
+        target = XdotoolProcess(["sleep", "10"])
+        target.start()
+        try:
+            # when
+            target.send_cmds(["key --window 123 F1"])
+            short_backlog = target.is_behind()
+            target.send_cmds(["key --window 123 F1"] * 20)
+            # then
+            self.assertFalse(short_backlog)
+            self.assertTrue(target.is_behind())
+            self.assertEqual(target.get_backlog_bytes(), 21 * 20)
+        finally:
+            target.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3.8
+
+import time
+import unittest
+
+from unittest import TestCase
+
+import Xlib.X
+import Xlib.XK
+import Xlib.display
+
+from tibia_terminator.interface.xtest_input import (
+    XTestInput,
+    XTestKeystrokeSender,
+    parse_button,
+    parse_keysym,
+    split_key_combo,
+)
+from tibia_terminator.tests.x_server import has_x_extension, require_x_server
+
+
+class TestKeyParsing(TestCase):
+    def test_parse_keysym(self):
+        # when
+        keysyms = [
+            parse_keysym(key)
+            for key in ("Return", "enter", "F1", "f1", "shiftleft", "a", "\\", "6")
+        ]
+        # then
+        self.assertEqual(
+            keysyms,
+            [
+                Xlib.XK.XK_Return,
+                Xlib.XK.XK_Return,
+                Xlib.XK.XK_F1,
+                Xlib.XK.XK_F1,
+                Xlib.XK.XK_Shift_L,
+                Xlib.XK.XK_a,
+                Xlib.XK.XK_backslash,
+                Xlib.XK.XK_6,
+            ],
+        )
+
+    def test_parse_unknown_keysym(self):
+        with self.assertRaises(Exception):
+            parse_keysym("not_a_key")
+
+    def test_split_key_combo(self):
+        self.assertEqual(split_key_combo("Shift_L+End"), ["Shift_L", "End"])
+        self.assertEqual(split_key_combo("F1"), ["F1"])
+        self.assertEqual(split_key_combo("+"), ["+"])
+
+    def test_parse_button(self):
+        self.assertEqual(
+            [parse_button(b) for b in ("left", "right", "3", 2)], [1, 3, 3, 2]
+        )
+
+
+class TestXTestInput(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        require_x_server(
+            cls, has_x_extension("XTEST"), "An X server with XTEST is required."
+        )
+
+    def setUp(self):
+        self.display = Xlib.display.Display()
+        screen = self.display.screen()
+        self.window = screen.root.create_window(
+            0,
+            0,
+            100,
+            100,
+            0,
+            screen.root_depth,
+            event_mask=Xlib.X.KeyPressMask | Xlib.X.ButtonPressMask,
+        )
+        self.window.map()
+        self.display.sync()
+        self.window.set_input_focus(Xlib.X.RevertToParent, Xlib.X.CurrentTime)
+        self.display.sync()
+        self.target = XTestInput()
+
+    def tearDown(self):
+        self.target.close()
+        self.window.destroy()
+        self.display.close()
+
+    def next_events(self, event_type: int):
+        events = []
+        deadline = time.time() + 1
+        while time.time() < deadline:
+            while self.display.pending_events() > 0:
+                event = self.display.next_event()
+                if event.type == event_type:
+                    events.append(event)
+            if events:
+                return events
+            time.sleep(0.01)
+        return events
+
+    def test_send_key(self):
+        # given
+        sender = XTestKeystrokeSender(self.target)
+        # when
+        sender.send_key("F1")
+        # then
+        events = self.next_events(Xlib.X.KeyPress)
+        self.assertEqual(
+            [self.display.keycode_to_keysym(e.detail, 0) for e in events],
+            [Xlib.XK.XK_F1],
+        )
+
+    def test_click(self):
+        # when
+        self.target.click(40, 50, button="right")
+        # then
+        self.assertEqual(self.target.position(), (40, 50))
+        events = self.next_events(Xlib.X.ButtonPress)
+        self.assertEqual([(e.detail, e.event_x, e.event_y) for e in events], [(3, 40, 50)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -11,6 +11,8 @@ from tibia_terminator.schemas.char_config_schema import (
 from tibia_terminator.schemas.hotkeys_config_schema import HotkeysConfig
 from tibia_terminator.common.char_status import CharStatus
 from tibia_terminator.keeper.char_keeper import CharKeeper
+from tibia_terminator.keeper.common import RefillPriority
+from tibia_terminator.keeper.magic_shield_keeper import MagicShieldKeeper
 from tibia_terminator.reader.equipment_reader import MagicShieldStatus
 from tibia_terminator.reader.color_spec import (AmuletName, RingName)
 
@@ -396,6 +398,62 @@ class TestCharKeeper(TestCase):
         # then
         target.client.eat_food.assert_not_called()
 
+    def test_get_tick_priority(self):
+        # given
+        target = self.make_target()
+        # when
+        full_hp = target.get_tick_priority(status(hp=TOTAL_HP))
+        missing_hp = target.get_tick_priority(status(hp=TOTAL_HP - MINOR_HEAL))
+        low_hp = target.get_tick_priority(status(hp=TOTAL_HP - GREATER_HEAL))
+        critical_hp = target.get_tick_priority(status(hp=EMERGENCY_HP_THRESHOLD))
+        # then
+        self.assertEqual(full_hp, RefillPriority.NO_REFILL)
+        self.assertEqual(missing_hp, RefillPriority.DOWNTIME)
+        self.assertEqual(low_hp, RefillPriority.HIGH_PRIORITY)
+        self.assertEqual(critical_hp, RefillPriority.CRITICAL)
+
+    def test_get_tick_priority_by_mana(self):
+        # given
+        target = self.make_target()
+        # when
+        downtime_mana = target.get_tick_priority(status(mana=DOWNTIME_MANA))
+        low_mana = target.get_tick_priority(status(mana=MANA_LO))
+        critical_mana = target.get_tick_priority(status(mana=CRITICAL_MANA))
+        # then
+        self.assertEqual(downtime_mana, RefillPriority.DOWNTIME)
+        self.assertEqual(low_mana, RefillPriority.HIGH_PRIORITY)
+        self.assertEqual(critical_mana, RefillPriority.CRITICAL)
+
+    def test_get_tick_priority_most_urgent_keeper(self):
+        # given
+        target = self.make_target()
+        # when
+        actual = target.get_tick_priority(
+            status(hp=TOTAL_HP - MINOR_HEAL, mana=MANA_LO)
+        )
+        # then
+        self.assertEqual(actual, RefillPriority.HIGH_PRIORITY)
+
+    def test_get_tick_priority_by_magic_shield(self):
+        # given
+        target = self.make_target()
+        target.magic_shield_keeper = MagicShieldKeeper(Mock(), TOTAL_HP, 50)
+        # when
+        actual = target.get_tick_priority(
+            status(mana=TOTAL_HP * 2, magic_shield_level=0)
+        )
+        # then
+        self.assertEqual(actual, RefillPriority.HIGH_PRIORITY)
+
+    def test_get_tick_priority_during_emergency(self):
+        # given
+        target = self.make_target()
+        target.emergency_reporter.start_mode()
+        # when
+        actual = target.get_tick_priority(status(hp=TOTAL_HP))
+        # then
+        self.assertEqual(actual, RefillPriority.CRITICAL)
+
     def make_target(self, char_config: CharConfig = None):
         config = char_config or self.make_char_config()
         return CharKeeper(
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3.8
+
+import os
+import tempfile
+import time
+import unittest
+
+from unittest import TestCase
+
+from tibia_terminator.common.char_status_trace import (
+    CharStatusRecorder,
+    TracedCharStatus,
+    read_char_status_trace,
+)
+from tibia_terminator.keeper.char_keeper import CharKeeper
+from tibia_terminator.keeper.char_keeper_replay import (
+    FakeClientInterface,
+    ReplayCommand,
+    replay_trace,
+)
+from tibia_terminator.keeper.magic_shield_keeper import MagicShieldKeeper
+from tibia_terminator.tests.keeper import test_char_keeper
+from tibia_terminator.tests.keeper.test_char_keeper import (
+    MINOR_HEAL,
+    TOTAL_HP,
+    status,
+)
+
+
+class TestCharKeeperReplay(TestCase):
+    def make_char_keeper(self, client: FakeClientInterface) -> CharKeeper:
+        char_keeper_test = test_char_keeper.TestCharKeeper()
+        char_config = char_keeper_test.make_char_config()
+        hotkeys_config = char_keeper_test.make_target().hotkeys_config
+        return CharKeeper(
+            client, char_config, char_config.battle_configs[0], hotkeys_config
+        )
+
+    def test_replay(self):
+        # given
+        trace = [
+            TracedCharStatus(0.0, status(hp=TOTAL_HP)),
+            TracedCharStatus(0.1, status(hp=TOTAL_HP - MINOR_HEAL)),
+            TracedCharStatus(0.2, status(hp=TOTAL_HP)),
+        ]
+        # when
+        report = replay_trace(trace, self.make_char_keeper)
+        # then
+        self.assertEqual(report.ticks, 3)
+        self.assertGreater(report.decisions_per_sec, 0)
+        heals = [cmd for cmd in report.commands if cmd.name == "cast_minor_heal"]
+        self.assertEqual(len(heals), 1)
+        self.assertAlmostEqual(heals[0].ts_sec, 0.1)
+        self.assertEqual(heals[0].kwargs, {"throttle_ms": 700})
+
+    def test_replay_through_watcher(self):
+        # given
+        trace = [
+            TracedCharStatus(0.0, status()),
+            TracedCharStatus(0.05, status()),
+            TracedCharStatus(0.1, status()),
+        ]
+        # when
+        report = replay_trace(trace, self.make_char_keeper)
+        # then every keeper is dispatched first, unchanged vitals are only
+        # re-dispatched on their resend interval
+        self.assertEqual(report.dispatches, 5 + 0 + 3)
+
+    def test_replay_recorded_trace(self):
+        # given
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        path = os.path.join(tmp_dir.name, "trace.bin")
+        with CharStatusRecorder(path) as recorder:
+            recorder.record(status(mana=TOTAL_HP * 2, magic_shield_level=0))
+
+        def make_char_keeper(client: FakeClientInterface) -> CharKeeper:
+            char_keeper = self.make_char_keeper(client)
+            char_keeper.magic_shield_keeper = MagicShieldKeeper(client, TOTAL_HP, 50)
+            return char_keeper
+
+        # when
+        report = replay_trace(list(read_char_status_trace(path)), make_char_keeper)
+        # then
+        casts = [cmd for cmd in report.commands if cmd.name == "cast_magic_shield"]
+        self.assertEqual(len(casts), 1)
+
+    def test_replay_is_deterministic(self):
+        # given
+        trace = [
+            TracedCharStatus(i * 0.05, status(hp=TOTAL_HP - (i % 3) * MINOR_HEAL))
+            for i in range(100)
+        ]
+        # when
+        first_report = replay_trace(trace, self.make_char_keeper)
+        second_report = replay_trace(trace, self.make_char_keeper)
+        # then
+        self.assertEqual(first_report.commands, second_report.commands)
+
+    def test_time_is_restored(self):
+        # given
+        real_time = time.time
+        # when
+        replay_trace([TracedCharStatus(0.0, status())], self.make_char_keeper)
+        # then
+        self.assertIs(time.time, real_time)
+
+    def test_replay_command_str(self):
+        # given
+        command = ReplayCommand(1.5, "drink_mana", (920,), {"throttle_ms": 10})
+        # then
+        self.assertEqual(str(command), "1.500 drink_mana(920, throttle_ms=10)")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3.8
+
+import unittest
+
+from unittest import TestCase
+from unittest.mock import Mock
+
+from tibia_terminator.common.char_status import CharStatus
+from tibia_terminator.interface.client_interface import get_command_origin_ts
+from tibia_terminator.keeper.char_status_watcher import CharStatusWatcher
+from tibia_terminator.reader.color_spec import AmuletName, RingName
+from tibia_terminator.reader.equipment_reader import MagicShieldStatus
+
+ALL_KEEPERS = ["hp", "shield", "mana", "equipment", "speed"]
+
+
+def status(hp=100, mana=100, speed=110, equipped_ring=RingName.UNKNOWN.name):
+    return CharStatus(
+        hp,
+        speed,
+        mana,
+        0,
+        {
+            "equipped_amulet": AmuletName.UNKNOWN.name,
+            "equipped_ring": equipped_ring,
+            "magic_shield_status": MagicShieldStatus.OFF_COOLDOWN,
+        },
+    )
+
+
+class FakeClock:
+    def __init__(self):
+        self.now_ms = 1000.0
+
+    def clock(self) -> float:
+        return self.now_ms
+
+
+class TestCharStatusWatcher(TestCase):
+    def setUp(self):
+        self.fake_clock = FakeClock()
+        self.char_keeper = Mock()
+        self.char_keeper.emergency_reporter.is_mode_on.return_value = False
+        self.char_keeper.tank_mode_reporter.is_mode_on.return_value = False
+        self.char_keeper.defensive_mode_reporter.is_mode_on.return_value = False
+        self.target = CharStatusWatcher(
+            self.char_keeper,
+            vitals_resend_interval_ms=100,
+            equipment_resend_interval_ms=250,
+            haste_resend_interval_ms=500,
+            clock=self.fake_clock.clock,
+        )
+
+    def test_keepers_are_dispatched_with_read_ts_origin(self):
+        # given
+        origin_timestamps = []
+        self.char_keeper.handle_hp_change.side_effect = (
+            lambda _: origin_timestamps.append(get_command_origin_ts())
+        )
+        char_status = status()
+        # when
+        self.target.handle_char_status(char_status)
+        # then
+        self.assertEqual(origin_timestamps, [char_status.read_ts])
+        self.assertIsNone(get_command_origin_ts())
+
+    def test_dispatches_every_keeper_first(self):
+        # when
+        dispatched = self.target.handle_char_status(status())
+        # then
+        self.assertEqual(dispatched, ALL_KEEPERS)
+        self.char_keeper.handle_emergency_status_change.assert_called_once()
+        self.char_keeper.handle_hp_change.assert_called_once()
+        self.char_keeper.handle_speed_change.assert_called_once()
+
+    def test_skips_unchanged_status(self):
+        # given
+        self.target.handle_char_status(status())
+        self.fake_clock.now_ms += 20
+        # when
+        dispatched = self.target.handle_char_status(status())
+        # then
+        self.assertEqual(dispatched, [])
+        self.assertEqual(
+            self.char_keeper.handle_emergency_status_change.call_count, 2
+        )
+        self.char_keeper.handle_hp_change.assert_called_once()
+
+    def test_dispatches_changed_inputs(self):
+        # given
+        self.target.handle_char_status(status())
+        self.fake_clock.now_ms += 20
+        # when
+        hp_dispatched = self.target.handle_char_status(status(hp=90))
+        ring_dispatched = self.target.handle_char_status(
+            status(hp=90, equipped_ring=RingName.EMPTY.name)
+        )
+        # then
+        self.assertEqual(hp_dispatched, ["hp", "shield", "mana", "speed"])
+        self.assertEqual(ring_dispatched, ["equipment"])
+
+    def test_dispatches_mode_changes(self):
+        # given
+        self.target.handle_char_status(status())
+        self.char_keeper.tank_mode_reporter.is_mode_on.return_value = True
+        # when
+        dispatched = self.target.handle_char_status(status())
+        # then
+        self.assertEqual(dispatched, ALL_KEEPERS)
+
+    def test_resends_unchanged_status_on_timers(self):
+        # given
+        self.target.handle_char_status(status())
+        # when
+        self.fake_clock.now_ms += 100
+        vitals_dispatched = self.target.handle_char_status(status())
+        self.fake_clock.now_ms += 150
+        equipment_dispatched = self.target.handle_char_status(status())
+        self.fake_clock.now_ms += 250
+        haste_dispatched = self.target.handle_char_status(status())
+        # then
+        self.assertEqual(vitals_dispatched, ["hp", "shield", "mana"])
+        self.assertEqual(equipment_dispatched, ["hp", "shield", "mana", "equipment"])
+        self.assertEqual(haste_dispatched, ALL_KEEPERS)
+
+    def test_reset(self):
+        # given
+        self.target.handle_char_status(status())
+        self.target.reset()
+        # when
+        dispatched = self.target.handle_char_status(status())
+        # then
+        self.assertEqual(dispatched, ALL_KEEPERS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3.8
+
+import os
+import unittest
+
+from ctypes import Structure, addressof, c_int, c_int16, c_byte
+from unittest import TestCase
+from unittest.mock import patch
+
+from tibia_terminator.reader.char_reader38 import CharReader38, StatsSnapshot
+from tibia_terminator.reader.memory_reader38 import MemoryReader38
+
+
+class FakeCharMemory(Structure):
+    _fields_ = [
+        ("hp", c_int),
+        ("max_hp", c_int),
+        ("mana", c_int),
+        ("max_mana", c_int),
+        ("soul_points", c_int16),
+        ("padding", c_byte * 2),
+        ("speed", c_int16),
+    ]
+
+
+class TestCharReader38(TestCase):
+    def setUp(self):
+        self.memory = FakeCharMemory(
+            hp=1234, max_hp=2000, mana=5678, max_mana=9000, soul_points=100, speed=321
+        )
+        self.base = addressof(self.memory)
+
+    def make_target(self) -> CharReader38:
+        target = CharReader38(MemoryReader38(os.getpid()), verbose=False)
+        target.init_mana_address(self.base + FakeCharMemory.mana.offset)
+        target.init_max_mana_address()
+        target.init_hp_address()
+        target.init_max_hp_address()
+        target.init_speed_address(self.base + FakeCharMemory.speed.offset)
+        target.init_soul_points_address(self.base + FakeCharMemory.soul_points.offset)
+        return target
+
+    def test_get_stats_snapshot(self):
+        # given
+        target = self.make_target()
+        # when
+        with target:
+            stats = target.get_stats().get()
+        # then
+        self.assertIsNone(target.snapshot)
+        self.assertEqual(stats["hp"], 1234)
+        self.assertEqual(stats["mana"], 5678)
+        self.assertEqual(stats["speed"], 321)
+        self.assertEqual(stats["soul_points"], 100)
+        self.assertEqual(stats["magic_shield"], 9999)
+
+    def test_get_stats_snapshot_reads_latest_values(self):
+        # given
+        target = self.make_target()
+        with target:
+            target.get_stats().get()
+            self.memory.hp = 1
+            # when
+            stats = target.get_stats().get()
+        # then
+        self.assertEqual(stats["hp"], 1)
+
+    def test_get_stats_snapshot_single_read(self):
+        # given
+        target = self.make_target()
+        # when
+        with target:
+            # then
+            self.assertTrue(target.snapshot.is_single_read)
+
+    def test_get_max_stats_snapshot(self):
+        # given
+        target = self.make_target()
+        # when
+        with target:
+            # then
+            self.assertEqual(target.get_max_hp(), 2000)
+            self.assertEqual(target.get_max_mana(), 9000)
+
+    def test_get_max_stats_short_read(self):
+        # given
+        target = self.make_target()
+        with target, patch.object(
+            target.memory_reader, "read_into", ShortReadMemoryReader().read_into
+        ):
+            # when
+            with self.assertRaises(OSError):
+                target.get_max_hp()
+
+    def test_get_stats_without_snapshot(self):
+        # given
+        target = self.make_target()
+        # when
+        stats = target.get_stats().get()
+        # then
+        self.assertEqual(stats["hp"], 1234)
+        self.assertEqual(stats["speed"], 321)
+
+    def test_stats_snapshot_multiple_reads(self):
+        # given
+        mana_address = self.base + FakeCharMemory.mana.offset
+        speed_address = self.base + FakeCharMemory.speed.offset
+        target = StatsSnapshot(
+            {"mana": mana_address, "speed": speed_address}, max_span=4
+        )
+        memory_reader = MemoryReader38(os.getpid())
+        memory_reader.open_fd()
+        try:
+            # when
+            stats = target.read(memory_reader)
+        finally:
+            memory_reader.close_fd()
+        # then
+        self.assertFalse(target.is_single_read)
+        self.assertEqual(stats["mana"], 5678)
+        self.assertEqual(stats["speed"], 321)
+
+    def test_stats_snapshot_short_read(self):
+        # given
+        mana_address = self.base + FakeCharMemory.mana.offset
+        target = StatsSnapshot({"mana": mana_address})
+        memory_reader = ShortReadMemoryReader()
+        # when
+        with self.assertRaises(OSError):
+            target.read(memory_reader)
+
+
+class ShortReadMemoryReader:
+    def read_into(self, address: int, buffer: bytearray) -> int:
+        return len(buffer) - 1
+
+
+if __name__ == "__main__":
+    unittest.main()
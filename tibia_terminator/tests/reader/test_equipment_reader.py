@@ -0,0 +1,158 @@
+#!/usr/bin/env python3.8
+
+import os
+import threading
+import unittest
+
+from typing import Dict
+
+from tibia_terminator.common.lazy_evaluator import TaskCancelledError
+from tibia_terminator.reader.equipment_reader import (
+    EquipmentReader,
+    MagicShieldStatus,
+)
+from tibia_terminator.reader.window_utils import ScreenReader
+from tibia_terminator.schemas.reader.common import Coord
+from tibia_terminator.schemas.reader.interface_config_schema import (
+    TibiaWindowSpecSchema,
+)
+
+TEST_SPEC_PATH = os.path.join(
+    os.path.dirname(__file__),
+    "..",
+    "schemas",
+    "reader",
+    "tibia_window_spec_schema_test.json",
+)
+
+
+class FakeImage:
+    def __init__(self, data: bytes):
+        self.data = data
+
+
+class FakeWindow:
+    def __init__(self, pixels: Dict[Coord, int]):
+        self.pixels = pixels
+        self.requests = []
+        self.threads = set()
+
+    def get_image(self, x, y, width, height, fmt, plane_mask):
+        self.requests.append((x, y, width, height))
+        self.threads.add(threading.get_ident())
+        data = bytearray()
+        for row in range(y, y + height):
+            for col in range(x, x + width):
+                rgb = self.pixels.get(Coord(col, row), 0)
+                data.extend((rgb & 0xFF, (rgb >> 8) & 0xFF, rgb >> 16, 0))
+        return FakeImage(bytes(data))
+
+
+class FakeScreenReader(ScreenReader):
+    def __init__(self, window: FakeWindow):
+        super().__init__()
+        self.window = window
+
+    def get_window(self):
+        return self.window
+
+
+class FakeEquipmentReader(EquipmentReader):
+    def __init__(self, window: FakeWindow, *args, **kwargs):
+        super().__init__(None, *args, **kwargs)
+        self.window = window
+
+    def get_window(self):
+        return self.window
+
+
+class TestEquipmentReader(unittest.TestCase):
+    def setUp(self):
+        self.spec = TibiaWindowSpecSchema().loadf(TEST_SPEC_PATH)
+        might_ring = self.spec.item_repository.rings[0]
+        ring_coords = self.spec.char_equipment.ring
+        pixels = {
+            self.spec.action_bar.magic_shield.coord: 0xB9A022,
+        }
+        for coord, rgb in zip(ring_coords, might_ring.equipped_colors[0]):
+            pixels[coord] = rgb
+        self.action_bar_window = FakeWindow(pixels)
+        self.equipment_window = FakeWindow(pixels)
+
+    def make_target(self, **kwargs) -> EquipmentReader:
+        target = FakeEquipmentReader(self.action_bar_window, self.spec, **kwargs)
+        for lane in range(1, len(target.lane_readers)):
+            target.lane_readers[lane] = FakeScreenReader(self.equipment_window)
+        target.task_loop.start()
+        self.addCleanup(target.task_loop.stop)
+        return target
+
+    def test_get_equipment_status(self):
+        # given
+        target = self.make_target()
+        # when
+        status = target.get_equipment_status()
+        # then
+        self.assertEqual(status.equipped_ring, "might.ring")
+        self.assertEqual(status.equipped_amulet, "unknown")
+        self.assertEqual(status.magic_shield_status, MagicShieldStatus.OFF_COOLDOWN)
+        self.assertEqual(status.emergency_action_ring, "unknown")
+        self.assertEqual(status.tank_action_ring, "unknown")
+        self.assertEqual(status["normal_action_amulet"], "unknown")
+
+    def test_get_equipment_status_one_grab_per_lane(self):
+        # given
+        target = self.make_target(lanes=2)
+        # when
+        status = target.get_equipment_status()
+        for key in status.future_values:
+            status[key]
+        # then
+        self.assertEqual(
+            self.action_bar_window.requests, [tuple(target.frame_rects[0])]
+        )
+        self.assertEqual(
+            self.equipment_window.requests, [tuple(target.frame_rects[1])]
+        )
+        self.assertEqual(
+            len(self.action_bar_window.threads | self.equipment_window.threads), 2
+        )
+
+    def test_get_equipment_status_single_lane(self):
+        # given
+        target = self.make_target(lanes=1)
+        # when
+        status = target.get_equipment_status()
+        # then
+        self.assertEqual(status.equipped_ring, "might.ring")
+        self.assertEqual(len(self.action_bar_window.requests), 2)
+        self.assertEqual(self.equipment_window.requests, [])
+
+    def test_get_equipment_status_without_frame_sampling(self):
+        # given
+        target = self.make_target(frame_sampling=False)
+        # when
+        status = target.get_equipment_status()
+        # then
+        self.assertEqual(status.equipped_ring, "might.ring")
+        self.assertEqual(status.magic_shield_status, MagicShieldStatus.OFF_COOLDOWN)
+        self.assertTrue(
+            all(request[2:] == (1, 1) for request in self.equipment_window.requests)
+        )
+
+
+    def test_cancel_pending_futures(self):
+        # given
+        target = FakeEquipmentReader(self.action_bar_window, self.spec)
+        reported = []
+        status = target.get_equipment_status(equipped_ring_cb=reported.append)
+        # when
+        cancelled = target.cancel_pending_futures()
+        # then
+        self.assertEqual(cancelled, 9)
+        self.assertRaises(TaskCancelledError, lambda: status.equipped_ring)
+        self.assertEqual(reported, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3.8
+
+import unittest
+
+from tibia_terminator.reader.item_repository_container import (
+    ItemRepositoryContainer,
+    UNKNOWN_ITEM,
+)
+from tibia_terminator.schemas.reader.interface_config_schema import (
+    ItemColors,
+    ItemEntry,
+    ItemRepositorySpec,
+)
+
+RING_COLORS = ItemColors(0x1, 0x2, 0x3, 0x4)
+AMULET_COLORS = ItemColors(0x5, 0x6, 0x7, 0x8)
+SHARED_COLORS = ItemColors(0x9, 0xA, 0xB, 0xC)
+
+MIGHT_RING = ItemEntry(
+    name="might.ring",
+    equipped_colors=[RING_COLORS],
+    action_bar_colors=[RING_COLORS, SHARED_COLORS],
+)
+ENERGY_RING = ItemEntry(
+    name="energy.ring",
+    equipped_colors=[SHARED_COLORS],
+    action_bar_colors=[SHARED_COLORS],
+)
+SSA_AMULET = ItemEntry(
+    name="ssa.amulet",
+    equipped_colors=[AMULET_COLORS],
+    action_bar_colors=[AMULET_COLORS],
+)
+
+
+class TestItemRepositoryContainer(unittest.TestCase):
+    def setUp(self):
+        self.target = ItemRepositoryContainer(
+            ItemRepositorySpec(
+                rings=[MIGHT_RING, ENERGY_RING],
+                amulets=[SSA_AMULET, SSA_AMULET._replace(name="ssa.amulet")],
+            )
+        )
+
+    def test_lookup_by_colors(self):
+        # when
+        ring = self.target.lookup_ring_by_equipped_colors(RING_COLORS)
+        action_bar_ring = self.target.lookup_ring_by_action_bar_colors(RING_COLORS)
+        amulet = self.target.lookup_amulet_by_equipped_colors(AMULET_COLORS)
+        action_bar_amulet = self.target.lookup_amulet_by_action_bar_colors(
+            AMULET_COLORS
+        )
+        # then
+        self.assertIs(ring, MIGHT_RING)
+        self.assertIs(action_bar_ring, MIGHT_RING)
+        self.assertEqual(amulet, SSA_AMULET)
+        self.assertEqual(action_bar_amulet, SSA_AMULET)
+
+    def test_lookup_by_colors_last_match_wins(self):
+        # when
+        actual = self.target.lookup_ring_by_action_bar_colors(SHARED_COLORS)
+        # then
+        self.assertIs(actual, ENERGY_RING)
+
+    def test_lookup_by_colors_unknown(self):
+        # when
+        ring = self.target.lookup_ring_by_equipped_colors(AMULET_COLORS)
+        amulet = self.target.lookup_amulet_by_equipped_colors(RING_COLORS)
+        # then
+        self.assertIs(ring, UNKNOWN_ITEM)
+        self.assertIs(amulet, UNKNOWN_ITEM)
+
+    def test_lookup_by_name(self):
+        # when
+        actual = self.target.lookup_ring_by_name("energy.ring")
+        # then
+        self.assertIs(actual, ENERGY_RING)
+
+    def test_lookup_by_name_missing(self):
+        # when
+        with self.assertRaises(Exception) as context:
+            self.target.lookup_ring_by_name("life.ring")
+        # then
+        self.assertIn("no specification", str(context.exception))
+
+    def test_lookup_by_name_duplicated(self):
+        # when
+        with self.assertRaises(Exception) as context:
+            self.target.lookup_amulet_by_name("ssa.amulet")
+        # then
+        self.assertIn("multiple specification", str(context.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3.8
+
+import os
+import unittest
+
+from ctypes import addressof, c_byte, c_int
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from tibia_terminator.reader.read_only_process import ReadOnlyProcess
+from tibia_terminator.reader.typed_memory_search import Decreased, Unchanged
+from tibia_terminator.schemas.reader.interface_config_schema import Rect
+from tibia_terminator.tests.reader.test_read_only_process import make_region
+
+try:
+    from tibia_terminator.reader import memory_address_finder
+except ImportError:  # tesserocr
+    memory_address_finder = None
+
+
+MANA_INDEX = 5
+DECOY_INDEX = 9
+MANA_KEY = "F1"
+NOOP_KEY = "F2"
+
+
+class TestFindAddressBySnapshots(TestCase):
+    def setUp(self):
+        if memory_address_finder is None:
+            raise unittest.SkipTest("tesserocr is required.")
+        self.haystack = (c_int * 64)()
+        self.start = addressof(self.haystack)
+        for i in range(64):
+            self.haystack[i] = 100
+        self.sent_keys = []
+        self.keystroke_senders = []
+        region = make_region((c_byte * 256).from_buffer(self.haystack))
+        for target, attribute, value in [
+            (ReadOnlyProcess, "list_mapped_regions", Mock(return_value=[region])),
+            (memory_address_finder, "send_key", self.fake_send_key),
+            (memory_address_finder, "get_tibia_wid", Mock(return_value="1")),
+            (memory_address_finder, "time", Mock()),
+        ]:
+            patcher = patch.object(target, attribute, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.finder = memory_address_finder.MemoryAddressFinder(
+            ocr_reader=Mock(), tibia_pid=os.getpid()
+        )
+
+    def fake_send_key(self, tibia_wid: int, key: str, keystroke_sender=None):
+        self.sent_keys.append(key)
+        self.keystroke_senders.append(keystroke_sender)
+        if key == MANA_KEY:
+            # casting a spell spends mana, the decoy only decreases once
+            self.haystack[MANA_INDEX] -= 20
+            if len(self.sent_keys) == 1:
+                self.haystack[DECOY_INDEX] -= 1
+        else:
+            self.haystack[DECOY_INDEX] -= 1
+
+    def test_find_address_by_snapshots(self):
+        # given
+        steps = [
+            memory_address_finder.SnapshotStep(MANA_KEY, Decreased()),
+            memory_address_finder.SnapshotStep(NOOP_KEY, Unchanged()),
+            memory_address_finder.SnapshotStep(MANA_KEY, Decreased()),
+        ]
+        # when
+        actual = self.finder.find_address_by_snapshots(
+            steps, c_int, only_search_heap=False
+        )
+        # then
+        self.assertEqual(actual, [self.start + MANA_INDEX * 4])
+        self.assertEqual(self.sent_keys, [MANA_KEY, NOOP_KEY])
+
+    def test_find_address_by_snapshots_stops_at_first_step(self):
+        # given
+        steps = [
+            memory_address_finder.SnapshotStep(NOOP_KEY, Decreased()),
+            memory_address_finder.SnapshotStep(MANA_KEY, Decreased()),
+        ]
+        # when
+        actual = self.finder.find_address_by_snapshots(
+            steps, c_int, only_search_heap=False
+        )
+        # then
+        self.assertEqual(actual, [self.start + DECOY_INDEX * 4])
+        self.assertEqual(self.sent_keys, [NOOP_KEY])
+
+    def test_find_address_by_snapshots_keystroke_sender(self):
+        # given
+        keystroke_sender = Mock()
+        self.finder.keystroke_sender = keystroke_sender
+        steps = [memory_address_finder.SnapshotStep(MANA_KEY, Decreased())]
+        # when
+        self.finder.find_address_by_snapshots(steps, c_int, only_search_heap=False)
+        # then
+        self.assertEqual(self.keystroke_senders, [keystroke_sender])
+
+    def test_find_address(self):
+        # given
+        self.finder.ocr_reader.read_number = lambda _: str(self.haystack[MANA_INDEX])
+        addresses = [self.start + i * 4 for i in range(64)]
+        # when
+        actual, _ = self.finder.find_address(
+            [MANA_KEY, MANA_KEY],
+            Rect(0, 0, 10, 10),
+            c_int,
+            initial_address_space=list(reversed(addresses)),
+        )
+        # then
+        self.assertEqual(actual, [self.start + MANA_INDEX * 4])
+        self.assertEqual(self.sent_keys, [MANA_KEY])
+
+    def test_find_address_by_snapshots_no_steps(self):
+        with self.assertRaises(Exception):
+            self.finder.find_address_by_snapshots([], c_int)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3.8
+
+import os
+import unittest
+
+from ctypes import addressof, c_byte, c_int
+from unittest import TestCase
+
+from tibia_terminator.reader.memory_snapshot import (
+    diff_memory_snapshots,
+    take_memory_snapshot,
+)
+from tibia_terminator.reader.read_only_process import ReadOnlyProcess
+from tibia_terminator.reader.typed_memory_search import (
+    Changed,
+    ChangedBy,
+    Decreased,
+    Increased,
+    Unchanged,
+    search_addresses_typed,
+)
+from tibia_terminator.tests.reader.test_read_only_process import make_region
+
+
+class TestMemorySnapshot(TestCase):
+    def setUp(self):
+        self.proc = ReadOnlyProcess(os.getpid())
+        self.proc.open()
+        self.addCleanup(self.proc.close)
+        self.haystack = (c_int * 64)()
+        self.start = addressof(self.haystack)
+        self.region = make_region((c_byte * 256).from_buffer(self.haystack))
+        for i in range(64):
+            self.haystack[i] = 100
+
+    def take_snapshot(self):
+        snapshot = take_memory_snapshot(self.proc, [self.region], chunk_size=64)
+        self.addCleanup(snapshot.close)
+        return snapshot
+
+    def addresses(self, *indexes):
+        return [self.start + index * 4 for index in indexes]
+
+    def diff(self, predicate, changes):
+        prev_snapshot = self.take_snapshot()
+        for index, value in changes.items():
+            self.haystack[index] = value
+        snapshot = self.take_snapshot()
+        return diff_memory_snapshots(
+            prev_snapshot, snapshot, c_int, predicate, chunk_size=64
+        )
+
+    def test_take_memory_snapshot(self):
+        # when
+        snapshot = self.take_snapshot()
+        self.haystack[3] = 7
+        # then
+        region = snapshot.regions[0]
+        self.assertEqual(region.size, 256)
+        values = snapshot.get_values(region, c_int, self.start, 64).tolist()
+        self.assertEqual(values, [100] * 64)
+
+    def test_diff_changed(self):
+        # when
+        actual = self.diff(Changed(), {0: 99, 16: 101, 63: 0})
+        # then
+        self.assertEqual(actual.addresses.tolist(), self.addresses(0, 16, 63))
+        self.assertEqual(actual.values.tolist(), [99, 101, 0])
+
+    def test_diff_unchanged(self):
+        # when
+        actual = self.diff(Unchanged(), {i: 0 for i in range(1, 64)})
+        # then
+        self.assertEqual(actual.addresses.tolist(), self.addresses(0))
+
+    def test_diff_increased(self):
+        # when
+        actual = self.diff(Increased(), {5: 99, 6: 101})
+        # then
+        self.assertEqual(actual.addresses.tolist(), self.addresses(6))
+
+    def test_diff_decreased(self):
+        # when
+        actual = self.diff(Decreased(), {5: 99, 6: 101})
+        # then
+        self.assertEqual(actual.addresses.tolist(), self.addresses(5))
+
+    def test_diff_missing_region(self):
+        # given
+        prev_snapshot = take_memory_snapshot(self.proc, [])
+        self.addCleanup(prev_snapshot.close)
+        snapshot = self.take_snapshot()
+        # when
+        actual = diff_memory_snapshots(prev_snapshot, snapshot, c_int, Changed())
+        # then
+        self.assertEqual(len(actual), 0)
+
+    def test_narrow_down_after_diff(self):
+        # given
+        candidates = self.diff(Decreased(), {1: 90, 2: 80, 3: 70})
+        self.haystack[1] = 60
+        self.haystack[2] = 50
+        # when
+        actual = search_addresses_typed(self.proc, candidates, ChangedBy(-30, -30))
+        # then
+        self.assertEqual(actual.addresses.tolist(), self.addresses(1, 2))
+        self.assertEqual(actual.values.tolist(), [60, 50])
+
+
+if __name__ == "__main__":
+    unittest.main()
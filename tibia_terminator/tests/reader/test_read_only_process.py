@@ -0,0 +1,251 @@
+#!/usr/bin/env python3.8
+
+import mmap
+import os
+import unittest
+
+from ctypes import addressof, c_byte, c_int
+from unittest import TestCase
+
+from tibia_terminator.reader.read_only_process import (
+    MemRegion,
+    ReadOnlyProcess,
+    gen_search_spans,
+    group_addresses,
+)
+
+NEEDLE = 0x5EED1E55
+
+
+def make_region(buffer) -> MemRegion:
+    start = addressof(buffer)
+    return MemRegion(
+        start=start,
+        end=start + len(buffer),
+        read=True,
+        write=True,
+        execute=False,
+        private=True,
+        shared=False,
+        offset=0,
+        dev_major=0,
+        dev_minor=0,
+        inode=0,
+        filename="",
+    )
+
+
+def make_haystack(size: int, offsets):
+    haystack = (c_byte * size)()
+    for offset in offsets:
+        c_int.from_buffer(haystack, offset).value = NEEDLE
+    return haystack
+
+
+class ShortReadMem:
+    """Reads from the real memory, but only up to limit."""
+
+    def __init__(self, mem, limit: int):
+        self.mem = mem
+        self.limit = limit
+        self.position = 0
+
+    def seek(self, position: int):
+        self.position = position
+        self.mem.seek(position)
+
+    def readinto(self, buffer) -> int:
+        size = max(min(len(buffer), self.limit - self.position), 0)
+        return self.mem.readinto(memoryview(buffer).cast("B")[:size])
+
+    def close(self):
+        self.mem.close()
+
+
+class TestReadOnlyProcess(TestCase):
+    def setUp(self):
+        self.proc = ReadOnlyProcess(os.getpid())
+        self.proc.open()
+        self.addCleanup(self.proc.close)
+
+    def test_search_region(self):
+        # given
+        offsets = [0, 20, 60]
+        haystack = make_haystack(64, offsets)
+        region = make_region(haystack)
+        # when
+        actual = list(self.proc.search_region(region, c_int(NEEDLE), chunk_size=16))
+        # then
+        self.assertEqual(actual, [region.start + offset for offset in offsets])
+
+    def test_search_region_straddling_chunks(self):
+        # given
+        offsets = [13, 30, 47]
+        haystack = make_haystack(64, offsets)
+        region = make_region(haystack)
+        # when
+        actual = list(self.proc.search_region(region, c_int(NEEDLE), chunk_size=16))
+        # then
+        self.assertEqual(actual, [region.start + offset for offset in offsets])
+
+    def test_search_region_not_verbatim(self):
+        # given
+        offsets = [12, 29]
+        haystack = make_haystack(64, offsets)
+        region = make_region(haystack)
+        # when
+        actual = list(
+            self.proc.search_region(
+                region, c_int(NEEDLE), verbatim=False, chunk_size=16
+            )
+        )
+        # then
+        self.assertEqual(actual, [region.start + offset for offset in offsets])
+
+    def test_search_region_yields_early(self):
+        # given
+        haystack = make_haystack(64, [4, 40])
+        region = make_region(haystack)
+        read_addresses = []
+        read_memory = self.proc.read_memory
+
+        def record_read_memory(base_address, read_buffer):
+            read_addresses.append(base_address)
+            return read_memory(base_address, read_buffer)
+
+        self.proc.read_memory = record_read_memory
+        matches = self.proc.search_region(region, c_int(NEEDLE), chunk_size=16)
+        # when
+        first = next(matches)
+        # then
+        self.assertEqual(first, region.start + 4)
+        self.assertEqual(read_addresses, [region.start])
+
+    def test_search_region_short_read(self):
+        # given
+        haystack = make_haystack(64, [4, 20])
+        region = make_region(haystack)
+        self.proc.mem = ShortReadMem(self.proc.mem, region.start + 24)
+        matches = self.proc.search_region(region, c_int(NEEDLE), chunk_size=16)
+        # when
+        first = next(matches)
+        # then
+        self.assertEqual(first, region.start + 4)
+        # the second chunk is only partially read, its stale bytes aren't searched
+        self.assertRaises(OSError, list, matches)
+
+    def test_search_addresses_reads_current_memory(self):
+        # given
+        haystack = make_haystack(64, [8, 32])
+        region = make_region(haystack)
+        addresses = list(self.proc.search_region(region, c_int(NEEDLE)))
+        c_int.from_buffer(haystack, 8).value = 0
+        # when
+        actual = self.proc.search_addresses(addresses, c_int(NEEDLE))
+        # then
+        self.assertEqual(actual, [region.start + 32])
+
+    def test_search_addresses_reads_pages_once(self):
+        # given
+        size = 4 * mmap.PAGESIZE
+        mapping = mmap.mmap(-1, size)
+        self.addCleanup(mapping.close)
+        haystack = (c_byte * size).from_buffer(mapping)
+        start = addressof(haystack)
+        offsets = [8, 16, mmap.PAGESIZE + 4, 3 * mmap.PAGESIZE + 12]
+        for offset in offsets[:-1]:
+            c_int.from_buffer(haystack, offset).value = NEEDLE
+        reads = []
+        read_bytes = self.proc.read_bytes
+
+        def record_read_bytes(base_address, size):
+            reads.append((base_address - start, size))
+            return read_bytes(base_address, size)
+
+        self.proc.read_bytes = record_read_bytes
+        # when
+        actual = self.proc.search_addresses(
+            [start + offset for offset in reversed(offsets)], c_int(NEEDLE)
+        )
+        # then
+        self.assertEqual(actual, [start + offset for offset in offsets[:-1]])
+        self.assertEqual(
+            reads,
+            [(8, mmap.PAGESIZE + 4 - 8 + 4), (3 * mmap.PAGESIZE + 12, 4)],
+        )
+        del haystack
+
+    def test_search_addresses_not_verbatim(self):
+        # given
+        haystack = make_haystack(64, [8, 32])
+        region = make_region(haystack)
+        # when
+        actual = self.proc.search_addresses(
+            [region.start + 8, region.start + 12, region.start + 32],
+            c_int(NEEDLE),
+            verbatim=False,
+        )
+        # then
+        self.assertEqual(actual, [region.start + 8, region.start + 32])
+
+    def test_parallel_search_all_memory(self):
+        # given
+        size = 4 * mmap.PAGESIZE
+        # a mapping of its own, so that no other copies of the needle are in it
+        mapping = mmap.mmap(-1, size)
+        self.addCleanup(mapping.close)
+        haystack = (c_byte * size).from_buffer(mapping)
+        offsets = [0, mmap.PAGESIZE - 2, 2 * mmap.PAGESIZE + 8, size - 4]
+        for offset in offsets:
+            c_int.from_buffer(haystack, offset).value = NEEDLE
+        start = addressof(haystack)
+
+        def mem_region_filter(mem_region: MemRegion) -> bool:
+            return mem_region.start <= start < mem_region.end
+
+        # when
+        found = self.proc.parallel_search_all_memory(
+            c_int(NEEDLE),
+            mem_region_filter=mem_region_filter,
+            processes=2,
+            span_size=mmap.PAGESIZE,
+        )
+        # then
+        actual = [address for address in found if start <= address < start + size]
+        self.assertEqual(actual, [start + offset for offset in offsets])
+        del haystack
+
+
+class TestGenSearchSpans(TestCase):
+    def test_gen_search_spans(self):
+        # given
+        region = make_region((c_byte * 10)())
+        # when
+        actual = [
+            (span.start - region.start, span.end - region.start)
+            for span in gen_search_spans([region], 4, 2)
+        ]
+        # then
+        self.assertEqual(actual, [(0, 6), (4, 10), (8, 10)])
+
+
+class TestGroupAddresses(TestCase):
+    def test_group_addresses(self):
+        # given
+        page = mmap.PAGESIZE
+        # the needle at page - 2 straddles the first two pages
+        addresses = [2 * page + 8, 0, page - 2, 10 * page]
+        # when
+        actual = list(group_addresses(addresses, 4))
+        # then
+        self.assertEqual(
+            actual,
+            [
+                (0, 2 * page + 12, [0, page - 2, 2 * page + 8]),
+                (10 * page, 10 * page + 4, [10 * page]),
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
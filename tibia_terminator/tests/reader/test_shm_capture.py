@@ -0,0 +1,88 @@
+#!/usr/bin/env python3.8
+
+import time
+import unittest
+
+import Xlib.X
+import Xlib.display
+
+from tibia_terminator.reader.shm_capture import ShmCapture
+from tibia_terminator.reader.window_utils import CaptureBackend, ScreenReader
+from tibia_terminator.schemas.reader.common import Coord
+from tibia_terminator.schemas.reader.interface_config_schema import Rect
+from tibia_terminator.tests.x_server import has_x_server, require_x_server
+
+
+class TestShmCapture(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        require_x_server(
+            cls,
+            lambda: has_x_server() and ShmCapture.is_available(),
+            "An X server with MIT-SHM is required.",
+        )
+
+    def setUp(self):
+        self.display = Xlib.display.Display()
+        screen = self.display.screen()
+        self.window = screen.root.create_window(
+            0, 0, 40, 30, 0, screen.root_depth, background_pixel=0x123456
+        )
+        self.window.map()
+        self.display.sync()
+        # Paint a different color on the bottom right corner of the window.
+        gc = self.window.create_gc(foreground=0xABCDEF)
+        self.window.fill_rectangle(gc, 20, 15, 20, 15)
+        self.display.sync()
+        time.sleep(0.2)
+
+    def tearDown(self):
+        self.window.destroy()
+        self.display.close()
+
+    def test_capture(self):
+        # given
+        with ShmCapture(self.window.id) as target:
+            # when
+            area = target.capture(Rect(18, 13, 4, 4))
+            # then
+            self.assertEqual(len(area), 4 * 4 * 4)
+            self.assertEqual(bytes(area[0:4])[:3], bytes([0x56, 0x34, 0x12]))
+            self.assertEqual(bytes(area[-4:])[:3], bytes([0xEF, 0xCD, 0xAB]))
+
+    def test_capture_reuses_segments(self):
+        # given
+        with ShmCapture(self.window.id) as target:
+            # when
+            first = target.capture(Rect(0, 0, 2, 2))
+            second = target.capture(Rect(30, 20, 2, 2))
+            other_slot = target.capture(Rect(0, 0, 2, 2), slot=1)
+            # then
+            self.assertEqual(len(target.segments), 2)
+            # The same segment was overwritten by the second capture.
+            self.assertEqual(bytes(first[:3]), bytes([0xEF, 0xCD, 0xAB]))
+            self.assertEqual(bytes(second[:3]), bytes([0xEF, 0xCD, 0xAB]))
+            self.assertEqual(bytes(other_slot[:3]), bytes([0x56, 0x34, 0x12]))
+
+    def test_screen_reader_backends_match(self):
+        # given
+        coords = [Coord(0, 0), Coord(19, 14), Coord(20, 15), Coord(39, 29)]
+        for backend in (CaptureBackend.SHM, CaptureBackend.XLIB):
+            with ScreenReader(self.window.id, capture_backend=backend) as target:
+                # when
+                pixels = [target.get_coord_color(coord) for coord in coords]
+                frame_pixels = [
+                    target.new_frame([Rect(0, 0, 40, 30)]).get_coord_color(coord)
+                    for coord in coords
+                ]
+                image = target.get_area_image(18, 13, 4, 4)
+                # then
+                self.assertEqual(
+                    pixels, ["123456", "123456", "abcdef", "abcdef"], backend
+                )
+                self.assertEqual(frame_pixels, pixels, backend)
+                self.assertEqual(image.getpixel((3, 3)), (0xAB, 0xCD, 0xEF))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3.8
+
+import unittest
+
+from unittest import TestCase
+
+from tibia_terminator.reader.equipment_reader import MagicShieldStatus
+from tibia_terminator.reader.screen_read_benchmark import (
+    gen_synthetic_equipment,
+    paint_synthetic_window,
+    run_screen_read_benchmarks,
+)
+from tibia_terminator.reader.synthetic_window import (
+    SCREEN_HEIGHT,
+    SCREEN_WIDTH,
+    TEXT_BACKGROUND_COLOR,
+    TEXT_COLOR,
+    SyntheticEquipment,
+    SyntheticTibiaWindow,
+    gen_equipment_pixels,
+    gen_number_pixels,
+)
+from tibia_terminator.reader.window_utils import CaptureBackend, ScreenReader
+from tibia_terminator.schemas.reader.interface_config_schema import (
+    Rect,
+    TibiaWindowSpecSchema,
+)
+from tibia_terminator.tests.reader.test_equipment_reader import (
+    TEST_SPEC_PATH,
+    FakeEquipmentReader,
+    FakeScreenReader,
+    FakeWindow,
+)
+from tibia_terminator.tests.x_server import require_x_server
+
+EXPECTED_EQUIPMENT = {
+    "equipped_amulet": "ssa.amulet",
+    "equipped_ring": "might.ring",
+    "normal_action_amulet": "ssa.amulet",
+    "emergency_action_amulet": "unknown",
+    "tank_action_amulet": "unknown",
+    "normal_action_ring": "unknown",
+    "emergency_action_ring": "might.ring",
+    "tank_action_ring": "unknown",
+    "magic_shield_status": MagicShieldStatus.RECENTLY_CAST,
+}
+
+
+class TestSyntheticWindowContent(TestCase):
+    def setUp(self):
+        self.spec = TibiaWindowSpecSchema().loadf(TEST_SPEC_PATH)
+
+    def test_equipment_pixels_are_read_back(self):
+        # given
+        window = FakeWindow(
+            gen_equipment_pixels(self.spec, SyntheticEquipment(**EXPECTED_EQUIPMENT))
+        )
+        target = FakeEquipmentReader(window, self.spec)
+        for lane in range(1, len(target.lane_readers)):
+            target.lane_readers[lane] = FakeScreenReader(window)
+        target.task_loop.start()
+        self.addCleanup(target.task_loop.stop)
+        # when
+        status = target.get_equipment_status()
+        # then
+        self.assertEqual(
+            {key: status[key] for key in status.future_values}, EXPECTED_EQUIPMENT
+        )
+
+    def test_number_pixels(self):
+        # given
+        rect = Rect(10, 20, 30, 9)
+        # when
+        pixels = gen_number_pixels(rect, "1")
+        # then
+        self.assertEqual(len(pixels), 30 * 9)
+        self.assertEqual(min(c.x for c in pixels), 10)
+        self.assertEqual(max(c.y for c in pixels), 28)
+        # the top pixel of the 1 is in the 3rd column of the bitmap
+        self.assertEqual(pixels[(13, 21)], TEXT_COLOR)
+        self.assertEqual(pixels[(11, 21)], TEXT_BACKGROUND_COLOR)
+        self.assertEqual(list(pixels.values()).count(TEXT_COLOR), 10)
+
+    def test_number_pixels_are_clipped(self):
+        # when
+        pixels = gen_number_pixels(Rect(0, 0, 8, 9), "88")
+        # then
+        self.assertTrue(all(c.x < 8 for c in pixels))
+
+
+class TestScreenReadBenchmark(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        require_x_server(cls, screen=f"{SCREEN_WIDTH}x{SCREEN_HEIGHT}x24")
+
+    def setUp(self):
+        self.spec = TibiaWindowSpecSchema().loadf(TEST_SPEC_PATH)
+        self.window = SyntheticTibiaWindow()
+        self.window.open()
+        self.addCleanup(self.window.close)
+        paint_synthetic_window(
+            self.window, self.spec, gen_synthetic_equipment(self.spec)
+        )
+
+    def test_synthetic_window_is_read_back(self):
+        # given
+        magic_shield = self.spec.action_bar.magic_shield
+        with ScreenReader(self.window.wid, capture_backend=CaptureBackend.XLIB) as target:
+            # when
+            rgb = target.get_coord_rgb(magic_shield.coord)
+        # then
+        self.assertIn(rgb, magic_shield.off_cooldown_color)
+
+    def test_run_screen_read_benchmarks(self):
+        # when
+        results = run_screen_read_benchmarks(
+            self.window.wid,
+            self.spec,
+            [CaptureBackend.XLIB],
+            rounds=3,
+            warmup_rounds=1,
+        )
+        # then
+        names = [result.name for result in results]
+        self.assertIn("xlib.get_pixel_rgb", names)
+        self.assertIn("xlib.matches_screen.depot_box_open", names)
+        self.assertIn("xlib.equipment.get_equipment_status", names)
+        self.assertIn("xlib.equipment_no_frames.get_equipment_status", names)
+        self.assertTrue(all(result.rounds == 3 for result in results))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3.8
+
+import mmap
+import os
+import unittest
+
+from ctypes import addressof, c_byte, c_int, c_int16
+from unittest import TestCase
+
+import numpy as np
+
+from tibia_terminator.reader.read_only_process import MemRegion, ReadOnlyProcess
+from tibia_terminator.reader.typed_memory_search import (
+    ChangedBy,
+    EqualTo,
+    InRange,
+    read_typed_values,
+    search_addresses_typed,
+    search_all_memory_typed,
+    search_region_typed,
+)
+from tibia_terminator.tests.reader.test_read_only_process import make_region
+
+
+class TestTypedMemorySearch(TestCase):
+    def setUp(self):
+        self.proc = ReadOnlyProcess(os.getpid())
+        self.proc.open()
+        self.addCleanup(self.proc.close)
+        self.haystack = (c_int * 64)()
+        self.start = addressof(self.haystack)
+        self.region = make_region((c_byte * 256).from_buffer(self.haystack))
+
+    def set_values(self, values_by_index):
+        for index, value in values_by_index.items():
+            self.haystack[index] = value
+
+    def addresses(self, *indexes):
+        return [self.start + index * 4 for index in indexes]
+
+    def test_search_region_typed(self):
+        # given
+        self.set_values({0: 1234, 15: 1234, 16: 1234, 63: 1234, 20: 1233})
+        # when
+        actual = search_region_typed(
+            self.proc, self.region, c_int, EqualTo(1234), chunk_size=64
+        )
+        # then
+        self.assertEqual(actual.addresses.tolist(), self.addresses(0, 15, 16, 63))
+        self.assertEqual(actual.values.tolist(), [1234] * 4)
+
+    def test_search_region_typed_in_range(self):
+        # given
+        self.set_values({1: 99, 2: 100, 3: 150, 4: 200, 5: 201})
+        # when
+        actual = search_region_typed(self.proc, self.region, c_int, InRange(100, 200))
+        # then
+        self.assertEqual(actual.addresses.tolist(), self.addresses(2, 3, 4))
+        self.assertEqual(actual.values.tolist(), [100, 150, 200])
+
+    def test_search_region_typed_int16(self):
+        # given
+        values = (c_int16 * 128).from_buffer(self.haystack)
+        values[3] = -7
+        values[100] = -7
+        # when
+        actual = search_region_typed(
+            self.proc, self.region, c_int16, EqualTo(-7), chunk_size=32
+        )
+        # then
+        self.assertEqual(
+            actual.addresses.tolist(), [self.start + 6, self.start + 200]
+        )
+
+    def test_read_typed_values(self):
+        # given
+        self.set_values({0: 1, 10: 2, 40: 3})
+        addresses = np.array(self.addresses(0, 10, 40), np.uint64)
+        # when
+        actual, readable = read_typed_values(self.proc, addresses, c_int)
+        # then
+        self.assertEqual(actual.tolist(), [1, 2, 3])
+        self.assertEqual(readable.tolist(), [True, True, True])
+
+    def test_read_typed_values_unreadable_group(self):
+        # given
+        self.set_values({0: 1, 10: 2, 40: 3})
+        addresses = np.array(self.addresses(0, 10, 40), np.uint64)
+        unreadable = self.start + 40 * 4
+        read_bytes = self.proc.read_bytes
+
+        def fail_read_bytes(base_address, size):
+            # the group can't be read, and neither can its last address
+            if size > 4 or base_address == unreadable:
+                raise OSError("Input/output error")
+            return read_bytes(base_address, size)
+
+        self.proc.read_bytes = fail_read_bytes
+        # when
+        actual, readable = read_typed_values(self.proc, addresses, c_int)
+        # then
+        self.assertEqual(actual.tolist()[:2], [1, 2])
+        self.assertEqual(readable.tolist(), [True, True, False])
+
+    def test_search_addresses_typed_drops_unreadable(self):
+        # given
+        self.set_values({5: 7, 50: 7})
+        candidates = search_region_typed(self.proc, self.region, c_int, EqualTo(7))
+        unreadable = self.start + 50 * 4
+        read_bytes = self.proc.read_bytes
+
+        def fail_read_bytes(base_address, size):
+            if base_address <= unreadable < base_address + size:
+                raise OSError("Input/output error")
+            return read_bytes(base_address, size)
+
+        self.proc.read_bytes = fail_read_bytes
+        # when
+        actual = search_addresses_typed(self.proc, candidates, EqualTo(7))
+        # then
+        self.assertEqual(actual.addresses.tolist(), self.addresses(5))
+
+    def test_read_typed_values_unaligned(self):
+        # given
+        values = (c_int16 * 128).from_buffer(self.haystack)
+        values[1] = 5
+        values[2] = 6
+        # when
+        actual, _ = read_typed_values(
+            self.proc, np.array([self.start + 2], np.uint64), c_int
+        )
+        # then
+        self.assertEqual(actual.tolist(), [5 + (6 << 16)])
+
+    def test_search_addresses_typed_changed_by(self):
+        # given
+        self.set_values({0: 100, 1: 100, 2: 100, 3: 100})
+        candidates = search_region_typed(self.proc, self.region, c_int, EqualTo(100))
+        self.set_values({0: 80, 1: 60, 2: 59, 3: 101})
+        # when
+        actual = search_addresses_typed(self.proc, candidates, ChangedBy(-40, -20))
+        # then
+        self.assertEqual(actual.addresses.tolist(), self.addresses(0, 1))
+        self.assertEqual(actual.values.tolist(), [80, 60])
+
+    def test_search_addresses_typed_equal_to(self):
+        # given
+        self.set_values({5: 7, 50: 7})
+        candidates = search_region_typed(self.proc, self.region, c_int, EqualTo(7))
+        self.set_values({5: 8})
+        # when
+        actual = search_addresses_typed(self.proc, candidates, EqualTo(7))
+        # then
+        self.assertEqual(actual.addresses.tolist(), self.addresses(50))
+
+    def test_changed_by_without_previous_values(self):
+        # when
+        self.assertRaises(
+            Exception,
+            search_region_typed,
+            self.proc,
+            self.region,
+            c_int,
+            ChangedBy(-1, 1),
+        )
+
+    def test_search_all_memory_typed(self):
+        # given
+        size = 2 * mmap.PAGESIZE
+        mapping = mmap.mmap(-1, size)
+        self.addCleanup(mapping.close)
+        haystack = (c_int * (size // 4)).from_buffer(mapping)
+        haystack[3] = 0x5EED1E55
+        haystack[-1] = 0x5EED1E55
+        start = addressof(haystack)
+
+        def mem_region_filter(mem_region: MemRegion) -> bool:
+            return mem_region.start <= start < mem_region.end
+
+        # when
+        found = search_all_memory_typed(
+            self.proc, c_int, EqualTo(0x5EED1E55), mem_region_filter=mem_region_filter
+        )
+        # then
+        actual = [a for a in found.addresses.tolist() if start <= a < start + size]
+        self.assertEqual(actual, [start + 12, start + size - 4])
+        del haystack
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3.8
+
+import unittest
+
+from tibia_terminator.reader.window_utils import (
+    ScreenReader,
+    gen_bounding_rect,
+)
+from tibia_terminator.schemas.reader.common import Coord
+from tibia_terminator.schemas.reader.interface_config_schema import Rect
+
+
+def fake_rgb(x: int, y: int) -> int:
+    return (x & 0xFF) << 16 | (y & 0xFF) << 8 | ((x + y) & 0xFF)
+
+
+class FakeImage:
+    def __init__(self, data: bytes):
+        self.data = data
+
+
+class FakeWindow:
+    def __init__(self):
+        self.requests = []
+
+    def get_image(self, x, y, width, height, fmt, plane_mask):
+        self.requests.append((x, y, width, height))
+        data = bytearray()
+        for row in range(y, y + height):
+            for col in range(x, x + width):
+                rgb = fake_rgb(col, row)
+                data.extend((rgb & 0xFF, (rgb >> 8) & 0xFF, rgb >> 16, 0))
+        return FakeImage(bytes(data))
+
+
+class FakeScreenReader(ScreenReader):
+    def __init__(self):
+        super().__init__()
+        self.window = FakeWindow()
+
+    def get_window(self):
+        return self.window
+
+
+class TestWindowUtils(unittest.TestCase):
+    def test_gen_bounding_rect(self):
+        # given
+        coords = [Coord(5, 10), Coord(2, 12), Coord(7, 11)]
+        # when
+        rect = gen_bounding_rect(coords)
+        # then
+        self.assertEqual(rect, Rect(2, 10, 6, 3))
+
+    def test_get_pixel_color(self):
+        # given
+        target = FakeScreenReader()
+        # when
+        color = target.get_pixel_color(3, 4)
+        # then
+        self.assertEqual(color, f"{fake_rgb(3, 4):03x}")
+
+    def test_get_pixel_rgb(self):
+        # given
+        target = FakeScreenReader()
+        # when
+        rgb = target.get_pixel_rgb(3, 4)
+        # then
+        self.assertEqual(rgb, fake_rgb(3, 4))
+
+    def test_matches_screen(self):
+        # given
+        target = FakeScreenReader()
+        coords = [(1, 2), (3, 4)]
+        # when
+        hex_match = target.matches_screen(
+            coords, [f"{fake_rgb(1, 2):06X}", f"{fake_rgb(3, 4):x}"]
+        )
+        rgb_match = target.matches_screen(coords, [fake_rgb(1, 2), fake_rgb(3, 4)])
+        mismatch = target.matches_screen(coords, [fake_rgb(1, 2), fake_rgb(3, 5)])
+        # then
+        self.assertTrue(hex_match)
+        self.assertTrue(rgb_match)
+        self.assertFalse(mismatch)
+
+    def test_screen_frame_reads_each_area_once(self):
+        # given
+        target = FakeScreenReader()
+        rects = [Rect(0, 0, 4, 3), Rect(10, 20, 5, 5)]
+        frame = target.new_frame(rects)
+        coords = [Coord(0, 0), Coord(3, 2), Coord(1, 1), Coord(12, 22), Coord(14, 24)]
+        # when
+        colors = [frame.get_coord_rgb(coord) for coord in coords]
+        # then
+        self.assertEqual(colors, [fake_rgb(c.x, c.y) for c in coords])
+        self.assertEqual(
+            target.window.requests, [(0, 0, 4, 3), (10, 20, 5, 5)]
+        )
+
+    def test_screen_frame_does_not_grab_unused_areas(self):
+        # given
+        target = FakeScreenReader()
+        frame = target.new_frame([Rect(0, 0, 4, 3), Rect(10, 20, 5, 5)])
+        # when
+        frame.get_pixel_color(11, 21)
+        # then
+        self.assertEqual(target.window.requests, [(10, 20, 5, 5)])
+
+    def test_screen_frame_falls_back_outside_areas(self):
+        # given
+        target = FakeScreenReader()
+        frame = target.new_frame([Rect(0, 0, 4, 3)])
+        # when
+        color = frame.get_pixel_color(50, 60)
+        # then
+        self.assertEqual(color, f"{fake_rgb(50, 60):03x}")
+        self.assertEqual(target.window.requests, [(50, 60, 1, 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3.8
+
+import os
+import unittest
+
+from unittest import TestCase
+
+from marshmallow import ValidationError
+
+from tibia_terminator.schemas.reader.common import Coord
+from tibia_terminator.schemas.reader.interface_config_schema import (
+    ItemColors,
+    ItemColorsSchema,
+    MagicShieldSpec,
+    MagicShieldSpecSchema,
+    TibiaWindowSpecSchema,
+)
+
+TEST_SPEC_PATH = os.path.join(
+    os.path.dirname(__file__), "reader", "tibia_window_spec_schema_test.json"
+)
+
+
+class TestItemColorsSchema(TestCase):
+    def test_load_packs_hex_colors(self):
+        # given
+        root = {"north": "b9a022", "south": "B9A022", "left": "fff", "right": "0"}
+        target = ItemColorsSchema()
+        # when
+        actual = target.load(root)
+        # then
+        self.assertEqual(actual, ItemColors(0xB9A022, 0xB9A022, 0xFFF, 0))
+
+    def test_dump_formats_hex_colors(self):
+        # given
+        colors = ItemColors(0xB9A022, 0x3730A, 0xFFF, 0)
+        target = ItemColorsSchema()
+        # when
+        actual = target.dump(colors)
+        # then
+        self.assertEqual(
+            actual, {"north": "b9a022", "south": "3730a", "left": "fff", "right": "000"}
+        )
+
+    def test_load_invalid_color(self):
+        # given
+        root = {"north": "xyz", "south": "0", "left": "0", "right": "1000000"}
+        target = ItemColorsSchema()
+        # when
+        with self.assertRaises(ValidationError) as context:
+            target.load(root)
+        # then
+        self.assertEqual(set(context.exception.messages), {"north", "right"})
+
+
+class TestMagicShieldSpecSchema(TestCase):
+    def test_load_color_sets(self):
+        # given
+        root = {
+            "coord": {"x": 1, "y": 2},
+            "recently_cast_color": ["3730a", "3730A"],
+            "off_cooldown_color": ["b9a022", "ffffff"],
+        }
+        target = MagicShieldSpecSchema()
+        # when
+        actual = target.load(root)
+        # then
+        self.assertEqual(
+            actual,
+            MagicShieldSpec(
+                coord=Coord(1, 2),
+                recently_cast_color=frozenset({0x3730A}),
+                off_cooldown_color=frozenset({0xB9A022, 0xFFFFFF}),
+            ),
+        )
+
+
+class TestTibiaWindowSpecSchema(TestCase):
+    def test_loadf(self):
+        # given
+        target = TibiaWindowSpecSchema()
+        # when
+        actual = target.loadf(TEST_SPEC_PATH)
+        # then
+        self.assertEqual(
+            actual.action_bar.magic_shield.off_cooldown_color, frozenset({0xB9A022})
+        )
+        self.assertEqual(
+            actual.item_repository.rings[0].action_bar_colors[0],
+            ItemColors(0x9B8132, 0xD1AF44, 0xFAED75, 0xD5B246),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3.8
+
+import curses
+import unittest
+
+from unittest import TestCase
+
+from tibia_terminator.common.char_status import CharStatus, CharStatusAsync
+from tibia_terminator.common.lazy_evaluator import FutureTask, immediate
+from tibia_terminator.view.view_renderer import (
+    EQUIPMENT_ERROR_MSG,
+    CliScreen,
+    RunView,
+    RunViewState,
+    ViewRenderer,
+    gen_run_view_state,
+)
+
+
+class FakeCli:
+    def __init__(self, height: int = 100):
+        self.height = height
+        self.addstr_calls = []
+        self.refresh_count = 0
+
+    def getmaxyx(self):
+        return self.height, 80
+
+    def clear(self):
+        pass
+
+    def refresh(self):
+        self.refresh_count += 1
+
+    def nodelay(self, _):
+        pass
+
+    def idlok(self, _):
+        pass
+
+    def leaveok(self, _):
+        pass
+
+    def move(self, row, col):
+        if row >= self.height:
+            raise curses.error("move() returned ERR")
+
+    def clrtoeol(self):
+        pass
+
+    def addstr(self, row, col, line):
+        self.addstr_calls.append((row, col, line))
+
+
+def make_char_status(**equipment_status) -> CharStatus:
+    return CharStatus(1000, 300, 2000, 500, equipment_status)
+
+
+class TestRunView(TestCase):
+    def make_renderer(self, view: RunView, height: int = 100) -> ViewRenderer:
+        self.cli = FakeCli(height)
+        renderer = ViewRenderer(None, CliScreen(self.cli))
+        renderer.view = view
+        return renderer
+
+    def test_publish(self):
+        # given
+        target = RunView()
+        state = RunViewState(mana=2000, hp=1000)
+        # when
+        target.publish(state)
+        # then
+        self.assertEqual(target.snapshot.generation, 1)
+        self.assertIs(target.state, state)
+
+    def test_update(self):
+        # given
+        target = RunView()
+        target.publish(RunViewState(mana=2000))
+        # when
+        target.set_debug_line_2("debug")
+        # then
+        self.assertEqual(target.snapshot.generation, 2)
+        self.assertEqual(target.state.mana, 2000)
+        self.assertEqual(target.state.debug_line_2, "debug")
+
+    def test_render_once_per_generation(self):
+        # given
+        target = RunView()
+        renderer = self.make_renderer(target)
+        # when
+        renderer.render()
+        renderer.render()
+        # then
+        self.assertEqual(self.cli.refresh_count, 1)
+
+    def test_render_new_generation(self):
+        # given
+        target = RunView()
+        renderer = self.make_renderer(target)
+        renderer.render()
+        # when
+        target.publish(target.state._replace(mana=1234))
+        renderer.render()
+        # then
+        self.assertEqual(self.cli.refresh_count, 2)
+        self.assertIn((RunView.MANA_ROW, 6, "1234"), self.cli.addstr_calls)
+
+    def test_render_new_logs(self):
+        # given
+        target = RunView()
+        renderer = self.make_renderer(target)
+        renderer.render()
+        # when
+        target.action_log.append(0, "new %s", ("log",))
+        renderer.render()
+        # then
+        self.assertEqual(self.cli.refresh_count, 2)
+        self.assertIn((RunView.LOG_ROW + 1, 0, "new log"), self.cli.addstr_calls)
+
+    def test_render_latencies_clipped_to_terminal(self):
+        # given
+        target = RunView()
+        target.publish(RunViewState(latency_lines=("worst", "second", "third")))
+        renderer = self.make_renderer(target, RunView.LATENCY_ROW + 3)
+        # when
+        renderer.render()
+        # then
+        latency_rows = [
+            (row, line)
+            for row, _, line in self.cli.addstr_calls
+            if row > RunView.LATENCY_ROW
+        ]
+        self.assertEqual(
+            latency_rows,
+            [(RunView.LATENCY_ROW + 1, "worst"), (RunView.LATENCY_ROW + 2, "second")],
+        )
+
+
+class TestCliScreen(TestCase):
+    def test_print_outside_of_terminal(self):
+        # given
+        cli = FakeCli(height=2)
+        target = CliScreen(cli)
+        # when
+        target.print("out of bounds", 5)
+        target.print("in bounds", 1)
+        # then
+        self.assertEqual(cli.addstr_calls, [(1, 0, "in bounds")])
+
+
+class TestGenRunViewState(TestCase):
+    def test_gen_run_view_state(self):
+        # given
+        char_status = make_char_status(equipped_amulet="ssa", equipped_ring="might")
+        # when
+        actual = gen_run_view_state(RunViewState(), char_status, active_mode="tank")
+        # then
+        self.assertEqual(actual.hp, 1000)
+        self.assertEqual(actual.speed, 300)
+        self.assertEqual(actual.mana, 2000)
+        self.assertEqual(actual.magic_shield_level, 500)
+        self.assertEqual(actual.equipped_amulet, "ssa")
+        self.assertEqual(actual.equipped_ring, "might")
+        self.assertEqual(actual.active_mode, "tank")
+
+    def test_gen_run_view_state_pending_equipment(self):
+        # given
+        prev_state = RunViewState(equipped_amulet="ssa", equipped_ring="might")
+        pending_ring = FutureTask(lambda: "energy")
+        failed_amulet = FutureTask(lambda: 1 / 0)
+        failed_amulet.run()
+        char_status = CharStatusAsync(
+            immediate({"hp": 1000, "speed": 300, "mana": 2000, "magic_shield": 500}),
+            {"equipped_ring": pending_ring, "equipped_amulet": failed_amulet},
+        )
+        # when
+        actual = gen_run_view_state(prev_state, char_status)
+        # then
+        self.assertEqual(actual.equipped_ring, "might")
+        self.assertEqual(actual.equipped_amulet, EQUIPMENT_ERROR_MSG)
+        self.assertEqual(actual.hp, 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
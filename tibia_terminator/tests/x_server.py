@@ -0,0 +1,54 @@
+#!/usr/bin/env python3.8
+
+import os
+import unittest
+
+from typing import Callable
+
+import Xlib.display
+
+from tibia_terminator.reader.synthetic_window import start_xvfb
+
+
+def has_x_server() -> bool:
+    return bool(os.environ.get("DISPLAY"))
+
+
+def has_x_extension(name: str) -> Callable[[], bool]:
+    def is_available() -> bool:
+        if not has_x_server():
+            return False
+        try:
+            display = Xlib.display.Display()
+        except Exception:
+            return False
+        try:
+            return display.has_extension(name)
+        finally:
+            display.close()
+
+    return is_available
+
+
+def require_x_server(
+    test_case: type,
+    is_available: Callable[[], bool] = has_x_server,
+    reason: str = "An X server is required.",
+    screen: str = "320x240x24",
+) -> None:
+    """Starts an Xvfb server for the test case's class when there is no X
+    display and skips the class unless is_available() holds. Meant to be
+    called from setUpClass, the server is stopped through a class cleanup
+    so that it doesn't outlive a skipped class."""
+    xvfb = start_xvfb(screen=screen)
+    if xvfb:
+
+        def stop_xvfb():
+            xvfb.terminate()
+            xvfb.wait()
+            del os.environ["DISPLAY"]
+
+        test_case.addClassCleanup(stop_xvfb)
+
+    if not is_available():
+        raise unittest.SkipTest(reason)
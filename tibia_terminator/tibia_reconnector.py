@@ -5,6 +5,10 @@ import argparse
 import time
 import sys
 
+from typing import Optional
+
+from tibia_terminator.interface.keystroke_sender import KeystrokeSender
+from tibia_terminator.interface.xtest_input import make_keystroke_sender
 from tibia_terminator.schemas.credentials_schema import CredentialsSchema, Credential
 from tibia_terminator.reader.window_utils import (
     get_tibia_wid,
@@ -35,6 +39,13 @@ parser.add_argument(
 parser.add_argument(
     "--login", help="Logs in the first character in the list.", action="store_true"
 )
+parser.add_argument(
+    "--input_backend",
+    help=("How keystrokes are sent to Tibia. xdotool sends them to the Tibia"
+          " window, xtest injects them into the focused window."),
+    choices=["xdotool", "xtest"],
+    default="xdotool",
+)
 parser.add_argument(
     "--debug_level",
     help="Verbosity level of debug message. (Default: 0)",
@@ -104,49 +115,67 @@ def check_ingame(tibia_wid: str) -> bool:
     return not reader.is_logged_out_screen(tibia_wid)
 
 
-def close_dialogs(tibia_wid: str):
+def close_dialogs(
+    tibia_wid: str, keystroke_sender: Optional[KeystrokeSender] = None
+):
     # Menus are closed by either of these 2 keys.
     for i in range(5):
-        send_key(tibia_wid, Key.ESCAPE)
+        send_key(tibia_wid, Key.ESCAPE, keystroke_sender)
         time.sleep(0.5)
-        send_key(tibia_wid, Key.ENTER)
+        send_key(tibia_wid, Key.ENTER, keystroke_sender)
         time.sleep(0.5)
-        send_key(tibia_wid, Key.SPACE)
+        send_key(tibia_wid, Key.SPACE, keystroke_sender)
         time.sleep(0.25)
-        send_key(tibia_wid, Key.BACKSPACE)
+        send_key(tibia_wid, Key.BACKSPACE, keystroke_sender)
         time.sleep(0.25)
 
 
-def clear_text_field(tibia_wid, x: int, y: int):
+def clear_text_field(
+    tibia_wid, x: int, y: int, keystroke_sender: Optional[KeystrokeSender] = None
+):
     # focus field
     left_click(tibia_wid, x, y)
     time.sleep(0.1)
     # clear text
-    send_key(tibia_wid, Key.HOME)
+    send_key(tibia_wid, Key.HOME, keystroke_sender)
     time.sleep(0.25)
-    send_key(tibia_wid, f"{Key.SHIFT}+{Key.END}")
+    send_key(tibia_wid, f"{Key.SHIFT}+{Key.END}", keystroke_sender)
     time.sleep(0.25)
-    send_key(tibia_wid, Key.BACKSPACE)
+    send_key(tibia_wid, Key.BACKSPACE, keystroke_sender)
     time.sleep(0.25)
 
 
-def overwrite_text_field(tibia_wid, coord: Coord, new_text: str):
-    clear_text_field(tibia_wid, coord.x, coord.y)
+def overwrite_text_field(
+    tibia_wid,
+    coord: Coord,
+    new_text: str,
+    keystroke_sender: Optional[KeystrokeSender] = None,
+):
+    clear_text_field(tibia_wid, coord.x, coord.y, keystroke_sender)
     send_text(tibia_wid, new_text)
     time.sleep(0.1)
 
 
-def login(tibia_wid, credential: Credential):
+def login(
+    tibia_wid,
+    credential: Credential,
+    keystroke_sender: Optional[KeystrokeSender] = None,
+):
     # Focus tibia window
     focus_tibia(tibia_wid)
     time.sleep(0.5)
-    close_dialogs(tibia_wid)
+    close_dialogs(tibia_wid, keystroke_sender)
     time.sleep(0.25)
     # fill-in email field
-    overwrite_text_field(tibia_wid, LOGIN_SCREEN_SPEC.email_field, credential.user)
+    overwrite_text_field(
+        tibia_wid, LOGIN_SCREEN_SPEC.email_field, credential.user, keystroke_sender
+    )
     # fill-in password
     overwrite_text_field(
-        tibia_wid, LOGIN_SCREEN_SPEC.password_field, credential.password
+        tibia_wid,
+        LOGIN_SCREEN_SPEC.password_field,
+        credential.password,
+        keystroke_sender,
     )
     # Click [Login] button
     left_click(tibia_wid, LOGIN_SCREEN_SPEC.login_btn.x, LOGIN_SCREEN_SPEC.login_btn.y)
@@ -167,7 +196,12 @@ def login(tibia_wid, credential: Credential):
     return False
 
 
-def handle_login(tibia_wid, credentials, max_wait_minutes):
+def handle_login(
+    tibia_wid,
+    credentials,
+    max_wait_minutes,
+    keystroke_sender: Optional[KeystrokeSender] = None,
+):
     max_wait_secs = max_wait_minutes * 60
     wait_retry_secs = 60
     total_wait_secs = 0
@@ -183,7 +217,7 @@ def handle_login(tibia_wid, credentials, max_wait_minutes):
         acquire_lock('./.tibia_reconnector.lock')
 
         try:
-            if login(tibia_wid, credentials):
+            if login(tibia_wid, credentials, keystroke_sender):
                 print("Login succeeded.")
                 sys.exit(LOGGED_IN_EXIT_STATUS)
             else:
@@ -222,6 +256,7 @@ def main(
     only_check=False,
     login=False,
     max_wait_minutes=120,
+    keystroke_sender: Optional[KeystrokeSender] = None,
 ):
     """Main entry point of the program."""
     tibia_wid = get_tibia_wid(tibia_pid)
@@ -239,7 +274,7 @@ def main(
             raise Exception("We require a user profile to login.")
 
         credential = load_credential(credentials_user, credentials_path)
-        handle_login(tibia_wid, credential, max_wait_minutes)
+        handle_login(tibia_wid, credential, max_wait_minutes, keystroke_sender)
 
 
 if __name__ == "__main__":
@@ -253,6 +288,7 @@ if __name__ == "__main__":
             args.check_if_ingame,
             args.login,
             args.max_wait_minutes,
+            make_keystroke_sender(args.input_backend),
         )
     except SystemExit as e:
         raise e
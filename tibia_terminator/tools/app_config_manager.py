@@ -27,6 +27,7 @@ from tibia_terminator.schemas.hotkeys_config_schema import (
     HotkeysConfigSchema,
     HotkeysConfig,
 )
+from tibia_terminator.interface.xtest_input import make_keystroke_sender
 from tibia_terminator.reader.memory_address_finder import MemoryAddressFinder
 from tibia_terminator.reader.ocr_number_reader import OcrNumberReader
 from tibia_terminator.reader.window_utils import ScreenReader, get_tibia_wid
@@ -113,6 +114,23 @@ def parse_args() -> Namespace:
         type=str,
         required=True,
     )
+    find_addresses.add_argument(
+        "--input_backend",
+        help=(
+            "How the spell keys are sent to Tibia. xdotool sends them to the "
+            "Tibia window, xtest injects them into the focused window."
+        ),
+        choices=["xdotool", "xtest"],
+        default="xdotool",
+    )
+    find_addresses.add_argument(
+        "--use_snapshots",
+        help=(
+            "Find the addresses by how the memory changes after casting a "
+            "spell, instead of searching for the OCR value after each cast."
+        ),
+        action="store_true",
+    )
     return parser.parse_args()
 
 
@@ -164,11 +182,14 @@ def find_memory_addresses(args: Namespace, app_configs: AppConfigs) -> AppConfig
             app_config_memory_address_finder = AppConfigMemoryAddressFinder(
                 tibia_pid=args.pid,
                 memory_address_finder=MemoryAddressFinder(
-                    tibia_pid=args.pid, ocr_reader=ocr_reader
+                    tibia_pid=args.pid,
+                    ocr_reader=ocr_reader,
+                    keystroke_sender=make_keystroke_sender(args.input_backend),
                 ),
                 hotkeys_config=hotkeys_config,
                 mana_rect=tibia_window_config.stats_fields.mana_field,
                 speed_rect=tibia_window_config.stats_fields.speed_field,
+                use_snapshots=args.use_snapshots,
             )
             built_config = app_config_memory_address_finder.build_app_config_entry()
             new_configs = list(
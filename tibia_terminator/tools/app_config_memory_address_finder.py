@@ -3,12 +3,16 @@
 import time
 import logging
 
-from typing import Optional, Any
+from typing import Callable, List, Optional, Any
 from ctypes import c_int, c_int16
 
 from tibia_terminator.reader.char_reader38 import MAGIC_SHIELD_TO_SPEED_OFFSET
-from tibia_terminator.reader.memory_address_finder import MemoryAddressFinder
+from tibia_terminator.reader.memory_address_finder import (
+    MemoryAddressFinder,
+    SnapshotStep,
+)
 from tibia_terminator.reader.ocr_number_reader import Rect
+from tibia_terminator.reader.typed_memory_search import Decreased
 from tibia_terminator.reader.window_utils import get_tibia_wid, send_key
 from tibia_terminator.schemas.app_config_schema import AppConfig
 from tibia_terminator.schemas.hotkeys_config_schema import HotkeysConfig
@@ -39,6 +43,7 @@ class AppConfigMemoryAddressFinder:
         speed_rect: Rect,
         hp_rect: Optional[Rect] = None,
         soul_points_rect: Optional[Rect] = None,
+        use_snapshots: bool = False,
     ):
         self.tibia_pid = tibia_pid
         self.memory_address_finder = memory_address_finder
@@ -47,16 +52,41 @@ class AppConfigMemoryAddressFinder:
         self.speed_rect = speed_rect
         self.hp_rect = hp_rect
         self.soul_points_rect = soul_points_rect
+        # Find the mana addresses by how the mana changes after casting a
+        # spell, rather than by searching its OCR value after every cast.
+        self.use_snapshots = use_snapshots
+
+    def gen_mana_snapshot_steps(self) -> List[SnapshotStep]:
+        # each minor heal costs mana, regeneration is slower than that
+        return [
+            SnapshotStep(self.hotkeys_config.minor_heal, Decreased())
+            for _ in range(6)
+        ]
+
+    def find_mana_addresses(
+        self, ctype_ctor: Callable, stop_gap_matches: int = 1
+    ) -> List[int]:
+        if self.use_snapshots:
+            return self.memory_address_finder.find_address_by_snapshots(
+                self.gen_mana_snapshot_steps(),
+                ctype_ctor,
+                text_field_rectangle=self.mana_rect,
+                stop_gap_matches=stop_gap_matches,
+            )
+
+        addresses, better_rect = self.memory_address_finder.find_address(
+            update_keys=[self.hotkeys_config.minor_heal for _ in range(6)],
+            text_field_rectangle=self.mana_rect,
+            ctype_ctor=ctype_ctor,
+            stop_gap_matches=stop_gap_matches,
+        )
+        self.mana_rect = better_rect
+        return addresses
 
     def find_mana_address(self) -> int:
         retry_count = 3
         while retry_count > 0:
-            addresses, better_rect = self.memory_address_finder.find_address(
-                update_keys=[self.hotkeys_config.minor_heal for _ in range(6)],
-                text_field_rectangle=self.mana_rect,
-                ctype_ctor=c_int,
-            )
-            self.mana_rect = better_rect
+            addresses = self.find_mana_addresses(c_int)
             if len(addresses) == 1:
                 return addresses[0]
             retry_count -= 1
@@ -66,13 +96,7 @@ class AppConfigMemoryAddressFinder:
     def find_speed_address(self, mana_address: int) -> int:
         retry_count = 3
         while retry_count > 0:
-            addresses, better_rect = self.memory_address_finder.find_address(
-                update_keys=[self.hotkeys_config.minor_heal for _ in range(6)],
-                text_field_rectangle=self.mana_rect,
-                ctype_ctor=c_int16,
-                stop_gap_matches=2,
-            )
-            self.mana_rect = better_rect
+            addresses = self.find_mana_addresses(c_int16, stop_gap_matches=2)
             if len(addresses) == 2:
                 return (
                     next(a for a in addresses if a != mana_address)
@@ -104,6 +128,7 @@ if __name__ == "__main__":
 
     from tesserocr import PyTessBaseAPI
 
+    from tibia_terminator.interface.xtest_input import make_keystroke_sender
     from tibia_terminator.reader.ocr_number_reader import OcrNumberReader
     from tibia_terminator.reader.window_utils import ScreenReader
     from tibia_terminator.reader.window_utils import ScreenReader
@@ -118,7 +143,9 @@ if __name__ == "__main__":
                 finder = AppConfigMemoryAddressFinder(
                     tibia_pid=args.tibia_pid,
                     memory_address_finder=MemoryAddressFinder(
-                        ocr_reader, args.tibia_pid
+                        ocr_reader,
+                        args.tibia_pid,
+                        keystroke_sender=make_keystroke_sender(args.input_backend),
                     ),
                     hotkeys_config=hotkeys_config,
                     mana_rect=Rect(
@@ -133,6 +160,7 @@ if __name__ == "__main__":
                         args.speed_wh[0],
                         args.speed_wh[1],
                     ),
+                    use_snapshots=args.use_snapshots,
                 )
                 app_config = finder.build_app_config_entry()
                 print(
@@ -189,6 +217,22 @@ if __name__ == "__main__":
         type=str,
         help=("Filepath to the hotkeys config file (JSON)."),
     )
+    parser.add_argument(
+        "--input_backend",
+        help=("How the spell keys are sent to Tibia. xdotool sends them to"
+              " the Tibia window, xtest injects them into the focused window."),
+        choices=["xdotool", "xtest"],
+        default="xdotool",
+    )
+    parser.add_argument(
+        "--use_snapshots",
+        action="store_true",
+        help=(
+            "Find the mana address by snapshotting the memory and keeping the "
+            "values that decreased after each minor heal, instead of searching "
+            "for the OCR value after each one."
+        ),
+    )
     parser.add_argument(
         "--log_level",
         required=False,
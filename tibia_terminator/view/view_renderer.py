@@ -3,13 +3,13 @@
 import argparse
 import curses
 
-from queue import Queue
 from threading import Thread, Lock
-from time import sleep
-from typing import List, Any, Callable, Optional, Tuple
+from time import perf_counter, sleep
+from typing import List, Any, Callable, NamedTuple, Optional, Tuple
 
 from tibia_terminator.common.char_status import CharStatus
-from tibia_terminator.common.logger import get_debug_level
+from tibia_terminator.common.latency_histogram import get_latency_histograms
+from tibia_terminator.common.logger import ActionLogRing, get_debug_level
 
 parser = argparse.ArgumentParser(
     description="Maually test the Tibia Terminator renderer."
@@ -42,6 +42,10 @@ class CliScreen:
     def getch(self, y: int, x: int):
         return self.cli.getch(y, x)
 
+    def get_height(self) -> int:
+        height, _ = self.cli.getmaxyx()
+        return height
+
     def __resize(self, lines: List[str], new_len: int):
         while len(lines) < new_len:
             lines.append("")
@@ -55,9 +59,14 @@ class CliScreen:
         diff_substr, diff_idx = self.__diff_substr(self.lines[row], line)
         if diff_idx != -1:
             self.lines[row] = line
-            self.cli.move(row, diff_idx + col)
-            self.cli.clrtoeol()
-            self.cli.addstr(row, diff_idx + col, diff_substr)
+            try:
+                self.cli.move(row, diff_idx + col)
+                self.cli.clrtoeol()
+                self.cli.addstr(row, diff_idx + col, diff_substr)
+            except curses.error:
+                # The row (or the end of the line) doesn't fit in the terminal,
+                # forget it so that it's printed again if the terminal grows.
+                self.lines[row] = ""
 
     def __diff_substr(self, old: str, new: str) -> Tuple[Optional[str], int]:
         diff_idx = self.__diff_index(old, new)
@@ -109,6 +118,10 @@ class View:
         special/conflicting modes that were set in set_modes."""
         cli_screen.clear()
 
+    def needs_render(self) -> bool:
+        """Whether there is anything new to render since the last render."""
+        return True
+
     def render(self, cli_screen: CliScreen):
         raise Exception("This method needs to be implemented by a subclass.")
 
@@ -146,8 +159,10 @@ class ViewRenderer(Thread):
             self.next_view.set_modes(self.cli_screen)
 
     def render(self):
-        if self.view:
+        if self.view and self.view.needs_render():
+            start = perf_counter()
             self.view.render(self.cli_screen)
+            get_latency_histograms().record_ms("render", (perf_counter() - start) * 1000)
 
 
 class ConfigSelectionView(View):
@@ -201,7 +216,77 @@ class PausedView(View):
         cli_screen.refresh()
 
 
+EQUIPMENT_ERROR_MSG = "ERROR, check logs"
+
+
+class RunViewState(NamedTuple):
+    """Everything the RunView renders, besides the header and the logs."""
+
+    mana: Any = "N/A"
+    hp: Any = "N/A"
+    speed: Any = "N/A"
+    magic_shield_level: Any = "N/A"
+    normal_action_amulet: str = "N/A"
+    normal_action_ring: str = "N/A"
+    emergency_action_amulet: str = "N/A"
+    emergency_action_ring: str = "N/A"
+    tank_action_amulet: str = "N/A"
+    tank_action_ring: str = "N/A"
+    equipped_amulet: str = "N/A"
+    equipped_ring: str = "N/A"
+    magic_shield_status: str = "N/A"
+    active_mode: str = "N/A"
+    debug_line_1: str = ""
+    debug_line_2: str = ""
+    latency_lines: Tuple[str, ...] = ()
+
+
+class RunViewSnapshot(NamedTuple):
+    generation: int
+    state: RunViewState
+
+
+# Fields of RunViewState that are read from CharStatus.equipment_status.
+EQUIPMENT_STATE_FIELDS = [
+    "normal_action_amulet",
+    "normal_action_ring",
+    "emergency_action_amulet",
+    "emergency_action_ring",
+    "tank_action_amulet",
+    "tank_action_ring",
+    "equipped_amulet",
+    "equipped_ring",
+    "magic_shield_status",
+]
+
+
+def gen_run_view_state(
+    prev_state: RunViewState, char_status: CharStatus, **changes: Any
+) -> RunViewState:
+    """Next state with the stats of the char status. Waits for the stats, but
+    not for the equipment values, those that aren't ready keep their previous
+    value."""
+    for name in EQUIPMENT_STATE_FIELDS:
+        try:
+            value = char_status.peek_equipment_status(name, None)
+            if value is not None:
+                changes[name] = str(value)
+        except Exception:
+            changes[name] = EQUIPMENT_ERROR_MSG
+    return prev_state._replace(
+        mana=char_status.mana,
+        hp=char_status.hp,
+        speed=char_status.speed,
+        magic_shield_level=char_status.magic_shield_level,
+        **changes,
+    )
+
+
 class RunView(View):
+    """The state is an immutable snapshot, published by swapping a single
+    reference, so the renderer reads it without locking and only redraws when
+    a new snapshot has been published."""
+
     MANA_ROW = View.ERRORS_ROW + 1
     HP_ROW = MANA_ROW + 1
     SPEED_ROW = HP_ROW + 1
@@ -220,162 +305,131 @@ class RunView(View):
     DEBUG_ROW_2 = DEBUG_ROW_1 + 1
     LOG_ROW = DEBUG_ROW_2 + 1
     MAX_LOG_BUFFER = 10
+    LATENCY_ROW = LOG_ROW + MAX_LOG_BUFFER + 1
 
-    def __init__(self):
+    def __init__(self, action_log: ActionLogRing = None):
         super().__init__()
         self.title = "N/A"
-        self.mana = "N/A"
-        self.hp = "N/A"
-        self.speed = "N/A"
-        self.magic_shield_level = "N/A"
-        self.normal_action_amulet = "N/A"
-        self.normal_action_ring = "N/A"
-        self.emergency_action_amulet = "N/A"
-        self.emergency_action_ring = "N/A"
-        self.tank_action_amulet = "N/A"
-        self.tank_action_ring = "N/A"
-        self.equipped_amulet = "N/A"
-        self.equipped_ring = "N/A"
-        self.magic_shield_status = "N/A"
-        self.active_mode = "N/A"
-        self.debug_line_1 = ""
-        self.debug_line_2 = ""
-        self.action_log_queue = Queue()
-        self.log_entries = []
+        self.snapshot = RunViewSnapshot(0, RunViewState())
+        self.rendered_generation = -1
+        self.action_log = action_log or ActionLogRing()
+        self.rendered_log_seq = 0
+        # Only serializes publishers, the renderer never takes it.
         self.lock = Lock()
 
+    @property
+    def state(self) -> RunViewState:
+        return self.snapshot.state
+
+    def publish(self, state: RunViewState):
+        with self.lock:
+            self.snapshot = RunViewSnapshot(self.snapshot.generation + 1, state)
+
+    def update(self, **changes: Any):
+        """Publishes the current state with the given fields changed."""
+        with self.lock:
+            snapshot = self.snapshot
+            self.snapshot = RunViewSnapshot(
+                snapshot.generation + 1, snapshot.state._replace(**changes)
+            )
+
     def add_log(self, log, debug_level=0):
         if debug_level <= get_debug_level():
-            self.action_log_queue.put_nowait(log)
-
-    def set_debug_line(self, debug_line: str = ""):
-        self.set_debug_line_1(debug_line)
+            self.action_log.append(debug_level, log)
 
     def set_debug_line_1(self, debug_line: str = ""):
-        self.debug_line_1 = debug_line
+        self.update(debug_line_1=debug_line)
 
     def set_debug_line_2(self, debug_line: str = ""):
-        self.debug_line_2 = debug_line
+        self.update(debug_line_2=debug_line)
 
-    def set_char_stats(self, char_status: CharStatus):
-        self.mana = char_status.mana
-        self.hp = char_status.hp
-        self.speed = char_status.speed
-        self.magic_shield_level = char_status.magic_shield_level
-
-    def set_normal_action_amulet(self, value: Any = "N/A"):
-        self.normal_action_amulet = str(value)
-
-    def set_normal_action_ring(self, value: Any = "N/A"):
-        self.normal_action_ring = str(value)
-
-    def set_emergency_action_amulet(self, value: Any = "N/A"):
-        self.emergency_action_amulet = str(value)
-
-    def set_emergency_action_ring(self, value: Any = "N/A"):
-        self.emergency_action_ring = str(value)
-
-    def set_tank_action_amulet(self, value: Any = "N/A"):
-        self.tank_action_amulet = str(value)
-
-    def set_tank_action_ring(self, value: Any = "N/A"):
-        self.tank_action_ring = str(value)
-
-    def set_equipped_ring(self, value: Any = "N/A"):
-        self.equipped_ring = str(value)
-
-    def set_equipped_amulet(self, value: Any = "N/A"):
-        self.equipped_amulet = str(value)
-
-    def set_magic_shield_status(self, value: Any = "N/A"):
-        self.magic_shield_status = str(value)
-
-    def set_active_mode(self, value: Any = "N/A"):
-        self.active_mode = str(value)
+    def needs_render(self) -> bool:
+        return (
+            self.snapshot.generation != self.rendered_generation
+            or self.action_log.next_seq != self.rendered_log_seq
+        )
 
     def render(self, cli_screen: CliScreen):
+        # lock in the snapshot at the moment it's rendered
+        snapshot = self.snapshot
         self.render_header(cli_screen)
-        self.render_stats(cli_screen)
-        self.render_debug_lines(cli_screen)
+        self.render_stats(cli_screen, snapshot.state)
+        self.render_debug_lines(cli_screen, snapshot.state)
         self.render_logs(cli_screen)
+        self.render_latencies(cli_screen, snapshot.state)
         cli_screen.refresh()
-
-    def drain_log_queue(self):
-        new_logs = []
-        while (
-            self.action_log_queue.qsize() > 0
-            and len(new_logs) <= RunView.MAX_LOG_BUFFER
-        ):
-            new_logs.append(self.action_log_queue.get_nowait())
-
-        carryon = RunView.MAX_LOG_BUFFER - len(new_logs)
-        new_logs.extend(self.log_entries[:carryon])
-        # completely override the log entries list, rather than
-        # mutate in-place.
-        self.log_entries = new_logs
+        self.rendered_generation = snapshot.generation
 
     def render_logs(self, cli_screen: CliScreen):
         cli_screen.print("Log Entries", RunView.LOG_ROW)
-        if self.action_log_queue.qsize() > 0:
-            self.drain_log_queue()
+        # only the entries that are displayed get formatted
+        entries = self.action_log.get_latest(RunView.MAX_LOG_BUFFER)
+        if entries:
+            self.rendered_log_seq = entries[0].seq + 1
 
         i = 0
-        # lock in logs at the moment they're rendered
-        logs = self.log_entries
         while i < RunView.MAX_LOG_BUFFER:
-            if i < len(logs):
-                cli_screen.print(logs[i], RunView.LOG_ROW + i + 1)
+            if i < len(entries):
+                cli_screen.print(entries[i].format(), RunView.LOG_ROW + i + 1)
             else:
                 cli_screen.print(" ", RunView.LOG_ROW + i + 1)
             i += 1
 
-    def render_stats(self, cli_screen: CliScreen):
-        cli_screen.print(f"Mana: {self.mana}", RunView.MANA_ROW)
-        cli_screen.print(f"HP: {self.hp}", RunView.HP_ROW)
-        cli_screen.print(f"Speed: {self.speed}", RunView.SPEED_ROW)
+    def render_stats(self, cli_screen: CliScreen, state: RunViewState):
+        cli_screen.print(f"Mana: {state.mana}", RunView.MANA_ROW)
+        cli_screen.print(f"HP: {state.hp}", RunView.HP_ROW)
+        cli_screen.print(f"Speed: {state.speed}", RunView.SPEED_ROW)
         cli_screen.print(
-            f"Magic Shield: {self.magic_shield_level}", RunView.MAGIC_SHIELD_ROW
+            f"Magic Shield: {state.magic_shield_level}", RunView.MAGIC_SHIELD_ROW
         )
         cli_screen.print(
-            f"Normal Action Amulet: {self.normal_action_amulet}",
+            f"Normal Action Amulet: {state.normal_action_amulet}",
             RunView.NORMAL_ACTION_AMULET_ROW,
         )
         cli_screen.print(
-            f"Normal Action Ring: {self.normal_action_ring}",
+            f"Normal Action Ring: {state.normal_action_ring}",
             RunView.NORMAL_ACTION_RING_ROW,
         )
         cli_screen.print(
-            f"Emergency Action Amulet: {self.emergency_action_amulet}",
+            f"Emergency Action Amulet: {state.emergency_action_amulet}",
             RunView.EMERGENCY_ACTION_AMULET_ROW,
         )
         cli_screen.print(
-            f"Emergency Action Ring: {self.emergency_action_ring}",
+            f"Emergency Action Ring: {state.emergency_action_ring}",
             RunView.EMERGENCY_ACTION_RING_ROW,
         )
         cli_screen.print(
-            f"Tank Action Amulet: {self.tank_action_amulet}",
+            f"Tank Action Amulet: {state.tank_action_amulet}",
             RunView.TANK_ACTION_AMULET_ROW,
         )
         cli_screen.print(
-            f"Tank Action Ring: {self.tank_action_ring}", RunView.TANK_ACTION_RING_ROW
+            f"Tank Action Ring: {state.tank_action_ring}", RunView.TANK_ACTION_RING_ROW
         )
         cli_screen.print(
-            f"Equipped Amulet: {self.equipped_amulet}", RunView.EQUIPPED_AMULET_ROW
+            f"Equipped Amulet: {state.equipped_amulet}", RunView.EQUIPPED_AMULET_ROW
         )
         cli_screen.print(
-            f"Equipped Ring: {self.equipped_ring}", RunView.EQUIPPED_RING_ROW
+            f"Equipped Ring: {state.equipped_ring}", RunView.EQUIPPED_RING_ROW
         )
         cli_screen.print(
-            f"Magic Shield Status: {self.magic_shield_status}",
+            f"Magic Shield Status: {state.magic_shield_status}",
             RunView.MAGIC_SHIELD_STATUS_ROW,
         )
         cli_screen.print(
-            f"Active Mode: {self.active_mode}", RunView.ACTIVE_MODE_ROW
+            f"Active Mode: {state.active_mode}", RunView.ACTIVE_MODE_ROW
         )
 
-    def render_debug_lines(self, cli_screen: CliScreen):
-        cli_screen.print(self.debug_line_1, RunView.DEBUG_ROW_1)
-        cli_screen.print(self.debug_line_2, RunView.DEBUG_ROW_2)
+    def render_latencies(self, cli_screen: CliScreen, state: RunViewState):
+        cli_screen.print("Latencies", RunView.LATENCY_ROW)
+        # the latency lines are sorted worst first, the rest are clipped to
+        # fit in the terminal
+        max_lines = max(cli_screen.get_height() - RunView.LATENCY_ROW - 1, 0)
+        for i, latency_line in enumerate(state.latency_lines[:max_lines]):
+            cli_screen.print(latency_line, RunView.LATENCY_ROW + i + 1)
+
+    def render_debug_lines(self, cli_screen: CliScreen, state: RunViewState):
+        cli_screen.print(state.debug_line_1, RunView.DEBUG_ROW_1)
+        cli_screen.print(state.debug_line_2, RunView.DEBUG_ROW_2)
 
 
 def stress_run_view(cliwin):
@@ -431,14 +485,7 @@ def stress_run_view(cliwin):
     try:
         i = 0
         while True:
-            view.set_char_stats(char_status)
-            view.set_magic_shield_status(char_status.magic_shield_status)
-            view.set_equipped_ring(char_status.equipped_ring)
-            view.set_equipped_amulet(char_status.equipped_amulet)
-            view.set_emergency_action_amulet(char_status.emergency_action_amulet)
-            view.set_emergency_action_ring(char_status.emergency_action_ring)
-            view.set_tank_action_amulet(char_status.tank_action_amulet)
-            view.set_tank_action_ring(char_status.tank_action_ring)
+            view.publish(gen_run_view_state(view.state, char_status))
             view.add_log(
                 f"This is log #{i} and it is very very long. Let us see.", -100
             )